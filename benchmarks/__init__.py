@@ -0,0 +1,20 @@
+import logging
+import os
+import resource
+
+import threaded  # noqa: F401
+
+# threaded configures the root logger for DEBUG output
+# which would otherwise dominate every measurement
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def rss_kib() -> int:
+    """Current resident set size of the process, in KiB.
+    Falls back to the peak RSS where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
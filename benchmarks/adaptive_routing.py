@@ -0,0 +1,96 @@
+"""
+Time for a pipeline to get through jobs whose blocking flags are
+wrong: waiting jobs flagged blocking queue up for the execution
+slot, while the ones busy on the CPU run alongside them. Compares
+trusting the flags with letting a router learn from the runs: it
+moves the busy jobs to a slot of their own and, if the flags are
+derived rather than set on purpose, the waiting jobs off the slot.
+
+    python -m benchmarks.adaptive_routing [jobs] [runs] [job_ms]
+"""
+import sys
+import threading
+from time import perf_counter, sleep, thread_time
+from typing import Optional
+
+from threaded.jobs import Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+from threaded.routing import AdaptiveRouter
+
+
+def spin(seconds: float) -> None:
+    started = thread_time()
+    while thread_time() - started < seconds:
+        pass
+
+
+def run(
+    jobs: int,
+    runs: int,
+    job_s: float,
+    router: Optional[AdaptiveRouter],
+    derived: bool,
+) -> float:
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors, router=router)
+    left = [jobs]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def finished(n: int) -> bool:
+        if n < runs:
+            return True
+        with lock:
+            left[0] -= 1
+            if not left[0]:
+                done.set()
+        return False
+
+    def job(i: int) -> StatelessJob:
+        calls = [0]
+
+        def start() -> int:
+            if i % 2:
+                spin(job_s / 5)
+            else:
+                sleep(job_s)
+            calls[0] += 1
+            return calls[0]
+
+        return StatelessJob(
+            name=f"busy-{i}" if i % 2 else f"idle-{i}",
+            blocking=not i % 2,
+            start=start,
+            should_reshedule=finished,
+            derived=derived,
+        )
+
+    started = perf_counter()
+    for i in range(jobs):
+        pipeline.schedule(job(i))
+    done.wait()
+    elapsed = perf_counter() - started
+    pipeline.run_until_complete()
+    executors.shutdown()
+    return elapsed
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    job_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+
+    def kind(job: StatelessJob) -> str:
+        return job.name.split("-")[0]
+
+    for label, router, derived in (
+        ("flags", None, False),
+        ("router", AdaptiveRouter(key=kind), False),
+        ("derived", AdaptiveRouter(key=kind), True),
+    ):
+        elapsed = run(jobs, runs, job_s, router, derived)
+        print(f"{label:>7}: {elapsed:6.3f}s for {jobs * runs} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Soak test of ConsumerWithQueue: pushes items through a consumer
+and reports the resident set size along the way, which should
+stay flat however many items go through.
+
+    python -m benchmarks.consumer_soak [items] [max_batch]
+
+max_batch of 0 runs the consumer item by item.
+"""
+import sys
+from time import perf_counter
+from typing import Any, List
+
+from benchmarks import rss_kib
+from threaded.executor import ConsumerWithQueue
+from threaded.queues import RequestQueue
+
+CHUNK = 1000
+
+
+def main() -> None:
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    max_batch = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    checkpoint = max(items // 10, CHUNK)
+
+    channel: RequestQueue = RequestQueue(maxsize=16 * CHUNK)
+    total = 0
+
+    def consume(item: Any) -> None:
+        nonlocal total
+        total += item
+
+    def consume_batch(batch: List[Any]) -> None:
+        nonlocal total
+        total += sum(batch)
+
+    if max_batch:
+        consumer = ConsumerWithQueue(
+            channel,
+            batch_func=consume_batch,
+            max_batch=max_batch,
+            history=1024,
+        )
+    else:
+        consumer = ConsumerWithQueue(channel, consume, history=1024)
+
+    start = perf_counter()
+    print(f"{0:>12} items: {rss_kib():8d} KiB")
+    chunk = [1] * CHUNK
+    for sent in range(CHUNK, items + 1, CHUNK):
+        channel.put_many(chunk)
+        if sent % checkpoint == 0:
+            print(f"{sent:>12} items: {rss_kib():8d} KiB")
+    consumer.stop()
+    channel.join()
+    elapsed = perf_counter() - start
+
+    assert total == consumer.recieved == items - items % CHUNK
+    print(
+        f"{consumer.recieved} items in {consumer.batches} batches, "
+        f"{consumer.recieved / elapsed:.0f} items/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Many IO-bound requests (each waits for `LATENCY` seconds) dispatched
+by the threaded loop and by the asyncio one. The threaded loop is
+limited by its thread count, the asyncio loop by its semaphore.
+
+    python -m benchmarks.dispatch_async [jobs]
+"""
+import asyncio
+import sys
+import threading
+from time import perf_counter, sleep
+from typing import Any
+
+from threaded.aio import AsyncDispatcherLoop
+from threaded.dispatcher import DispatcherLoop
+
+LATENCY = 0.5
+
+
+def blocking_wait(_: Any) -> None:
+    sleep(LATENCY)
+
+
+async def async_wait(_: Any) -> None:
+    await asyncio.sleep(LATENCY)
+
+
+def threaded(jobs: int, workers: int) -> None:
+    loop = DispatcherLoop(max_workers=workers, dispatcher=blocking_wait)
+    loop.run()
+    for i in range(jobs):
+        loop.submit(i)
+    print(f"  threads alive: {threading.active_count()}")
+    loop.stop()
+    loop.run_until_completed()
+
+
+def asynchronous(jobs: int, concurrency: int) -> None:
+    loop = AsyncDispatcherLoop(
+        max_concurrency=concurrency, dispatcher=async_wait
+    )
+    loop.run()
+    for i in range(jobs):
+        loop.submit(i)
+    print(f"  threads alive: {threading.active_count()}")
+    loop.stop()
+    loop.run_until_completed()
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    for name, run, width in (
+        ("threaded", threaded, 64),
+        ("threaded", threaded, 512),
+        ("asyncio", asynchronous, 10_000),
+    ):
+        print(f"{name} x{width}:")
+        start = perf_counter()
+        run(jobs, width)
+        elapsed = perf_counter() - start
+        print(f"  {jobs} jobs in {elapsed:.2f}s ({jobs / elapsed:.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of per-item dispatch against batch dispatch. Every call
+of the dispatcher pays a fixed round-trip (a DB query, an MQTT publish)
+plus a small per-item cost, which is what batching amortises.
+
+    python -m benchmarks.dispatch_batch [jobs]
+"""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from typing import Any, Callable, List
+
+from threaded.dispatcher import DispatcherLoop
+
+ROUND_TRIP = 0.002
+PER_ITEM = 0.00001
+WORKERS = 8
+
+
+def one(_: Any) -> None:
+    sleep(ROUND_TRIP + PER_ITEM)
+
+
+def many(items: List[Any]) -> None:
+    sleep(ROUND_TRIP + PER_ITEM * len(items))
+
+
+def legacy(jobs: int) -> None:
+    requests: "queue.Queue[Any]" = queue.Queue()
+
+    def drain() -> None:
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            for _ in executor.map(one, iter(requests.get, None)):
+                requests.task_done()
+
+    t = threading.Thread(target=drain, daemon=True)
+    t.start()
+    for i in range(jobs):
+        requests.put(i)
+    requests.put(None)
+    t.join()
+
+
+def per_item(jobs: int) -> None:
+    loop = DispatcherLoop(max_workers=WORKERS, dispatcher=one)
+    loop.run()
+    for i in range(jobs):
+        loop.submit(i)
+    loop.stop()
+    loop.run_until_completed()
+
+
+def batched(jobs: int, chunk: int = 256) -> None:
+    loop = DispatcherLoop(
+        max_workers=WORKERS,
+        dispatch_batch=many,
+        max_batch=64,
+        linger=0.001,
+    )
+    loop.run()
+    for i in range(0, jobs, chunk):
+        loop.submit_many(range(i, min(i + chunk, jobs)))
+    loop.stop()
+    loop.run_until_completed()
+
+
+def report(name: str, run: Callable[[int], None], jobs: int) -> None:
+    start = perf_counter()
+    run(jobs)
+    elapsed = perf_counter() - start
+    print(f"{name:>10}: {jobs / elapsed:10.0f} jobs/s ({elapsed:.2f}s)")
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    report("map", legacy, jobs)
+    report("per-item", per_item, jobs)
+    report("batched", batched, jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Saturates a DispatcherLoop with low-priority telemetry while
+urgent requests arrive every few milliseconds, then reports the queue
+wait of the urgent ones for the FIFO and the priority queues.
+
+    python -m benchmarks.dispatch_priority [seconds]
+"""
+import sys
+import threading
+from statistics import quantiles
+from time import monotonic, sleep
+from typing import List, Tuple
+
+from threaded.dispatcher import DispatcherLoop
+from threaded.queues import PriorityDeadlineQueue, RequestQueue
+
+SERVICE_TIME = 0.001
+WORKERS = 4
+
+
+def run(requests: RequestQueue, seconds: float) -> List[float]:
+    waits: List[float] = []
+
+    def dispatch(job: Tuple[str, float]) -> None:
+        kind, submitted = job
+        if kind == "urgent":
+            waits.append(monotonic() - submitted)
+        sleep(SERVICE_TIME)
+
+    loop = DispatcherLoop(
+        max_workers=WORKERS,
+        dispatcher=dispatch,
+        requests=requests,
+        max_in_flight=WORKERS,
+    )
+    loop.run()
+    until = monotonic() + seconds
+
+    def telemetry() -> None:
+        while monotonic() < until:
+            loop.submit(("telemetry", monotonic()), priority=10, block=True)
+
+    producer = threading.Thread(target=telemetry)
+    producer.start()
+    while monotonic() < until:
+        loop.submit(("urgent", monotonic()), priority=0, block=True)
+        sleep(0.01)
+    producer.join()
+    loop.stop()
+    loop.run_until_completed()
+    return waits
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    for name, requests in (
+        ("fifo", RequestQueue(maxsize=2000)),
+        ("priority", PriorityDeadlineQueue(maxsize=2000)),
+    ):
+        waits = sorted(run(requests, seconds))
+        cuts = quantiles(waits, n=100)
+        print(
+            f"{name:>8}: {len(waits)} urgent jobs, "
+            f"p50 {cuts[49] * 1000:7.2f}ms  p99 {cuts[98] * 1000:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Per-request cost of a DispatcherLoop with a no-op dispatcher,
+with the instrumentation disabled and enabled (best of three runs).
+
+    python -m benchmarks.dispatch_stats [jobs]
+"""
+import sys
+from time import perf_counter
+
+from threaded.dispatcher import DispatcherLoop
+
+
+def run(jobs: int, instrument: bool) -> float:
+    loop = DispatcherLoop(max_workers=4, instrument=instrument)
+    start = perf_counter()
+    loop.run()
+    for i in range(0, jobs, 1000):
+        loop.submit_many(range(i, i + 1000))
+    loop.stop()
+    loop.run_until_completed()
+    return (perf_counter() - start) / jobs
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for instrument in (False, True, False, True):
+        per_job = min(run(jobs, instrument) for _ in range(3))
+        print(f"instrument={instrument!s:>5}: {per_job * 1e9:8.0f} ns/job")
+
+
+if __name__ == "__main__":
+    main()
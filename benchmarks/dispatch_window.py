@@ -0,0 +1,79 @@
+"""
+Submits a million no-op jobs into a DispatcherLoop with a bounded
+request queue and samples the RSS along the way. With the in-flight
+window the process memory stays flat; the `legacy` run feeds the same
+queue to `executor.map` (the former dispatch engine) for comparison.
+
+    python -m benchmarks.dispatch_window [jobs]
+"""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+from benchmarks import rss_kib
+from threaded.dispatcher import DispatcherLoop
+
+Samples = List[Tuple[int, int]]
+
+
+def produce(
+    submit: Callable[[int], None], jobs: int, every: int
+) -> Samples:
+    samples = []
+    for i in range(jobs):
+        submit(i)
+        if i % every == 0:
+            samples.append((i, rss_kib()))
+    return samples
+
+
+def windowed(jobs: int, every: int) -> Samples:
+    loop = DispatcherLoop(
+        max_workers=4,
+        max_requests=1024,
+        max_in_flight=64,
+        name="bench-loop",
+    )
+    loop.run()
+    samples = produce(lambda i: loop.submit(i, block=True), jobs, every)
+    loop.stop()
+    loop.run_until_completed()
+    return samples
+
+
+def legacy(jobs: int, every: int) -> Samples:
+    requests: "queue.Queue[object]" = queue.Queue(maxsize=1024)
+
+    def drain() -> None:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in executor.map(lambda _: None, iter(requests.get, None)):
+                requests.task_done()
+
+    t = threading.Thread(target=drain, daemon=True)
+    t.start()
+    samples = produce(requests.put, jobs, every)
+    requests.put(None)
+    t.join()
+    return samples
+
+
+def report(name: str, run: Callable[[int, int], Samples], jobs: int) -> None:
+    start = perf_counter()
+    samples = run(jobs, max(jobs // 10, 1))
+    elapsed = perf_counter() - start
+    print(f"{name}: {jobs} jobs in {elapsed:.1f}s")
+    for submitted, rss in samples:
+        print(f"  {submitted:>9} submitted  rss {rss / 1024:8.1f} MiB")
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    report("windowed", windowed, jobs)
+    report("legacy", legacy, jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+End-to-end latency and throughput of a chain of short stages,
+built with and without stage fusion (best of three runs).
+
+    python -m benchmarks.graph_fusion [items] [stages]
+"""
+import sys
+from time import perf_counter
+from typing import List, Tuple
+
+from threaded.graph import StageGraph
+
+
+def run(items: int, stages: int, fuse: bool) -> Tuple[float, float]:
+    latencies: List[float] = []
+
+    def sink(started: float) -> None:
+        latencies.append(perf_counter() - started)
+
+    graph = StageGraph()
+    names = [f"s{i}" for i in range(stages)]
+    for name in names:
+        graph.stage(name, lambda started: started, buffer=64)
+    graph.stage("sink", sink)
+    graph.chain(*names, "sink")
+    pipeline = graph.build(fuse=fuse)
+
+    start = perf_counter()
+    for _ in range(items):
+        pipeline.schedule(perf_counter())
+    pipeline.run_until_complete()
+    elapsed = perf_counter() - start
+    latencies.sort()
+    return items / elapsed, latencies[len(latencies) // 2]
+
+
+def main() -> None:
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    stages = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    for fuse in (False, True):
+        runs = [run(items, stages, fuse) for _ in range(3)]
+        rate = max(r for r, _ in runs)
+        p50 = min(p for _, p in runs)
+        print(
+            f"fuse={fuse!s:>5}: {rate:10.0f} items/s, "
+            f"p50 latency {p50 * 1e6:9.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Latency of calls which now and then stall, made directly on
+an executor and through a Hedger (5% budget, p95 threshold).
+
+    python -m benchmarks.hedging [calls] [stall_rate] [stall_ms]
+"""
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+
+from threaded.hedge import Hedger
+from threaded.stats import LatencyHistogram
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    stall_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    stall_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 100.0) / 1000
+
+    def lookup(_: int) -> None:
+        sleep(stall_s if random.random() < stall_rate else 0.002)
+
+    random.seed(1)
+    executor = ThreadPoolExecutor(max_workers=4)
+    direct = LatencyHistogram()
+    for i in range(calls):
+        start = perf_counter()
+        executor.submit(lookup, i).result()
+        direct.record(perf_counter() - start)
+    executor.shutdown()
+
+    random.seed(1)
+    hedger = Hedger(max_workers=4)
+    hedged = LatencyHistogram()
+    for i in range(calls):
+        start = perf_counter()
+        hedger.call(lookup, i)
+        hedged.record(perf_counter() - start)
+    hedger.shutdown()
+
+    for name, latencies in (("direct", direct), ("hedged", hedged)):
+        s = latencies.snapshot()
+        print(
+            f"{name:>6}: p50 {s.p50 * 1e3:6.1f} ms, p99 {s.p99 * 1e3:6.1f} ms"
+            f", max {s.max * 1e3:6.1f} ms, mean {s.mean * 1e3:6.2f} ms"
+        )
+    print(hedger.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Runs and time taken to get through bursts of redundant submissions:
+each burst schedules every job name many times over, e.g. a refresh
+asked for by every event which touches an object.
+
+    python -m benchmarks.job_coalescing [bursts] [names] [copies] [job_ms]
+"""
+import sys
+import threading
+from time import perf_counter, sleep
+from typing import Callable, List, Optional, Tuple
+
+from threaded.jobs import Job, Pipeline, StatelessJob, keep_latest
+from threaded.registry import ExecutorRegistry
+
+
+def run(
+    bursts: int,
+    names: int,
+    copies: int,
+    job_s: float,
+    coalesce: Optional[Callable[[Job, Job], Job]],
+) -> Tuple[int, float]:
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors, coalesce=coalesce)
+    runs: List[int] = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def refresh() -> None:
+        sleep(job_s)
+        with lock:
+            runs.append(1)
+
+    started = perf_counter()
+    for _ in range(bursts):
+        for _ in range(copies):
+            for i in range(names):
+                pipeline.schedule(
+                    StatelessJob(
+                        name=f"refresh-{i}", blocking=False, start=refresh
+                    )
+                )
+        # lets the pools start on the burst before the next one
+        sleep(0.02)
+    # once it runs, the jobs before it have all been submitted
+    # and the pools only have to finish them
+    pipeline.schedule(
+        StatelessJob(name="end", blocking=True, start=done.set)
+    )
+    done.wait()
+    pipeline.run_until_complete()
+    elapsed = perf_counter() - started
+    executors.shutdown()
+    return len(runs), elapsed
+
+
+def main() -> None:
+    bursts = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    names = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    copies = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    job_s = (float(sys.argv[4]) if len(sys.argv) > 4 else 2.0) / 1000
+    for label, coalesce in (("off", None), ("keep_latest", keep_latest)):
+        runs, elapsed = run(bursts, names, copies, job_s, coalesce)
+        print(
+            f"{label:>11}: {runs:5d} runs of"
+            f" {bursts * names * copies} in {elapsed:6.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
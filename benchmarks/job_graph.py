@@ -0,0 +1,128 @@
+"""
+Makespan of a mission: a chain of steps alongside many independent
+side jobs, all of which have to be done before it ends.
+
+The pipeline runs it once with each job scheduling the next one
+(everything in a row) and once as a graph. Then the dependency
+scheduler alone, on a few workers, releases the ready jobs by the
+longest critical path and, with all the runtimes taken as 0,
+in the order they became ready.
+
+    python -m benchmarks.job_graph [chain] [side] [step_ms] [workers]
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from typing import Dict, List
+
+from threaded.dag import DependencyScheduler
+from threaded.jobs import Job, Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+
+
+def mission(
+    chain: int, side: int, step_s: float, done: threading.Event
+) -> Dict[str, List[Job]]:
+    steps: List[Job] = []
+    for i in range(chain):
+        after = (steps[-1],) if steps else ()
+        steps.append(
+            StatelessJob(
+                name=f"step-{i}",
+                blocking=False,
+                start=lambda: sleep(step_s),
+                after=after,
+            )
+        )
+    extra: List[Job] = [
+        StatelessJob(
+            name=f"side-{i}", blocking=False, start=lambda: sleep(step_s)
+        )
+        for i in range(side)
+    ]
+    end = StatelessJob(
+        name="end", blocking=False, start=done.set, after=(steps[-1], *extra)
+    )
+    return {"steps": steps, "side": extra, "end": [end]}
+
+
+def chained(chain: int, side: int, step_s: float) -> float:
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors)
+    done = threading.Event()
+    jobs = mission(chain, side, step_s, done)
+    order = jobs["side"] + jobs["steps"] + jobs["end"]
+
+    def follow(i: int, job: Job) -> StatelessJob:
+        def start() -> None:
+            job.start()
+            if i + 1 < len(order):
+                pipeline.schedule(follow(i + 1, order[i + 1]))
+
+        return StatelessJob(name=job.name, blocking=False, start=start)
+
+    started = perf_counter()
+    pipeline.schedule(follow(0, order[0]))
+    done.wait()
+    elapsed = perf_counter() - started
+    pipeline.run_until_complete()
+    executors.shutdown()
+    return elapsed
+
+
+def graph(chain: int, side: int, step_s: float) -> float:
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors)
+    done = threading.Event()
+    jobs = mission(chain, side, step_s, done)
+    started = perf_counter()
+    pipeline.schedule(jobs["end"][0])
+    done.wait()
+    elapsed = perf_counter() - started
+    pipeline.run_until_complete()
+    executors.shutdown()
+    return elapsed
+
+
+def scheduler(
+    chain: int, side: int, step_s: float, workers: int, critical: bool
+) -> float:
+    executor = ThreadPoolExecutor(max_workers=workers)
+    done = threading.Event()
+    jobs = mission(chain, side, step_s, done)
+
+    def run(job: Job) -> None:
+        job.start()
+        dependencies.done(job)
+
+    dependencies = DependencyScheduler(
+        lambda job: executor.submit(run, job),
+        runtime=lambda job: step_s if critical else 0.0,
+        max_running=workers,
+    )
+    started = perf_counter()
+    # the side jobs become ready first
+    dependencies.add(jobs["side"])
+    dependencies.add(jobs["end"])
+    done.wait()
+    elapsed = perf_counter() - started
+    executor.shutdown()
+    return elapsed
+
+
+def main() -> None:
+    chain = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    side = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    step_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 10.0) / 1000
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    print(f"critical path: {chain * step_s * 1000:.0f}ms")
+    print(f"   chained: {chained(chain, side, step_s) * 1000:7.1f}ms")
+    print(f"     graph: {graph(chain, side, step_s) * 1000:7.1f}ms")
+    for label, critical in (("ready order", False), ("critical", True)):
+        elapsed = scheduler(chain, side, step_s, workers, critical)
+        print(f"{label:>11}: {elapsed * 1000:7.1f}ms on {workers} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Mean completion time of a few long jobs queued ahead of a steady
+stream of short ones, and the time the last long job finishes,
+with the jobs waiting for the shared pool in FIFO order and
+shortest expected job first, with and without aging.
+
+    python -m benchmarks.job_ordering [long] [short] [long_ms] [short_ms]
+"""
+import sys
+import threading
+from statistics import mean
+from time import perf_counter, sleep
+from typing import Dict, List, Optional, Tuple
+
+from threaded.jobs import Pipeline, StatelessJob
+from threaded.queues import ShortestJobFirstQueue
+from threaded.registry import ExecutorRegistry
+from threaded.routing import AdaptiveRouter
+
+
+def run(
+    long: int,
+    short: int,
+    long_s: float,
+    short_s: float,
+    aging: Optional[float],
+) -> Tuple[float, float]:
+    executors = ExecutorRegistry()
+    router = AdaptiveRouter(key=lambda job: job.name.split("-")[0])
+    pending = None
+    if aging is not None:
+        pending = ShortestJobFirstQueue(router.runtime, aging=aging)
+    pipeline = Pipeline(executors, router=router, pending=pending)
+    finished: Dict[str, List[float]] = {"long": [], "short": []}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def job(kind: str, i: int, seconds: float, total: int) -> StatelessJob:
+        def start() -> None:
+            sleep(seconds)
+            with lock:
+                finished[kind].append(perf_counter())
+                if sum(map(len, finished.values())) == total:
+                    done.set()
+
+        return StatelessJob(name=f"{kind}-{i}", blocking=False, start=start)
+
+    # one run of each kind lets the router know what to expect
+    pipeline.schedule(job("long", -1, long_s, 2))
+    pipeline.schedule(job("short", -1, short_s, 2))
+    done.wait()
+    with lock:
+        finished = {"long": [], "short": []}
+        done.clear()
+
+    started = perf_counter()
+    total = long + short
+    for i in range(long):
+        pipeline.schedule(job("long", i, long_s, total))
+    for i in range(short):
+        pipeline.schedule(job("short", i, short_s, total))
+        if i % 5 == 4:
+            # about as many as the workers of the pool get through
+            sleep(short_s)
+    done.wait()
+    pipeline.run_until_complete()
+    executors.shutdown()
+    times = [t - started for t in finished["long"] + finished["short"]]
+    return mean(times), max(finished["long"]) - started
+
+
+def main() -> None:
+    long = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    short = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    long_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 100.0) / 1000
+    short_s = (float(sys.argv[4]) if len(sys.argv) > 4 else 5.0) / 1000
+    for label, aging in (("fifo", None), ("sjf", 0.0), ("sjf+aging", 0.5)):
+        mean_s, last_long_s = run(long, short, long_s, short_s, aging)
+        print(
+            f"{label:>9}: mean {mean_s * 1000:7.1f}ms,"
+            f" last long job done at {last_long_s * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
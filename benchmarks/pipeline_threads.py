@@ -0,0 +1,53 @@
+"""
+Threads alive with a number of job pipelines running at once,
+when they all share the process-wide executor registry and when
+each of them gets executors of its own (the way every pipeline
+used to start its own pools and consumer threads).
+
+    python -m benchmarks.pipeline_threads [pipelines]
+"""
+import sys
+import threading
+from time import perf_counter, sleep
+
+from threaded.jobs import Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+
+
+def run(pipelines: int, shared: bool) -> None:
+    common = ExecutorRegistry()
+    registries = [
+        common if shared else ExecutorRegistry() for _ in range(pipelines)
+    ]
+    before = threading.active_count()
+    start = perf_counter()
+    running = [Pipeline(executors) for executors in registries]
+    for pipeline in running:
+        for i in range(20):
+            pipeline.schedule(
+                StatelessJob(
+                    name=str(i), blocking=i % 4 == 0, start=lambda: sleep(0.01)
+                )
+            )
+    sleep(0.5)
+    threads = threading.active_count() - before
+    for pipeline in running:
+        pipeline.run_until_complete()
+    elapsed = perf_counter() - start
+    for executors in set(registries):
+        executors.shutdown()
+    print(
+        f"{pipelines:3d} pipelines, shared={shared!s:>5}: "
+        f"{threads:4d} threads, done in {elapsed:.2f}s"
+    )
+
+
+def main() -> None:
+    most = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    for pipelines in sorted({1, max(most // 3, 1), most}):
+        for shared in (False, True):
+            run(pipelines, shared)
+
+
+if __name__ == "__main__":
+    main()
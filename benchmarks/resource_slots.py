@@ -0,0 +1,39 @@
+"""
+Throughput of blocking jobs spread over a number of independent
+resources: all of them sharing a single execution slot (the way
+the atomic pool used to work) and holding only their own resource.
+
+    python -m benchmarks.resource_slots [jobs] [resources] [job_ms]
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+
+from threaded.resources import ResourceScheduler
+
+
+def run(jobs: int, resources: int, job_s: float, shared: bool) -> float:
+    executor = ThreadPoolExecutor(max_workers=resources)
+    scheduler = ResourceScheduler(executor)
+    start = perf_counter()
+    for i in range(jobs):
+        resource = "slot" if shared else f"resource-{i % resources}"
+        scheduler.submit_using({resource}, sleep, job_s)
+    scheduler.shutdown(wait=True)
+    elapsed = perf_counter() - start
+    executor.shutdown()
+    return jobs / elapsed
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    resources = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    job_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+    for shared in (True, False):
+        rate = run(jobs, resources, job_s, shared)
+        label = "single slot" if shared else f"{resources} resources"
+        print(f"{label:>12}: {rate:8.1f} jobs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Requests for a few distinct paths, each lookup sleeping for a while,
+through a WorkerPool with and without a SingleFlight in front.
+
+    python -m benchmarks.single_flight [requests] [paths] [lookup_ms]
+"""
+import queue
+import sys
+from time import perf_counter, sleep
+from typing import Any, Optional
+
+from threaded.executor import WorkerPool
+from threaded.memo import SingleFlight
+
+
+def run(requests: int, paths: int, lookup_s: float, dedup: bool) -> None:
+    flight: Optional[SingleFlight] = SingleFlight() if dedup else None
+    pool = WorkerPool(max_workers=8, flight=flight)
+    results: "queue.Queue[Any]" = queue.Queue()
+
+    def lookup(path: int) -> int:
+        sleep(lookup_s)
+        return path
+
+    start = perf_counter()
+    for i in range(requests):
+        path = i % paths
+        pool.submit(
+            lambda path=path: lookup(path),
+            results,
+            key=path if dedup else None,
+        )
+    pool.run_until_complete()
+    elapsed = perf_counter() - start
+    assert results.qsize() == requests
+    print(
+        f"dedup={dedup!s:>5}: {requests / elapsed:8.0f} requests/s"
+        + (f", {flight.stats()}" if flight is not None else "")
+    )
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    paths = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    lookup_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 20.0) / 1000
+    for dedup in (False, True):
+        run(requests, paths, lookup_s, dedup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Moves items from one producer thread to one consumer thread through
+a queue.Queue and through an SPSCChannel, unbounded and bounded
+(best of three runs).
+
+    python -m benchmarks.spsc_channel [items]
+"""
+import queue
+import sys
+import threading
+from time import perf_counter
+from typing import Any, Callable
+
+from threaded.channel import SPSCChannel
+
+
+def transfer(channel: Any, items: int) -> float:
+    def consume() -> None:
+        for _ in iter(channel.get, None):
+            pass
+
+    consumer = threading.Thread(target=consume)
+    start = perf_counter()
+    consumer.start()
+    put = channel.put
+    for i in range(items):
+        put(i)
+    put(None)
+    consumer.join()
+    return items / (perf_counter() - start)
+
+
+def main() -> None:
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    channels: "dict[str, Callable[[], Any]]" = {
+        "queue.Queue": queue.Queue,
+        "queue.Queue(1024)": lambda: queue.Queue(maxsize=1024),
+        "SPSCChannel": SPSCChannel,
+        "SPSCChannel(1024)": lambda: SPSCChannel(maxsize=1024),
+    }
+    for name, channel in channels.items():
+        rate = max(transfer(channel(), items) for _ in range(3))
+        print(f"{name:>18}: {rate:10.0f} items/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Adds timers with random delays (up to ten minutes of 10 ms ticks),
+cancels half of them and runs the rest, on a TimingWheel and on
+the standard library sched.scheduler (whose cancel is linear).
+
+    python -m benchmarks.timing_wheel [timers]
+"""
+import random
+import sched
+import sys
+from time import perf_counter
+from typing import Any, Callable, List
+
+from benchmarks import rss_kib
+from threaded.timers import TimingWheel
+
+TICKS = 60_000
+
+
+def nothing() -> None:
+    pass
+
+
+def timed(name: str, timers: int, action: Callable[[], Any]) -> None:
+    start = perf_counter()
+    action()
+    elapsed = perf_counter() - start
+    print(f"{name:>22}: {timers / elapsed:12.0f} timers/s")
+
+
+def main() -> None:
+    timers = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rng = random.Random(1)
+    delays = [rng.randint(1, TICKS) for _ in range(timers)]
+    wheel = TimingWheel()
+    handles: List[Any] = []
+    before = rss_kib()
+
+    def add() -> None:
+        handles.extend(wheel.add(d, nothing) for d in delays)
+
+    def cancel() -> None:
+        for handle in handles[::2]:
+            wheel.cancel(handle)
+
+    def run() -> None:
+        for callback in wheel.advance(TICKS):
+            callback()
+
+    timed("wheel add", timers, add)
+    print(f"{len(wheel)} timers pending, {rss_kib() - before} KiB")
+    timed("wheel cancel", timers // 2, cancel)
+    timed("wheel run", timers // 2, run)
+
+    # sched cancels by a linear search, so it only gets a sample
+    sample = min(timers, 20_000)
+    scheduler = sched.scheduler()
+    events: List[Any] = []
+
+    def enter() -> None:
+        events.extend(scheduler.enter(d, 0, nothing) for d in delays[:sample])
+
+    def drop() -> None:
+        for event in events[::2]:
+            scheduler.cancel(event)
+
+    timed("sched enter", sample, enter)
+    timed("sched cancel", sample // 2, drop)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Contention benchmark: ~1 us jobs on ThreadPoolExecutor (one shared
+queue) against WorkStealingExecutor (a deque per worker), for 2 to 32
+workers. `flat` submits every job from the main thread, `spawn`
+submits root jobs which submit their follow-ups from the workers.
+
+    python -m benchmarks.work_stealing [jobs]
+"""
+import sys
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from time import perf_counter
+from typing import Any, Callable, List
+
+from threaded.stealing import WorkStealingExecutor
+
+FAN_OUT = 16
+
+
+def tiny() -> None:
+    # roughly a microsecond of work
+    sum(range(10))
+
+
+Futures = List["Future[Any]"]
+
+
+def flat(pool: Executor, jobs: int) -> Futures:
+    return [pool.submit(tiny) for _ in range(jobs)]
+
+
+def spawn(pool: Executor, jobs: int) -> Futures:
+    def root() -> None:
+        for _ in range(FAN_OUT - 1):
+            pool.submit(tiny)
+
+    return [pool.submit(root) for _ in range(jobs // FAN_OUT)]
+
+
+def measure(
+    make: Callable[[int], Executor],
+    load: Callable[[Executor, int], Futures],
+    workers: int,
+    jobs: int,
+) -> float:
+    pool = make(workers)
+    start = perf_counter()
+    # roots must be done before the shutdown, they still submit
+    wait(load(pool, jobs))
+    pool.shutdown(wait=True)
+    return jobs / (perf_counter() - start)
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pools = (
+        ("shared", lambda n: ThreadPoolExecutor(max_workers=n)),
+        ("stealing", lambda n: WorkStealingExecutor(max_workers=n)),
+    )
+    for load in (flat, spawn):
+        print(f"{load.__name__}:")
+        for workers in (2, 4, 8, 16, 32):
+            rates = "  ".join(
+                f"{name} {measure(make, load, workers, jobs):9.0f}/s"
+                for name, make in pools
+            )
+            print(f"  {workers:>2} workers: {rates}")
+
+
+if __name__ == "__main__":
+    main()
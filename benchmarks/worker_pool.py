@@ -0,0 +1,84 @@
+"""
+Per-job overhead of WorkerPool: the former engine (a dispatch thread
+re-submitting each job to the executor) against the direct one.
+Jobs are no-ops, so the time is all spent on the handoffs. Throughput
+submits all the jobs at once, round trip waits for every result
+before submitting the next job.
+
+    python -m benchmarks.worker_pool [jobs]
+"""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, Optional, Tuple
+
+from threaded.executor import WorkerPool
+
+WORKERS = 4
+
+
+class LegacyWorkerPool:
+    def __init__(self, max_workers: int) -> None:
+        self.requests: "queue.Queue[Optional[Tuple[Any, Any]]]"
+        self.requests = queue.Queue()
+        self.workers = max_workers
+        self.loop = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.loop.start()
+
+    def submit(self, routine: Callable[[], Any], once_done: Any) -> None:
+        self.requests.put((routine, once_done), block=False)
+
+    def run_until_complete(self) -> None:
+        self.requests.put(None)
+        self.loop.join()
+
+    def dispatch_loop(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for routine, once_done in iter(self.requests.get, None):
+                self.requests.task_done()
+                executor.submit(routine).add_done_callback(
+                    lambda f, q=once_done: q.put_nowait(f.result())
+                )
+
+
+def run(pool: Any, jobs: int) -> float:
+    results: "queue.Queue[Any]" = queue.Queue()
+    start = perf_counter()
+    for _ in range(jobs):
+        pool.submit(int, results)
+    pool.run_until_complete()
+    elapsed = perf_counter() - start
+    assert results.qsize() == jobs
+    return elapsed / jobs
+
+
+def round_trip(pool: Any, jobs: int) -> float:
+    results: "queue.Queue[Any]" = queue.Queue()
+    start = perf_counter()
+    for _ in range(jobs):
+        pool.submit(int, results)
+        results.get()
+    elapsed = perf_counter() - start
+    pool.run_until_complete()
+    return elapsed / jobs
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for name, measure in (("throughput", run), ("round trip", round_trip)):
+        legacy = min(
+            measure(LegacyWorkerPool(WORKERS), jobs) for _ in range(3)
+        )
+        direct = min(
+            measure(WorkerPool(max_workers=WORKERS), jobs) for _ in range(3)
+        )
+        print(
+            f"{name:>10}: legacy {legacy * 1e6:6.2f} us/job  "
+            f"direct {direct * 1e6:6.2f} us/job"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,35 @@
 import logging
-import queue
-from time import sleep
-from typing import Any
 from threaded.dispatcher import dummy_producer
-from threaded.executor import WorkerPool, ConsumerWithQueue
-
-
-def io_bound_task(task: Any) -> str:
-    logging.debug(msg=f"IO-bound: {task}")
-    sleep(10)
-    logging.debug(msg=f"IO-bound done: {task}")
-    return f"{task} (path found)"
-
-
-def execute_task(task: Any) -> str:
-    logging.debug(msg=f"Execution-bound: {task}")
-    sleep(5)
-    logging.debug(msg=f"Execution-bound done: {task}")
-    return f"{task} (completed)"
-
-
-class SimplePipeline:
-    def __init__(self) -> None:
-        # one pool (with big number of workers) for io-bound, non-blocking
-        # tasks and another pool with single worker for execution
-        # (can only perform one task at once)
-        self.path_waiters_pool = WorkerPool(
-            max_requests=1,
-            max_workers=10,
-            name="io-bound-pool",
-        )
-        self.execution_pool = WorkerPool(max_workers=1, name="exec-pool")
-
-        # pending -> execution_awaiting -> completed
-        self.pending_tasks: queue.Queue[Any] = queue.Queue()
-        self.execution_awaiting_tasks: queue.Queue[Any] = queue.Queue()
-        self.completed_tasks: queue.Queue[Any] = queue.Queue()
-
-        # these consumers connect the queues together
-        # however, the idea was to submit callables, not primitive types
-        # to achieve step skipping (e.g., one task might not
-        # be waiting for io-bound
-        # step or not occupy the execution slot, which is a critical area)
-        self.io_bound_consumer = ConsumerWithQueue(
-            self.pending_tasks,
-            self.__submit_to_path_waiters,
-            name="io-bound-consumer",
-        )
-        self.execution_consumer = ConsumerWithQueue(
-            self.execution_awaiting_tasks,
-            self.__submit_to_execution,
-            name="execution-bound-consumer",
-        )
-        self.final_consumer = ConsumerWithQueue(
-            self.completed_tasks,
-            lambda task: logging.info(msg=task),
-            name="final-consumer",
-        )
-
-    def __submit_to_execution(self, task: Any) -> Any:
-        self.execution_pool.submit(
-            lambda: execute_task(task), self.completed_tasks
-        )
-
-    def __submit_to_path_waiters(self, task: Any) -> Any:
-        self.path_waiters_pool.submit(
-            lambda: io_bound_task(task), self.execution_awaiting_tasks
-        )
-
-    def schedule(self, task: Any) -> None:
-        self.pending_tasks.put(task)
-
-    def run_until_complete(self) -> None:
-        self.path_waiters_pool.run_until_complete()
-        self.io_bound_consumer.stop()
-        self.execution_pool.run_until_complete()
-        self.execution_consumer.stop()
-        self.final_consumer.stop()
+from threaded.executor import execute_task, io_bound_task
+from threaded.graph import StageGraph
 
 
 def main() -> None:
 
-    api = SimplePipeline()
+    # the same pipeline as threaded.executor.SimplePipeline, but
+    # even numbers skip the execution stage (they do not need
+    # the execution slot, which is a critical area)
+    api = (
+        StageGraph()
+        .stage("io-bound", io_bound_task, workers=10, buffer=10)
+        .stage(
+            "exec",
+            execute_task,
+            workers=1,
+            skip=lambda task: int(task.split()[0]) % 2 == 0,
+            fusable=False,
+        )
+        .stage("final", lambda task: logging.info(msg=task))
+        .chain("io-bound", "exec", "final")
+        .build()
+    )
 
     for p in dummy_producer():
         api.schedule(p)
 
     api.run_until_complete()
+    for name, stats in api.stats().items():
+        logging.info(msg=f"{name}: {stats}")
 
 
 if __name__ == "__main__":
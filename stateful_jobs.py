@@ -1,13 +1,16 @@
 import random
 from threaded.dispatcher import dummy_producer
 from threaded.jobs import SimpleJob, Pipeline
+from threaded.routing import AdaptiveRouter
 
 
 def main() -> None:
 
     random.seed(42)
 
-    api = Pipeline()
+    # the flags of these jobs are derived from their retries,
+    # the router corrects them from the way the jobs run
+    api = Pipeline(router=AdaptiveRouter())
 
     for i, p in enumerate(dummy_producer()):
         api.schedule(SimpleJob(f"job-{i}", p))
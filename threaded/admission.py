@@ -0,0 +1,82 @@
+import queue
+import threading
+from time import monotonic
+from typing import Optional
+
+
+class OverloadedError(queue.Full):
+    """Raised instead of accepting a job while the queue is overloaded.
+    Being a `queue.Full`, it is handled wherever a full queue is"""
+
+    def __init__(self, sojourn: float, target: float) -> None:
+        super().__init__(
+            f"queue wait of {sojourn:.3f}s stays above {target:.3f}s"
+        )
+        self.sojourn = sojourn
+        self.target = target
+
+
+class AdmissionControl:
+    """
+    CoDel-style admission control. The queue reports the sojourn time
+    (time spent waiting in the queue) of every item it hands out.
+    Once even the smallest sojourn stays above `target` for a whole
+    `interval`, the queue has a standing backlog it cannot work off,
+    and new jobs are rejected with `OverloadedError` until an item
+    makes it through below the target or the queue drains.
+    """
+
+    def __init__(self, target: float = 0.005, interval: float = 0.1) -> None:
+        if target <= 0 or interval <= 0:
+            raise ValueError("target and interval must be positive")
+        self.target = target
+        self.interval = interval
+        self.__lock = threading.Lock()
+        # when the sojourn went above the target plus the interval
+        self.__above_until: Optional[float] = None
+        self.__overloaded = False
+        self.__last_sojourn = 0.0
+        self.__rejected = 0
+
+    @property
+    def overloaded(self) -> bool:
+        return self.__overloaded
+
+    @property
+    def rejected(self) -> int:
+        return self.__rejected
+
+    def admit(self) -> None:
+        """Lets a new job in unless overloaded
+
+        Raises:
+            OverloadedError: if the queue is overloaded
+        """
+        if not self.__overloaded:
+            return
+        with self.__lock:
+            self.__rejected += 1
+        raise OverloadedError(self.__last_sojourn, self.target)
+
+    def observe(
+        self, sojourn: float, empty: bool, now: Optional[float] = None
+    ) -> None:
+        """Accounts for an item leaving the queue
+
+        Args:
+            sojourn (float): time the item spent in the queue
+            empty (bool): whether the queue is empty after it
+            now (Optional[float], optional): current time.
+                Defaults to time.monotonic().
+        """
+        now = monotonic() if now is None else now
+        with self.__lock:
+            self.__last_sojourn = sojourn
+            if sojourn < self.target or empty:
+                # a good item or no backlog at all, the queue is fine
+                self.__above_until = None
+                self.__overloaded = False
+            elif self.__above_until is None:
+                self.__above_until = now + self.interval
+            elif now >= self.__above_until:
+                self.__overloaded = True
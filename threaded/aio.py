@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, Set
+
+
+async def _nothing(_: Any) -> None:
+    pass
+
+
+class AsyncDispatcherLoop:
+    """
+    Same as `DispatcherLoop`, but dispatches requests to coroutines.
+    Runs an asyncio event loop in a separate thread and keeps at most
+    `max_concurrency` dispatches in flight on it, which lets
+    IO-bound dispatchers wait on thousands of requests without
+    spending a thread on each of them.
+
+    Requests may be submitted from any thread: they are appended
+    to an inbox under a lock and the event loop is only woken up
+    when the inbox goes from empty to non-empty.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1024,
+        max_requests: int = 0,
+        dispatcher: Callable[[Any], Awaitable[None]] = _nothing,
+        name: Optional[str] = None,
+    ) -> None:
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        self.__max_concurrency = max_concurrency
+        self.__max_requests = max_requests
+        self.dispatch = dispatcher
+        self.__name = name
+        self.__running = False
+        self.__done = False
+
+        self.__lock = threading.Lock()
+        self.__inbox: Deque[Any] = deque()
+        # requests which did not make it to a dispatch yet
+        self.__backlog = 0
+        self.__loop = asyncio.new_event_loop()
+        self.__wakeup: Optional[asyncio.Event] = None
+
+    def run(self) -> None:
+        """Launches the event loop in a separate thread, thus
+        this call will not block the caller thread
+
+        Raises:
+            RuntimeError: if called once already running
+        """
+        if self.__running:
+            raise RuntimeError("already running dispatch")
+        self.__running = True
+        self.__thread = threading.Thread(
+            name=self.__name if self.__name else "async-dispatcher",
+            target=self.__run_event_loop,
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stops the loop by insertion of None item.
+        This will not stop the loop immediately, rather
+        once it reaches the None item and all the dispatches end
+
+        Raises:
+            RuntimeError: if called on stopped dispatcher
+        """
+        with self.__lock:
+            if self.__done:
+                raise RuntimeError("already stopped")
+            self.__done = True
+            self.__push(None)
+
+    def run_until_completed(self) -> None:
+        self.__thread.join()
+
+    def submit(self, job: Any) -> None:
+        """Delegates a task to the loop. Safe to call from any thread
+
+        Args:
+            job (Any): payload to pass to the dispatcher
+
+        Raises:
+            RuntimeError: if called once loop is already dead
+            queue.Full: if `max_requests` requests are already waiting
+        """
+        with self.__lock:
+            if self.__done:
+                raise RuntimeError("cannot submit to a dead loop")
+            if 0 < self.__max_requests <= self.__backlog:
+                raise queue.Full
+            self.__backlog += 1
+            self.__push(job)
+
+    def __push(self, job: Any) -> None:
+        # the caller holds the lock
+        self.__inbox.append(job)
+        if len(self.__inbox) == 1:
+            self.__loop.call_soon_threadsafe(self.__wake)
+
+    def __wake(self) -> None:
+        if self.__wakeup is not None:
+            self.__wakeup.set()
+
+    def __run_event_loop(self) -> None:
+        logging.debug(msg="starts loop")
+        asyncio.set_event_loop(self.__loop)
+        try:
+            self.__loop.run_until_complete(self.__serve())
+        finally:
+            self.__loop.close()
+        logging.debug(msg="...loop done")
+
+    async def __serve(self) -> None:
+        self.__wakeup = asyncio.Event()
+        slots = asyncio.Semaphore(self.__max_concurrency)
+        in_flight: Set["asyncio.Task[None]"] = set()
+
+        last = False
+        while not last:
+            self.__wakeup.clear()
+            with self.__lock:
+                batch, self.__inbox = self.__inbox, deque()
+            if not batch:
+                await self.__wakeup.wait()
+                continue
+            for job in batch:
+                if job is None:
+                    last = True
+                    break
+                await slots.acquire()
+                with self.__lock:
+                    self.__backlog -= 1
+                task = self.__loop.create_task(self.__dispatch_one(job))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: slots.release())
+
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def __dispatch_one(self, job: Any) -> None:
+        try:
+            await self.dispatch(job)
+        except Exception as e:
+            logging.error(msg=f"dispatch failed: {e!r}")
@@ -0,0 +1,221 @@
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Callable, Deque, List, Tuple
+
+
+@dataclass(frozen=True)
+class ScalingDecision:
+    at: float
+    size: int
+    reason: str
+
+
+@dataclass(frozen=True)
+class ScalingStats:
+    size: int
+    busy: int
+    queued: int
+    # moving averages
+    service_time: float
+    utilisation: float
+    decisions: List[ScalingDecision]
+
+
+WorkItem = Tuple["Future[Any]", Callable[..., Any], tuple, dict]
+
+
+class AutoscalingExecutor(Executor):
+    """
+    Thread pool which grows and shrinks between `min_workers`
+    and `max_workers`.
+
+    A worker is added when a job has to queue (no worker is idle)
+    and the expected wait, estimated from the queue depth and the
+    moving average of the service time, exceeds `target_wait`.
+    A worker retires after staying idle for `idle_timeout`, but not
+    earlier than `cooldown` after the last time the pool grew,
+    so that a bursty load does not make the pool thrash, and only
+    while the moving average of the utilisation says the remaining
+    workers can take over its share of the load.
+    """
+
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: int = 32,
+        target_wait: float = 0.01,
+        idle_timeout: float = 5.0,
+        cooldown: float = 1.0,
+        smoothing: float = 0.1,
+        name: str = "autoscaling-pool",
+    ) -> None:
+        if not 0 <= min_workers <= max_workers or max_workers == 0:
+            raise ValueError("expected 0 <= min_workers <= max_workers > 0")
+        self.min_workers, self.max_workers = min_workers, max_workers
+        self.__target_wait = target_wait
+        self.__idle_timeout = idle_timeout
+        self.__cooldown = cooldown
+        self.__smoothing = smoothing
+        self.__name = name
+
+        self.__lock = threading.Condition()
+        self.__queue: Deque[WorkItem] = deque()
+        self.__workers = 0
+        self.__busy = 0
+        self.__service_time = 0.0
+        self.__utilisation = 0.0
+        self.__grown_at = float("-inf")
+        self.__decisions: Deque[ScalingDecision] = deque(maxlen=64)
+        self.__ids = itertools.count()
+        self.__threads: List[threading.Thread] = []
+        self.__shutdown = False
+        with self.__lock:
+            for _ in range(min_workers):
+                self.__spawn("min_workers")
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> "Future[Any]":
+        f: "Future[Any]" = Future()
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self.__queue.append((f, fn, args, kwargs))
+            if self.__should_grow():
+                self.__spawn("expected wait above target")
+            self.__lock.notify()
+        return f
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__lock:
+            self.__shutdown = True
+            if cancel_futures:
+                while self.__queue:
+                    self.__queue.popleft()[0].cancel()
+            # the workers exit once the queue is drained
+            self.__lock.notify_all()
+            threads = list(self.__threads)
+        if wait:
+            for t in threads:
+                t.join()
+
+    def stats(self) -> ScalingStats:
+        with self.__lock:
+            return ScalingStats(
+                size=self.__workers,
+                busy=self.__busy,
+                queued=len(self.__queue),
+                service_time=self.__service_time,
+                utilisation=self.__utilisation,
+                decisions=list(self.__decisions),
+            )
+
+    def __should_grow(self) -> bool:
+        # the caller holds the lock
+        if self.__shutdown or self.__workers >= self.max_workers:
+            return False
+        idle = self.__workers - self.__busy
+        queued = len(self.__queue)
+        if queued <= idle:
+            return False
+        if self.__workers == 0:
+            return True
+        expected_wait = queued * self.__service_time / self.__workers
+        # until the first job is done, the service time is not known
+        return (
+            self.__service_time == 0.0 or expected_wait > self.__target_wait
+        )
+
+    def __spawn(self, reason: str) -> None:
+        # the caller holds the lock
+        self.__workers += 1
+        self.__grown_at = monotonic()
+        self.__record(reason)
+        t = threading.Thread(
+            name=f"{self.__name}_{next(self.__ids)}",
+            target=self.__work,
+            daemon=True,
+        )
+        self.__threads.append(t)
+        t.start()
+
+    def __record(self, reason: str) -> None:
+        decision = ScalingDecision(monotonic(), self.__workers, reason)
+        self.__decisions.append(decision)
+        logging.debug(msg=f"{self.__name}: {decision}")
+
+    def __should_retire(self) -> bool:
+        # the caller holds the lock; an idle worker looking is
+        # a sample of the utilisation as well
+        self.__observe_utilisation()
+        workers = self.__workers
+        return (
+            workers > self.min_workers
+            and monotonic() - self.__grown_at >= self.__cooldown
+            and self.__utilisation * workers <= workers - 1
+        )
+
+    def __work(self) -> None:
+        while True:
+            with self.__lock:
+                idle_since = monotonic()
+                while not self.__queue:
+                    if self.__shutdown:
+                        self.__retire("shutdown")
+                        return
+                    left = idle_since + self.__idle_timeout - monotonic()
+                    if left > 0:
+                        self.__lock.wait(left)
+                    elif self.__should_retire():
+                        self.__retire("idle")
+                        return
+                    elif self.__workers <= self.min_workers:
+                        self.__lock.wait()
+                    else:
+                        # still cooling down after the pool grew,
+                        # or the others are too busy to go without it
+                        cooled_at = self.__grown_at + self.__cooldown
+                        self.__lock.wait(max(cooled_at - monotonic(), 1e-3))
+                item = self.__queue.popleft()
+                self.__busy += 1
+                self.__observe_utilisation()
+
+            f, fn, args, kwargs = item
+            start = monotonic()
+            if f.set_running_or_notify_cancel():
+                try:
+                    f.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    f.set_exception(e)
+            elapsed = monotonic() - start
+
+            with self.__lock:
+                self.__busy -= 1
+                self.__service_time = self.__average(
+                    self.__service_time, elapsed
+                )
+                self.__observe_utilisation()
+                # the new estimate may reveal a backlog
+                if self.__should_grow():
+                    self.__spawn("expected wait above target")
+
+    def __retire(self, reason: str) -> None:
+        # the caller holds the lock
+        self.__workers -= 1
+        self.__threads.remove(threading.current_thread())
+        self.__record(reason)
+
+    def __observe_utilisation(self) -> None:
+        # the caller holds the lock
+        busy = self.__busy / self.__workers if self.__workers else 0.0
+        self.__utilisation = self.__average(self.__utilisation, busy)
+
+    def __average(self, average: float, sample: float) -> float:
+        if average == 0.0:
+            return sample
+        return average + self.__smoothing * (sample - average)
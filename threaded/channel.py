@@ -0,0 +1,169 @@
+import queue
+import threading
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Deque, List, Optional
+
+
+class _Sleeper:
+    """One side of a channel, waiting for the other one to make
+    progress. The other side only sets the event when asked to"""
+
+    __slots__ = ("waiting", "event")
+
+    def __init__(self) -> None:
+        self.waiting = False
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        # once is enough, it looks at the channel again anyway
+        if self.waiting:
+            self.waiting = False
+            self.event.set()
+
+    def sleep_until(
+        self, ready: Callable[[], bool], timeout: Optional[float]
+    ) -> bool:
+        if timeout is not None and timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        until = None if timeout is None else monotonic() + timeout
+        try:
+            while not ready():
+                # announce the wait first, then look once more: the
+                # other side either sees the flag or made us ready
+                self.waiting = True
+                self.event.clear()
+                if ready():
+                    break
+                remaining = None if until is None else until - monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.event.wait(remaining)
+        finally:
+            self.waiting = False
+        return True
+
+
+class SPSCChannel:
+    """
+    Channel between exactly one producer thread and one consumer
+    thread, usable in place of a `queue.Queue` on such a link.
+    Items go through a `collections.deque`, whose `append` and
+    `popleft` are atomic, so neither side takes a lock unless it has
+    to wait: the consumer sleeps on an event only when the channel
+    is empty, the producer only when it is full.
+
+    `task_done` and `join` behave as in `queue.Queue`.
+    More than one thread on either side is not supported.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self.maxsize = maxsize
+        self.__items: Deque[Any] = deque()
+        self.__reader = _Sleeper()
+        self.__writer = _Sleeper()
+        # each counter is only ever written by one of the sides
+        self.__put = 0
+        self.__done = 0
+        self.__all_done = threading.Condition()
+
+    def qsize(self) -> int:
+        return len(self.__items)
+
+    def empty(self) -> bool:
+        return not self.__items
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self.__items)
+
+    def put(
+        self,
+        item: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Same as `queue.Queue.put`
+
+        Raises:
+            queue.Full: if there was no place within the timeout
+        """
+        if self.full() and not (
+            block and self.__writer.sleep_until(self.__has_place, timeout)
+        ):
+            raise queue.Full
+        self.__items.append(item)
+        self.__put += 1
+        self.__reader.wake()
+
+    def put_nowait(self, item: Any) -> None:
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """Same as `queue.Queue.get`
+
+        Raises:
+            queue.Empty: if no item arrived within the timeout
+        """
+        try:
+            item = self.__items.popleft()
+        except IndexError:
+            if not (
+                block and self.__reader.sleep_until(self.__has_item, timeout)
+            ):
+                raise queue.Empty
+            item = self.__items.popleft()
+        self.__writer.wake()
+        return item
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def get_many(
+        self,
+        max_items: int,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        """Waits for an item, then takes whatever else is already there,
+        up to `max_items`. A `None` item closes the batch
+
+        Raises:
+            queue.Empty: if no item arrived within the timeout
+        """
+        items = [self.get(block, timeout)]
+        popleft = self.__items.popleft
+        while len(items) < max_items and items[-1] is not None:
+            try:
+                items.append(popleft())
+            except IndexError:
+                break
+        self.__writer.wake()
+        return items
+
+    def task_done(self) -> None:
+        self.task_done_many(1)
+
+    def task_done_many(self, n: int) -> None:
+        """Same as calling `task_done` n times
+
+        Raises:
+            ValueError: if called more times than there were items
+        """
+        done = self.__done + n
+        if done > self.__put:
+            raise ValueError("task_done() called too many times")
+        self.__done = done
+        if done == self.__put:
+            with self.__all_done:
+                self.__all_done.notify_all()
+
+    def join(self) -> None:
+        with self.__all_done:
+            while self.__done < self.__put:
+                self.__all_done.wait()
+
+    def __has_item(self) -> bool:
+        return bool(self.__items)
+
+    def __has_place(self) -> bool:
+        return len(self.__items) < self.maxsize
@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class _Node:
+    __slots__ = (
+        "job",
+        "predecessors",
+        "successors",
+        "waiting",
+        "rank",
+        "outside",
+    )
+
+    def __init__(self, job: Any, outside: bool = False) -> None:
+        self.job = job
+        # started outside the graph, only waited for
+        self.outside = outside
+        self.predecessors: List["_Node"] = []
+        self.successors: List["_Node"] = []
+        # predecessors which have not finished yet
+        self.waiting = 0
+        self.rank = 0.0
+
+
+class DependencyScheduler:
+    """
+    Releases jobs once all the jobs they come `after` have finished,
+    at most `max_running` of them at once. Of the jobs ready to run,
+    the one with the longest remaining critical path (its expected
+    runtime plus the longest chain of jobs depending on it) goes
+    first, which keeps the makespan of a graph short.
+
+    `runtime` gives the expected runtime of a job, or None if it is
+    not known, in which case the mean of the known ones is assumed
+    (or 1, counting jobs, if none is known). Released jobs are
+    handed to `release`, which is called without holding the lock.
+
+    Jobs which are `done` are remembered for as long as they exist,
+    the jobs added after them do not run them again.
+    """
+
+    def __init__(
+        self,
+        release: Callable[[Any], None],
+        runtime: Callable[[Any], Optional[float]] = lambda job: None,
+        max_running: int = 10,
+    ) -> None:
+        if max_running < 1:
+            raise ValueError("max_running must be positive")
+        self.__release = release
+        self.__runtime = runtime
+        self.__max_running = max_running
+        self.__lock = threading.Lock()
+        # the jobs of the graph which have not finished, by id
+        self.__nodes: Dict[int, _Node] = {}
+        self.__ready: List[Tuple[float, int, _Node]] = []
+        self.__arrivals = itertools.count()
+        self.__running = 0
+        # the jobs which are done and the ones started outside
+        # the graph which are not, by id
+        self.__finished: weakref.WeakValueDictionary[int, Any] = (
+            weakref.WeakValueDictionary()
+        )
+        self.__outside: weakref.WeakValueDictionary[int, Any] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__nodes)
+
+    def tracks(self, job: Any) -> bool:
+        with self.__lock:
+            return id(job) in self.__nodes
+
+    def rank(self, job: Any) -> Optional[float]:
+        """Remaining critical path of an unfinished job of the graph"""
+        with self.__lock:
+            node = self.__nodes.get(id(job))
+            return node.rank if node is not None else None
+
+    def started(self, job: Any) -> None:
+        """Tells that the job runs outside the graph: the jobs added
+        after it wait for it to be `done` instead of running it"""
+        with self.__lock:
+            self.__finished.pop(id(job), None)
+            self.__outside[id(job)] = job
+
+    def add(self, jobs: Iterable[Any]) -> None:
+        """Adds the jobs along with the ones they come after which are
+        not in the graph yet. Of the latter, the ones which are done
+        are not run again and the ones `started` outside the graph
+        are waited for
+
+        Raises:
+            ValueError: if the jobs depend on each other in a cycle
+        """
+        with self.__lock:
+            new: Dict[int, _Node] = {}
+            stack = [(job, False) for job in jobs]
+            while stack:
+                job, before = stack.pop()
+                key = id(job)
+                if key in self.__nodes or key in new:
+                    continue
+                if before and key in self.__finished:
+                    continue
+                if before and key in self.__outside:
+                    new[key] = _Node(job, outside=True)
+                    continue
+                self.__finished.pop(key, None)
+                new[key] = _Node(job)
+                stack.extend((after, True) for after in job.after)
+            _check_acyclic(new)
+            for node in new.values():
+                if node.outside:
+                    continue
+                for job in node.job.after:
+                    before = new.get(id(job)) or self.__nodes.get(id(job))
+                    if before is None:
+                        # done already
+                        continue
+                    before.successors.append(node)
+                    node.predecessors.append(before)
+                    node.waiting += 1
+            self.__nodes.update(new)
+            self.__rank()
+            for node in new.values():
+                if not node.waiting and not node.outside:
+                    self.__push(node)
+            # the ranks of the jobs already waiting may have grown
+            self.__ready = [(-n.rank, i, n) for _, i, n in self.__ready]
+            heapq.heapify(self.__ready)
+            released = self.__pop_ready()
+        for job in released:
+            self.__release(job)
+
+    def done(self, job: Any) -> bool:
+        """Marks the job finished, which may release the ones after it.
+        Returns False if the job is not in the graph"""
+        with self.__lock:
+            self.__outside.pop(id(job), None)
+            self.__finished[id(job)] = job
+            node = self.__nodes.pop(id(job), None)
+            if node is None:
+                return False
+            if not node.outside:
+                self.__running -= 1
+            for following in self.__following(node):
+                following.waiting -= 1
+                if not following.waiting:
+                    self.__push(following)
+            released = self.__pop_ready()
+        for job in released:
+            self.__release(job)
+        return True
+
+    def fail(self, job: Any) -> bool:
+        """Drops the failed job along with all the jobs depending on it.
+        Returns False if the job is not in the graph"""
+        with self.__lock:
+            self.__outside.pop(id(job), None)
+            node = self.__nodes.pop(id(job), None)
+            if node is None:
+                return False
+            if not node.outside:
+                self.__running -= 1
+            dropped = 0
+            stack = list(node.successors)
+            while stack:
+                following = stack.pop()
+                if self.__nodes.pop(id(following.job), None) is not None:
+                    dropped += 1
+                    stack.extend(following.successors)
+            released = self.__pop_ready()
+        logging.error(msg=f"{job.name} failed, dropped {dropped} after it")
+        for job in released:
+            self.__release(job)
+        return True
+
+    def __push(self, node: _Node) -> None:
+        # the caller holds the lock
+        entry = (-node.rank, next(self.__arrivals), node)
+        heapq.heappush(self.__ready, entry)
+
+    def __pop_ready(self) -> List[Any]:
+        # the caller holds the lock
+        released = []
+        while self.__ready and self.__running < self.__max_running:
+            node = heapq.heappop(self.__ready)[-1]
+            self.__running += 1
+            released.append(node.job)
+        return released
+
+    def __rank(self) -> None:
+        # the caller holds the lock; goes from the last jobs backwards,
+        # a job is ranked once all the jobs after it are
+        nodes = self.__nodes
+        estimates = {key: self.__runtime(n.job) for key, n in nodes.items()}
+        known = [e for e in estimates.values() if e is not None]
+        unknown = sum(known) / len(known) if known else 1.0
+        left = {
+            key: len(self.__following(n)) for key, n in nodes.items()
+        }
+        stack = [nodes[key] for key, count in left.items() if not count]
+        while stack:
+            node = stack.pop()
+            expected = estimates[id(node.job)]
+            if expected is None:
+                expected = unknown
+            node.rank = expected + max(
+                (f.rank for f in self.__following(node)), default=0.0
+            )
+            for before in node.predecessors:
+                key = id(before.job)
+                if key in left:
+                    left[key] -= 1
+                    if not left[key]:
+                        stack.append(before)
+
+    def __following(self, node: _Node) -> List[_Node]:
+        # the caller holds the lock; skips the jobs dropped by `fail`
+        return [f for f in node.successors if id(f.job) in self.__nodes]
+
+
+def _check_acyclic(nodes: Dict[int, _Node]) -> None:
+    # only the new jobs may form a cycle, the ones in the graph
+    # already do not come after any of them
+    state: Dict[int, bool] = {}  # False while on the path, True once done
+    for start in nodes.values():
+        if id(start.job) in state:
+            continue
+        path = [(start.job, iter(start.job.after))]
+        state[id(start.job)] = False
+        while path:
+            job, after = path[-1]
+            before = next(after, None)
+            if before is None:
+                state[id(job)] = True
+                path.pop()
+            elif id(before) not in nodes or state.get(id(before)):
+                continue
+            elif id(before) in state:
+                raise ValueError(f"{job.name} depends on itself")
+            else:
+                state[id(before)] = False
+                path.append((before, iter(before.after)))
@@ -1,10 +1,27 @@
 import logging
-import queue
+import os
 import random
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from time import sleep
-from typing import Any, Callable, Iterable, Optional
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+from time import monotonic, sleep
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .admission import AdmissionControl
+from .queues import Request, RequestQueue
+from .stats import DispatchMetrics, DispatchStats
+
+# what the loop takes from the queue at once: the routine to call,
+# its argument, the requests behind it and whether it was the last one
+Pulled = Tuple[Callable[[Any], None], Any, List[Request], bool]
 
 
 class Stateful:
@@ -24,6 +41,43 @@ class DispatcherLoop:
     to the provided `on_job` callback. Note that this callback will
     be triggered from different threads and thus should take
     care of sync/blocks.
+
+    At most `max_in_flight` requests are handed to the executor
+    at once: the loop only pulls the next request from the queue
+    once a slot frees up, so a bounded `max_requests` queue gives
+    the producers real backpressure. Requests complete out of order,
+    each one is marked done as soon as its own dispatch returns.
+
+    If `dispatch_batch` is given, the loop works in batch mode instead:
+    it collects up to `max_batch` requests (or whatever arrives within
+    `linger` seconds after the first one) and hands the whole list
+    to `dispatch_batch`. A batch occupies a single in-flight slot.
+
+    Requests are served in the order defined by the `requests` queue
+    (FIFO by default, see `PriorityDeadlineQueue` for an alternative).
+    A request whose deadline passes while it is still queued is
+    discarded instead of being dispatched, such requests are counted
+    in `expired`.
+
+    Requests submitted with a `key` are dispatched one at a time
+    and in the order of submission per key when the queue is
+    a `KeyedQueue`, while the requests of different keys still
+    run in parallel.
+
+    Requests may also name their `producer`: a `FairQueue` shares
+    the dispatcher between the producers according to their weights,
+    so that a chatty one does not starve the others.
+
+    With `admission` control, `submit` rejects new jobs with
+    `OverloadedError` while the queue wait stays above its target.
+
+    Dispatches run on a `ThreadPoolExecutor` of `max_workers` unless
+    another `executor` is given (e.g., an `AutoscalingExecutor`).
+
+    If `instrument` is set, the loop timestamps every request when
+    it is submitted, started and finished, and keeps counters and
+    latency histograms readable through `stats`. Otherwise none of
+    this bookkeeping takes place.
     """
 
     def __init__(
@@ -32,14 +86,62 @@ class DispatcherLoop:
         max_requests: int = 0,
         dispatcher: Callable[[Any], None] = lambda _: None,
         name: Optional[str] = None,
+        max_in_flight: Optional[int] = None,
+        dispatch_batch: Optional[Callable[[List[Any]], None]] = None,
+        max_batch: int = 64,
+        linger: float = 0.0,
+        requests: Optional[RequestQueue] = None,
+        admission: Optional[AdmissionControl] = None,
+        executor: Optional[Executor] = None,
+        instrument: bool = False,
     ) -> None:
         self.__max_workers = max_workers
-        self.__requests: "queue.Queue[Any]" = queue.Queue(maxsize=max_requests)
+        # the loop shuts the executor down once done
+        self.__executor = executor
+        if max_in_flight is None:
+            # keep the workers busy while the loop waits for the queue,
+            # the default pool size mirrors the one of ThreadPoolExecutor
+            workers = (
+                max_workers
+                or getattr(executor, "max_workers", None)
+                or min(32, (os.cpu_count() or 1) + 4)
+            )
+            max_in_flight = 2 * workers
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be positive")
+        self.__slots = threading.BoundedSemaphore(max_in_flight)
+        if max_batch <= 0:
+            raise ValueError("max_batch must be positive")
+        self.__max_batch, self.__linger = max_batch, linger
+        if requests is None:
+            requests = RequestQueue(maxsize=max_requests)
+        elif max_requests:
+            raise ValueError("bound the given requests queue instead")
+        self.__requests = requests
+        self.__admission = admission
+        self.__expired = 0
+        self.__metrics = DispatchMetrics() if instrument else None
         self.dispatch = dispatcher
+        self.dispatch_batch = dispatch_batch
         self.__name = name
         self.__running = False
         self.__done = False
 
+    @property
+    def expired(self) -> int:
+        """Number of requests discarded because of their deadline"""
+        return self.__expired
+
+    def stats(self) -> DispatchStats:
+        """Snapshot of the counters, gauges and latency histograms
+
+        Raises:
+            RuntimeError: if the loop is not instrumented
+        """
+        if self.__metrics is None:
+            raise RuntimeError("instrumentation is disabled")
+        return self.__metrics.snapshot(queued=self.__requests.qsize())
+
     def run(self) -> None:
         """Launches the dispatcher in a separate thread, thus
         this call will not block the caller thread
@@ -73,29 +175,198 @@ class DispatcherLoop:
     def run_until_completed(self) -> None:
         self.__loop.join()
 
-    def submit(self, job: Any, timeout: Optional[float] = None) -> None:
+    def submit(
+        self,
+        job: Any,
+        timeout: Optional[float] = None,
+        block: bool = False,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        key: Optional[Hashable] = None,
+        producer: Optional[Hashable] = None,
+    ) -> None:
         """Delegates a task to the loop. Tries to put item into the queue
 
         Args:
             job (Any): payload to pass to the dispatcher
             timeout (Optional[float], optional): put timeout. Defaults to None.
+            block (bool, optional): wait for a free place in the queue
+                instead of failing right away. Defaults to False.
+            priority (int, optional): lower values are served first
+                (if the queue respects priorities). Defaults to 0.
+            deadline (Optional[float], optional): seconds after which
+                the job is dropped if it did not leave the queue yet.
+                Defaults to None.
+            key (Optional[Hashable], optional): jobs with the same key
+                run in order, one at a time (if the queue respects keys).
+                Defaults to None.
+            producer (Optional[Hashable], optional): the source of the
+                job, used to share the loop fairly (if the queue respects
+                producers). Defaults to None.
 
         Raises:
             RuntimeError: if called once loop is already dead
+            queue.Full: if the queue has no place for the job
+            OverloadedError: if rejected by the admission control
         """
         if self.__done:
             raise RuntimeError("cannot submit to a dead loop")
-        self.__requests.put(job, timeout=timeout, block=False)
+        if self.__admission is not None:
+            self.__admission.admit()
+        self.__requests.put(
+            self.__wrap(job, priority, deadline, key, producer),
+            timeout=timeout,
+            block=block,
+        )
+        if self.__metrics is not None:
+            self.__metrics.on_submit(1)
+
+    def submit_many(
+        self,
+        jobs: Iterable[Any],
+        timeout: Optional[float] = None,
+        block: bool = False,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        key: Optional[Hashable] = None,
+        producer: Optional[Hashable] = None,
+    ) -> None:
+        """Delegates several tasks to the loop at once. The queue lock
+        is taken a single time for the whole list
+
+        Args:
+            jobs (Iterable[Any]): payloads to pass to the dispatcher
+            timeout (Optional[float], optional): put timeout. Defaults to None.
+            block (bool, optional): wait until all the jobs fit into
+                the queue instead of failing right away. Defaults to False.
+            priority (int, optional): same as for `submit`, applies
+                to every job. Defaults to 0.
+            deadline (Optional[float], optional): same as for `submit`,
+                applies to every job. Defaults to None.
+            key (Optional[Hashable], optional): same as for `submit`,
+                applies to every job. Defaults to None.
+            producer (Optional[Hashable], optional): same as for `submit`,
+                applies to every job. Defaults to None.
+
+        Raises:
+            RuntimeError: if called once loop is already dead
+            queue.Full: if the queue has no place for the jobs
+            OverloadedError: if rejected by the admission control
+        """
+        if self.__done:
+            raise RuntimeError("cannot submit to a dead loop")
+        if self.__admission is not None:
+            self.__admission.admit()
+        requests = [
+            self.__wrap(job, priority, deadline, key, producer)
+            for job in jobs
+        ]
+        self.__requests.put_many(requests, timeout=timeout, block=block)
+        if self.__metrics is not None:
+            self.__metrics.on_submit(len(requests))
+
+    @staticmethod
+    def __wrap(
+        job: Any,
+        priority: int,
+        deadline: Optional[float],
+        key: Optional[Hashable],
+        producer: Optional[Hashable],
+    ) -> Request:
+        if deadline is not None:
+            deadline += monotonic()
+        return Request(job, priority, deadline, key, producer)
+
+    def __discard(self, requests: List[Request]) -> None:
+        self.__expired += len(requests)
+        if self.__metrics is not None:
+            self.__metrics.on_expire(len(requests))
+        self.__complete(requests)
+
+    def __complete(self, requests: List[Request]) -> None:
+        for r in requests:
+            self.__requests.release(r.key)
+        self.__requests.task_done_many(len(requests))
+
+    def __pull_one(self) -> Pulled:
+        request = self.__requests.get()
+        if request is None:
+            return self.dispatch, None, [], True
+        now = monotonic()
+        if self.__admission is not None:
+            self.__admission.observe(
+                now - request.submitted, self.__requests.empty(), now
+            )
+        if request.expired(now):
+            self.__discard([request])
+            return self.dispatch, None, [], False
+        return self.dispatch, request.payload, [request], False
+
+    def __pull_batch(self) -> Pulled:
+        batch = self.__requests.get_many(self.__max_batch, self.__linger)
+        last = batch[-1] is None
+        if last:
+            batch.pop()
+        now = monotonic()
+        if self.__admission is not None and batch:
+            # CoDel looks at the smallest sojourn
+            freshest = max(r.submitted for r in batch)
+            self.__admission.observe(
+                now - freshest, self.__requests.empty(), now
+            )
+        live = [r for r in batch if not r.expired(now)]
+        if len(live) < len(batch):
+            self.__discard([r for r in batch if r.expired(now)])
+        payloads = [r.payload for r in live]
+        return self.dispatch_batch, payloads, live, last  # type: ignore
 
     def __run_dispatch_loop(self) -> None:
         logging.debug(msg="starts loop")
-        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
-            for _ in executor.map(
-                self.dispatch, iter(self.__requests.get, None)
-            ):
-                self.__requests.task_done()
+        pull = self.__pull_batch if self.dispatch_batch else self.__pull_one
+        executor = self.__executor or ThreadPoolExecutor(
+            max_workers=self.__max_workers
+        )
+        with executor:
+            last = False
+            while not last:
+                # a request leaves the queue only when it can be
+                # handed to a worker, thus the queue stays bounded
+                self.__slots.acquire()
+                routine, payload, requests, last = pull()
+                if not requests:
+                    self.__slots.release()
+                    continue
+                if self.__metrics is not None:
+                    routine = partial(self.__timed, routine, requests)
+                executor.submit(routine, payload).add_done_callback(
+                    partial(self.__on_dispatched, requests)
+                )
         logging.debug(msg="...loop done")
 
+    def __timed(
+        self,
+        routine: Callable[[Any], None],
+        requests: List[Request],
+        payload: Any,
+    ) -> None:
+        metrics: DispatchMetrics = self.__metrics  # type: ignore
+        start = monotonic()
+        metrics.on_start((r.submitted for r in requests), start)
+        failed = True
+        try:
+            routine(payload)
+            failed = False
+        finally:
+            metrics.on_finish(len(requests), monotonic() - start, failed)
+
+    def __on_dispatched(
+        self, requests: List[Request], f: "Future[None]"
+    ) -> None:
+        if f.exception() is not None:
+            logging.error(msg=f"dispatch failed: {f.exception()!r}")
+        self.__complete(requests)
+        self.__slots.release()
+
 
 def dummy_producer(spawn_items: int = 10) -> Iterable[int]:
     logging.info(msg=f"I will produce {spawn_items} things and exit")
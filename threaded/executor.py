@@ -1,112 +1,404 @@
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 import logging
 import queue
 import threading
-from time import sleep
-from typing import Any, Callable, Optional
+from time import monotonic, sleep
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from .admission import AdmissionControl
+from .graph import StageGraph, StageStats
+from .channel import SPSCChannel
+from .queues import RequestQueue
+from .registry import ExecutorRegistry
+from .memo import SingleFlight
+from .resources import ResourceScheduler
+
+# what a consumer can read from
+Channel = Union["queue.Queue[Any]", SPSCChannel]
+# what a pool can put the results into
+Sink = Union["queue.Queue[Any]", "ConsumerWithQueue"]
 
 
 @dataclass
 class JobWithCb:
     routine: Callable[[], Any]
-    result: queue.Queue[Any]
+    result: Sink
+    errors: Optional[queue.Queue[BaseException]] = None
+    submitted: float = field(default_factory=monotonic)
 
 
 class WorkerPool:
+    """
+    Runs the submitted routines on a pool of workers and puts
+    their results into the channels given along with them.
+
+    Routines are handed to the executor right away, from the thread
+    which submits them. At most `max_requests` of them (if positive)
+    may be waiting for a worker at once, further submits fail with
+    `queue.Full` or, if `block` is set, wait for a place.
+
+    Given a `SingleFlight`, routines submitted with the same `key`
+    while one of them is in flight (or cached) are not run again,
+    they all get the result of the first one.
+    """
+
     def __init__(
         self,
         max_workers: Optional[int] = None,
         max_requests: int = 0,
         name: Optional[str] = None,
+        admission: Optional[AdmissionControl] = None,
+        executor: Optional[Executor] = None,
+        flight: Optional[SingleFlight] = None,
     ) -> None:
-        self.__requests: "queue.Queue[Optional[JobWithCb]]" = queue.Queue(
-            maxsize=max_requests
-        )
+        self.__max_requests = max_requests
+        # jobs submitted, but not yet started by a worker
+        self.__pending = 0
+        self.__has_place = threading.Condition()
+        # rejects jobs with OverloadedError once they wait for too long
+        self.__admission = admission
         self.__name = name if name else "worker-pool"
-        self.__workers = max_workers
-        self.__loop = threading.Thread(
-            name=self.__name,
-            target=self.__dispatch_loop,
-            daemon=True,
+        self.__executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=self.__name,
         )
-        self.__loop.start()
+        self.__flight = flight
         self.__done = False
 
     def submit(
         self,
         routine: Callable[[], Any],
-        once_done: queue.Queue[Any],
+        once_done: Sink,
         timeout: Optional[float] = None,
-    ) -> None:
+        errors: Optional[queue.Queue[BaseException]] = None,
+        block: bool = False,
+        resources: Optional[Iterable[Hashable]] = None,
+        key: Optional[Hashable] = None,
+        rank: Optional[float] = None,
+    ) -> "Future[Any]":
+        """Schedules the routine, its result will be put into `once_done`
+
+        Args:
+            routine (Callable[[], Any]): the work to do
+            once_done (Sink): channel (or consumer) for the result
+            timeout (Optional[float], optional): time to wait for a place.
+                Defaults to None.
+            errors (Optional[queue.Queue[BaseException]], optional):
+                channel for the exception raised by the routine, if any.
+                Defaults to None (the exception is logged).
+            block (bool, optional): wait for a place if `max_requests`
+                jobs are pending instead of failing right away.
+                Defaults to False.
+            resources (Optional[Iterable[Hashable]], optional): names
+                of the resources the routine holds while it runs, the
+                pool has to run on a `ResourceScheduler`.
+                Defaults to None.
+            key (Optional[Hashable], optional): routines with the same
+                key are identical, the pool has to have a `SingleFlight`.
+                Defaults to None.
+            rank (Optional[float], optional): the routines waiting for
+                their resources with a lower rank go first, the pool has
+                to run on a `ResourceScheduler`. Defaults to None.
+
+        Raises:
+            ValueError: if there are resources (or a rank), but no
+                scheduler for them
+                (or a key, but no flight)
+            RuntimeError: if called once the pool is done
+            queue.Full: if `max_requests` jobs are pending
+            OverloadedError: if rejected by the admission control
+
+        Returns:
+            Future[Any]: future of the routine result
+        """
         if self.__done:
             raise RuntimeError("cannot submit to a dead loop")
-        # propagates the callable and result channel to the worker pool
-        # once done, the result of the future will be put into the given queue
-        # caller might want to block on wait in that queue?
-        self.__requests.put(
-            JobWithCb(routine=routine, result=once_done),
-            timeout=timeout,
-            block=False,
-        )
-        # logging.debug(msg="Submitted")
+        if key is None:
+            f = self.__start(
+                routine, once_done, timeout, errors, block, resources, rank
+            )
+        elif self.__flight is not None:
+            f = self.__flight.submit(
+                key,
+                partial(
+                    self.__start,
+                    routine,
+                    once_done,
+                    timeout,
+                    errors,
+                    block,
+                    resources,
+                    rank,
+                ),
+            )
+        else:
+            raise ValueError("keys need a SingleFlight")
+        f.add_done_callback(partial(self.__deliver, once_done, errors))
+        return f
 
     def run_until_complete(self) -> None:
-        # TODO: there is some sort of a bug
-        # or I do miss something: when called, this method
-        # does not really block on join!
         self.__done = True
-        self.__requests.put(None)
-        self.__loop.join()
+        self.__executor.shutdown(wait=True)
         logging.info(msg=f"{self.__name} exited")
 
-    def __dispatch_loop(self) -> None:
-        logging.debug(msg="starts loop")
-        with ThreadPoolExecutor(
-            max_workers=self.__workers,
-            thread_name_prefix=self.__name,
-        ) as executor:
-            for job in iter(self.__requests.get, None):
-                self.__requests.task_done()
-                executor.submit(job.routine).add_done_callback(
-                    lambda f: job.result.put_nowait(f.result())
-                )
-        logging.info(msg=f"...{self.__name} done")
+    def __start(
+        self,
+        routine: Callable[[], Any],
+        once_done: Sink,
+        timeout: Optional[float],
+        errors: Optional[queue.Queue[BaseException]],
+        block: bool,
+        resources: Optional[Iterable[Hashable]],
+        rank: Optional[float],
+    ) -> "Future[Any]":
+        if resources is None and rank is None:
+            start = self.__executor.submit
+        elif not isinstance(self.__executor, ResourceScheduler):
+            raise ValueError("resources need a ResourceScheduler")
+        elif rank is None:
+            start = partial(self.__executor.submit_using, resources)
+        else:
+            start = partial(
+                self.__executor.submit_ranked, rank, resources or ()
+            )
+        if self.__max_requests <= 0 and self.__admission is None:
+            # nothing to account for until the job starts
+            return start(routine)
+        if self.__admission is not None:
+            self.__admission.admit()
+        self.__take_place(block, timeout)
+        job = JobWithCb(routine=routine, result=once_done, errors=errors)
+        return start(self.__run, job)
+
+    def __take_place(self, block: bool, timeout: Optional[float]) -> None:
+        with self.__has_place:
+            if self.__max_requests > 0 and not self.__has_place.wait_for(
+                lambda: self.__pending < self.__max_requests,
+                timeout=timeout if block else 0,
+            ):
+                raise queue.Full
+            self.__pending += 1
+
+    def __run(self, job: JobWithCb) -> Any:
+        with self.__has_place:
+            self.__pending -= 1
+            empty = self.__pending == 0
+            self.__has_place.notify()
+        if self.__admission is not None:
+            self.__admission.observe(monotonic() - job.submitted, empty)
+        return job.routine()
+
+    @staticmethod
+    def __deliver(
+        result: Sink,
+        errors: Optional[queue.Queue[BaseException]],
+        f: "Future[Any]",
+    ) -> None:
+        if f.cancelled():
+            return
+        e = f.exception()
+        if e is None:
+            result.put_nowait(f.result())
+        elif errors is not None:
+            errors.put_nowait(e)
+        else:
+            logging.error(msg=f"job failed: {e!r}")
 
 
 class ConsumerWithQueue:
+    """
+    Consumes the items of a channel (a `queue.Queue` or, if this is
+    its only consumer and there is a single producer, an `SPSCChannel`)
+    in a thread of its own until a `None` arrives. Either calls
+    `consumer_func` on every item, or, with `batch_func`, takes up to
+    `max_batch` items on each wakeup (as many as are already there)
+    and passes them all at once.
+
+    Given an `executor`, starts no thread: items have to go through
+    `put`, which schedules a job taking whatever is in the channel
+    (a batch at most, then it schedules itself again). Only one such
+    job runs at a time, so the items are still consumed in order.
+
+    Keeps no history of its own: `recieved` counts the items consumed
+    and `recent` holds the last `history` of them.
+    """
+
     def __init__(
         self,
-        input_channel: queue.Queue[Any],
-        consumer_func: Callable[[Any], None],
+        input_channel: Channel,
+        consumer_func: Optional[Callable[[Any], None]] = None,
         name: str = "consumer-with-queue",
+        batch_func: Optional[Callable[[List[Any]], None]] = None,
+        max_batch: int = 64,
+        history: int = 0,
+        executor: Optional[Executor] = None,
     ) -> None:
-        self.recieved = []
+        if (consumer_func is None) == (batch_func is None):
+            raise ValueError("pass either consumer_func or batch_func")
+        if max_batch < 1 or history < 0:
+            raise ValueError("max_batch and history are out of range")
+        self.recieved = 0
+        self.batches = 0
+        self.recent: Deque[Any] = deque(maxlen=history)
         self.__queue = input_channel
         self.consume_task = consumer_func
+        self.consume_batch = batch_func
+        self.__max_batch = max_batch
+        self.__history = history
+        self.__executor = executor
         self.__lock = threading.Lock()
+        # whether a job taking the items is scheduled on the executor
+        self.__scheduled = False
+        self.__name = name
 
-        def routine():
-            for task in iter(self.__queue.get, None):
-                self.consume_task(task)
-                with self.__lock:
-                    self.recieved += [task]
-                self.__queue.task_done()
-
-            logging.debug(msg=f"Recieved in total: {len(self.recieved)}")
-
-        threading.Thread(
-            daemon=False,
-            name=name,
-            target=routine,
-        ).start()
+        if executor is None:
+            threading.Thread(
+                daemon=False,
+                name=name,
+                target=self.__consume if batch_func is None else self.__drain,
+            ).start()
 
     @property
-    def queue(self) -> queue.Queue[Any]:
+    def queue(self) -> Channel:
         return self.__queue
 
+    def put(
+        self,
+        item: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Puts the item into the channel and makes sure the consumer
+        runs on its executor, if it has one
+
+        Raises:
+            queue.Full: if there was no place in the channel
+        """
+        self.__queue.put(item, block, timeout)
+        if self.__executor is None:
+            return
+        with self.__lock:
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        self.__executor.submit(self.__take)
+
+    def put_nowait(self, item: Any) -> None:
+        self.put(item, block=False)
+
     def stop(self) -> None:
-        self.__queue.put(None)
+        self.put(None)
+
+    def __consume(self) -> None:
+        for task in iter(self.__queue.get, None):
+            self.consume_task(task)
+            self.recieved += 1
+            if self.__history:
+                self.recent.append(task)
+            self.__queue.task_done()
+
+        self.__queue.task_done()
+        logging.debug(msg=f"Recieved in total: {self.recieved}")
+
+    def __drain(self) -> None:
+        stopped = False
+        while not stopped:
+            batch = _take_batch(self.__queue, self.__max_batch)
+            stopped = batch[-1] is None
+            if stopped:
+                batch.pop()
+            if batch:
+                self.__handle(batch)
+            # the None is marked done as well, so that join returns
+            _done(self.__queue, len(batch) + stopped)
+
+        logging.debug(
+            msg=f"Recieved in total: {self.recieved} "
+            f"in {self.batches} batches"
+        )
+
+    def __take(self) -> None:
+        batch = []
+        while len(batch) < self.__max_batch:
+            try:
+                batch.append(self.__queue.get_nowait())
+            except queue.Empty:
+                break
+            if batch[-1] is None:
+                break
+        stopped = bool(batch) and batch[-1] is None
+        if stopped:
+            batch.pop()
+        if batch:
+            # there is no thread to die, the items that fail are logged
+            self.__handle(batch, guarded=True)
+        _done(self.__queue, len(batch) + stopped)
+        if stopped:
+            # stays scheduled, nothing is taken after the None
+            logging.debug(msg=f"Recieved in total: {self.recieved}")
+            return
+
+        # items put after this check schedule a job of their own
+        with self.__lock:
+            if self.__queue.empty():
+                self.__scheduled = False
+                return
+        self.__executor.submit(self.__take)
+
+    def __handle(self, batch: List[Any], guarded: bool = False) -> None:
+        if self.consume_batch is not None:
+            self.__call(self.consume_batch, batch, guarded)
+        else:
+            for task in batch:
+                self.__call(self.consume_task, task, guarded)
+        self.recieved += len(batch)
+        self.batches += 1
+        if self.__history:
+            self.recent.extend(batch)
+
+    def __call(self, func: Callable[[Any], None], arg: Any, guarded: bool):
+        if not guarded:
+            func(arg)
+            return
+        try:
+            func(arg)
+        except Exception as e:
+            logging.error(msg=f"{self.__name} failed: {e!r}")
+
+
+def _take_batch(channel: Channel, max_items: int) -> List[Any]:
+    # waits for the first item, then takes whatever else is there
+    # (up to the limit) and stops after the end-of-stream None
+    if isinstance(channel, (RequestQueue, SPSCChannel)):
+        return channel.get_many(max_items)
+    items = [channel.get()]
+    while len(items) < max_items and items[-1] is not None:
+        try:
+            items.append(channel.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+def _done(channel: Channel, n: int) -> None:
+    if isinstance(channel, (RequestQueue, SPSCChannel)):
+        channel.task_done_many(n)
+        return
+    for _ in range(n):
+        channel.task_done()
 
 
 def io_bound_task(task: Any) -> str:
@@ -124,59 +416,29 @@ def execute_task(task: Any) -> str:
 
 
 class SimplePipeline:
-    def __init__(self) -> None:
-        # one pool (with big number of workers) for io-bound, non-blocking
-        # tasks and another pool with single worker for execution
+    def __init__(self, executors: Optional[ExecutorRegistry] = None) -> None:
+        # one stage (with big number of workers) for io-bound, non-blocking
+        # tasks and another stage with single worker for execution
         # (can only perform one task at once)
-        self.path_waiters_pool = WorkerPool(
-            max_requests=1,
-            max_workers=10,
-            name="io-bound-pool",
-        )
-        self.execution_pool = WorkerPool(max_workers=1, name="exec-pool")
-
-        # pending -> execution_awaiting -> completed
-        self.pending_tasks: queue.Queue[Any] = queue.Queue()
-        self.execution_awaiting_tasks: queue.Queue[Any] = queue.Queue()
-        self.completed_tasks: queue.Queue[Any] = queue.Queue()
-
-        # these consumers connect the queues together
-        # however, the idea was to submit callables, not primitive types
-        # to achieve step skipping (e.g., one task might not
-        # be waiting for io-bound
-        # step or not occupy the execution slot, which is a critical area)
-        self.io_bound_consumer = ConsumerWithQueue(
-            self.pending_tasks,
-            self.__submit_to_path_waiters,
-            name="io-bound-consumer",
-        )
-        self.execution_consumer = ConsumerWithQueue(
-            self.execution_awaiting_tasks,
-            self.__submit_to_execution,
-            name="execution-bound-consumer",
-        )
-        self.final_consumer = ConsumerWithQueue(
-            self.completed_tasks,
-            lambda task: logging.info(msg=task),
-            name="final-consumer",
-        )
-
-    def __submit_to_execution(self, task: Any) -> Any:
-        self.execution_pool.submit(
-            lambda: execute_task(task), self.completed_tasks
-        )
-
-    def __submit_to_path_waiters(self, task: Any) -> Any:
-        self.path_waiters_pool.submit(
-            lambda: io_bound_task(task), self.execution_awaiting_tasks
+        # pending -> execution_awaiting -> completed, all the buffers
+        # in between are bounded, so a busy stage holds back the ones
+        # before it and, in the end, the caller of schedule; the
+        # execution slot is not fused, so logging does not hold it;
+        # the stages run on the shared executors of the registry
+        self.graph = (
+            StageGraph()
+            .stage("io-bound", io_bound_task, workers=10, buffer=10)
+            .stage("exec", execute_task, workers=1, buffer=1, fusable=False)
+            .stage("final", lambda task: logging.info(msg=task))
+            .chain("io-bound", "exec", "final")
         )
+        self.pipeline = self.graph.build(executors=executors)
 
     def schedule(self, task: Any) -> None:
-        self.pending_tasks.put(task)
+        self.pipeline.schedule(task)
+
+    def stats(self) -> Dict[str, StageStats]:
+        return self.pipeline.stats()
 
     def run_until_complete(self) -> None:
-        self.path_waiters_pool.run_until_complete()
-        self.io_bound_consumer.stop()
-        self.execution_pool.run_until_complete()
-        self.execution_consumer.stop()
-        self.final_consumer.stop()
+        self.pipeline.run_until_complete()
@@ -0,0 +1,396 @@
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .registry import ExecutorRegistry, ExecutorView, registry
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    routine: Callable[[Any], Any]
+    workers: int = 1
+    # how many items may wait in front of the stage
+    buffer: int = 1
+    # items it holds for are passed on as they are
+    skip: Optional[Callable[[Any], bool]] = None
+    # may run in the same call chain as its neighbours
+    fusable: bool = True
+
+
+@dataclass(frozen=True)
+class StageStats:
+    processed: int
+    skipped: int
+    failed: int
+    # items per second since the pipeline started
+    throughput: float
+    # share of the buffer and of the workers in use
+    occupancy: float
+    busy: float
+
+
+class StageGraph:
+    """
+    Declares a pipeline as a graph of stages. Every stage runs its
+    routine on up to `workers` workers at once and passes the result
+    to each of its successors (fan-out); a stage with several
+    predecessors takes items from all of them (fan-in). Items
+    scheduled to the pipeline go to every stage without predecessors.
+
+        graph = StageGraph()
+        graph.stage("paths", io_bound_task, workers=10, buffer=10)
+        graph.stage("exec", execute_task)
+        graph.chain("paths", "exec")
+        pipeline = graph.build()
+
+    Unless disabled, `build` fuses every stage into its predecessor
+    when that is the only predecessor, the stage is its only successor
+    and both have the same number of workers: the fused stage runs
+    both routines one after the other in a single worker call, which
+    saves a buffer handoff and an executor job per item. A stage
+    declared with `fusable=False` (e.g., one holding a resource)
+    is never fused.
+    """
+
+    def __init__(self) -> None:
+        self.__stages: Dict[str, Stage] = {}
+        self.__edges: List[Tuple[str, str]] = []
+
+    def stage(
+        self,
+        name: str,
+        routine: Callable[[Any], Any],
+        workers: int = 1,
+        buffer: int = 1,
+        skip: Optional[Callable[[Any], bool]] = None,
+        fusable: bool = True,
+    ) -> "StageGraph":
+        if name in self.__stages:
+            raise ValueError(f"stage {name} is already declared")
+        if workers <= 0 or buffer <= 0:
+            raise ValueError("workers and buffer must be positive")
+        self.__stages[name] = Stage(
+            name, routine, workers, buffer, skip, fusable
+        )
+        return self
+
+    def edge(self, source: str, destination: str) -> "StageGraph":
+        for name in (source, destination):
+            if name not in self.__stages:
+                raise ValueError(f"no stage named {name}")
+        if (source, destination) not in self.__edges:
+            self.__edges.append((source, destination))
+        return self
+
+    def chain(self, *names: str) -> "StageGraph":
+        for source, destination in zip(names, names[1:]):
+            self.edge(source, destination)
+        return self
+
+    @property
+    def stages(self) -> List[Stage]:
+        return list(self.__stages.values())
+
+    @property
+    def edges(self) -> List[Tuple[str, str]]:
+        return list(self.__edges)
+
+    def build(
+        self, fuse: bool = True, executors: Optional[ExecutorRegistry] = None
+    ) -> "GraphPipeline":
+        """Checks the graph, fuses the stages and starts the pipeline
+        on the executors of the registry (the process-wide one
+        by default)
+
+        Raises:
+            ValueError: if the graph is empty or has a cycle
+        """
+        if not self.__stages:
+            raise ValueError("no stages declared")
+        order = self.__topological_order()
+        groups = [[self.__stages[name]] for name in order]
+        edges = self.edges
+        if fuse:
+            groups, edges = self.__fuse(groups, edges)
+        return GraphPipeline(groups, edges, executors)
+
+    @staticmethod
+    def __fuse(
+        groups: List[List[Stage]], edges: List[Tuple[str, str]]
+    ) -> Tuple[List[List[Stage]], List[Tuple[str, str]]]:
+        # groups come in topological order and are named after
+        # their first stage, so a chain folds into its head
+        fused: Dict[str, List[Stage]] = {}
+        tail_of: Dict[str, str] = {}
+        for group in groups:
+            stage = group[0]
+            sources = [s for s, d in edges if d == stage.name]
+            if len(sources) == 1:
+                source = sources[0]
+                head = tail_of.get(source, source)
+                tail = fused[head][-1]
+                alone = [d for s, d in edges if s == source] == [stage.name]
+                if (
+                    alone
+                    and stage.fusable
+                    and tail.fusable
+                    and stage.workers == tail.workers
+                ):
+                    fused[head].append(stage)
+                    tail_of[stage.name] = head
+                    continue
+            fused[stage.name] = list(group)
+
+        def rename(name: str) -> str:
+            return tail_of.get(name, name)
+
+        kept = [(rename(s), rename(d)) for s, d in edges if d not in tail_of]
+        return list(fused.values()), kept
+
+    def __topological_order(self) -> List[str]:
+        inputs = {name: 0 for name in self.__stages}
+        for _, destination in self.__edges:
+            inputs[destination] += 1
+        ready = [name for name, n in inputs.items() if n == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for source, destination in self.__edges:
+                if source == name:
+                    inputs[destination] -= 1
+                    if inputs[destination] == 0:
+                        ready.append(destination)
+        if len(order) < len(self.__stages):
+            raise ValueError("stages form a cycle")
+        return order
+
+
+class _RunningStage:
+    # the lock of the pipeline guards all of it
+    def __init__(
+        self, parts: List[Stage], inputs: int, view: ExecutorView
+    ) -> None:
+        # fused stages run on the workers and buffer of the first one
+        self.parts = parts
+        self.stage = stage = parts[0]
+        self.name = "+".join(part.name for part in parts)
+        self.view = view
+        self.inbox: Deque[Any] = deque()
+        self.successors: List["_RunningStage"] = []
+        # items done with which wait for a place in a successor, along
+        # with the index of that successor; each keeps a worker busy,
+        # the same as a thread blocked on a full buffer
+        self.parked: Deque[List[Any]] = deque()
+        self.running = 0
+        # the pipeline itself feeds the stages without predecessors
+        self.inputs = max(inputs, 1)
+        self.ended = 0
+        self.closed = False
+        self.processed = self.skipped = self.failed = 0
+        self.started = monotonic()
+
+    def has_place(self) -> bool:
+        return len(self.inbox) < self.stage.buffer
+
+    def has_worker(self) -> bool:
+        return self.running + len(self.parked) < self.stage.workers
+
+    def stats(self) -> StageStats:
+        elapsed = monotonic() - self.started
+        return StageStats(
+            processed=self.processed,
+            skipped=self.skipped,
+            failed=self.failed,
+            throughput=self.processed / elapsed if elapsed else 0.0,
+            occupancy=len(self.inbox) / self.stage.buffer,
+            busy=self.running / self.stage.workers,
+        )
+
+    def run(self, item: Any) -> Tuple[Any, bool, bool]:
+        # called without the lock, returns the item with whether it
+        # skipped any of the routines and whether it failed
+        skipped = False
+        for part in self.parts:
+            try:
+                if part.skip is not None and part.skip(item):
+                    skipped = True
+                    continue
+                item = part.routine(item)
+            except Exception as e:
+                logging.error(msg=f"{part.name} failed: {e!r}")
+                return item, skipped, True
+        return item, skipped, False
+
+
+class GraphPipeline:
+    """
+    Runtime of a `StageGraph`. Starts no threads: every stage runs
+    on a view of the "stages" executor of the registry with a quota
+    of its workers, so any number of pipelines share the same
+    threads. The executor is sized for a single pipeline unless
+    it is registered (or created) beforehand.
+
+    All the buffers between the stages are bounded, so a slow stage
+    holds back its predecessors and, eventually, the callers of
+    `schedule`. An item which does not fit into the buffer of
+    a successor keeps its worker busy, but not its thread.
+    """
+
+    def __init__(
+        self,
+        groups: List[List[Stage]],
+        edges: List[Tuple[str, str]],
+        executors: Optional[ExecutorRegistry] = None,
+    ):
+        executors = executors or registry
+        executors.executor(
+            "stages", max_workers=sum(group[0].workers for group in groups)
+        )
+        self.__lock = threading.Condition()
+        # each group is a chain of fused stages, named after its head
+        inputs = {group[0].name: 0 for group in groups}
+        for _, destination in edges:
+            inputs[destination] += 1
+        running = {
+            group[0].name: _RunningStage(
+                group,
+                inputs[group[0].name],
+                executors.view(group[0].workers, "stages"),
+            )
+            for group in groups
+        }
+        for source, destination in edges:
+            running[source].successors.append(running[destination])
+        self.__sources = [
+            running[name] for name, n in inputs.items() if n == 0
+        ]
+        # in topological order, as the groups come
+        self.__stages = {r.name: r for r in running.values()}
+        self.__eliminated = sum(len(group) - 1 for group in groups)
+        if self.__eliminated:
+            logging.debug(
+                msg=f"fused {self.__eliminated} handoffs: "
+                f"{[n for n, r in self.__stages.items() if len(r.parts) > 1]}"
+            )
+        self.__done = False
+
+    def schedule(self, item: Any, timeout: Optional[float] = None) -> None:
+        """Passes the item to the first stages, waits while they are full
+
+        Raises:
+            RuntimeError: if the pipeline is stopped
+            queue.Full: if there was no place within the timeout
+        """
+        if self.__done:
+            raise RuntimeError("cannot schedule to a stopped pipeline")
+        with self.__lock:
+            if not self.__lock.wait_for(
+                lambda: all(s.has_place() for s in self.__sources),
+                timeout=timeout,
+            ):
+                raise queue.Full
+            for source in self.__sources:
+                source.inbox.append(item)
+            ready = self.__pump()
+        self.__start(ready)
+
+    @property
+    def handoffs_eliminated(self) -> int:
+        """How many stage-to-stage buffers fusion has removed"""
+        return self.__eliminated
+
+    def stats(self) -> Dict[str, StageStats]:
+        """Stats by running stage, fused ones are named `a+b`"""
+        with self.__lock:
+            return {name: s.stats() for name, s in self.__stages.items()}
+
+    def run_until_complete(self) -> None:
+        self.__done = True
+        with self.__lock:
+            for source in self.__sources:
+                source.ended += 1
+            ready = self.__pump()
+        self.__start(ready)
+        with self.__lock:
+            self.__lock.wait_for(
+                lambda: all(s.closed for s in self.__stages.values())
+            )
+        for stage in self.__stages.values():
+            stage.view.shutdown(wait=True)
+
+    def __pump(self) -> List[Tuple[_RunningStage, Any]]:
+        # the caller holds the lock; moves the items as far as the
+        # buffers let them and returns the ones to start processing
+        ready: List[Tuple[_RunningStage, Any]] = []
+        moved = True
+        while moved:
+            moved = False
+            for stage in self.__stages.values():
+                moved |= self.__hand_off(stage)
+                while stage.inbox and stage.has_worker():
+                    ready.append((stage, stage.inbox.popleft()))
+                    stage.running += 1
+                    moved = True
+                if stage.closed or stage.ended < stage.inputs:
+                    continue
+                if not stage.inbox and not stage.running and not stage.parked:
+                    # every predecessor is done, and so is the stage
+                    stage.closed = True
+                    moved = True
+                    for successor in stage.successors:
+                        successor.ended += 1
+        self.__lock.notify_all()
+        return ready
+
+    @staticmethod
+    def __hand_off(stage: _RunningStage) -> bool:
+        # the caller holds the lock; the items go to the successors
+        # one after another, in the order they were parked
+        successors = stage.successors
+        moved = False
+        while stage.parked:
+            entry = stage.parked[0]
+            item, i = entry
+            while i < len(successors) and successors[i].has_place():
+                successors[i].inbox.append(item)
+                i += 1
+                moved = True
+            if i < len(successors):
+                entry[1] = i
+                break
+            stage.parked.popleft()
+        return moved
+
+    def __start(self, ready: List[Tuple[_RunningStage, Any]]) -> None:
+        for stage, item in ready:
+            stage.view.submit(self.__process, stage, item)
+
+    def __process(self, stage: _RunningStage, item: Any) -> None:
+        # goes on with the items of the same stage, a buffer worth
+        # at most, then leaves the thread to the other jobs
+        left = stage.stage.buffer
+        while True:
+            item, skipped, failed = stage.run(item)
+            with self.__lock:
+                stage.running -= 1
+                stage.skipped += skipped
+                stage.failed += failed
+                stage.processed += not failed
+                if not failed and stage.successors:
+                    stage.parked.append([item, 0])
+                ready = self.__pump()
+            left -= 1
+            own = next(
+                (i for i, (s, _) in enumerate(ready) if s is stage), None
+            )
+            if not left or own is None:
+                break
+            item = ready.pop(own)[1]
+            self.__start(ready)
+        self.__start(ready)
@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, Optional
+
+from .stats import LatencyHistogram
+
+
+@dataclass(frozen=True)
+class HedgeStats:
+    calls: int
+    hedged: int
+    # hedges which finished before the call they duplicated
+    won: int
+    # seconds a call may take before it is hedged, None until known
+    threshold: Optional[float]
+
+
+class Hedger:
+    """
+    Cuts the tail latency of calls which now and then stall: a call
+    still running after the `percentile` of the recent latencies gets
+    a duplicate, and the first of the two to succeed wins. The other
+    one is cancelled if it has not started yet, ignored otherwise.
+
+    At most `budget` of the calls (0.05 is 5% of extra load) are
+    hedged, and none until `min_samples` latencies are known. The
+    threshold is refreshed every `min_samples` calls from the latencies
+    of the current window of `window` calls.
+
+    Calls run on the executor, while the caller waits for them, so
+    a stage routine made by `wrap` keeps the stage worker busy.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_workers: Optional[int] = None,
+        name: str = "hedger",
+    ) -> None:
+        if not 0 < percentile < 100 or budget < 0:
+            raise ValueError("percentile or budget is out of range")
+        if not 0 < min_samples <= window:
+            raise ValueError("expected 0 < min_samples <= window")
+        self.__owned = executor is None
+        self.__executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name,
+        )
+        self.__percentile = percentile
+        self.__budget = budget
+        self.__window = window
+        self.__min_samples = min_samples
+        self.__lock = threading.Lock()
+        self.__latencies = LatencyHistogram()
+        self.__threshold: Optional[float] = None
+        self.__calls = self.__hedged = self.__won = 0
+
+    def call(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> Any:
+        """Runs `fn` on the executor, hedging it if it is slow,
+        and returns the first result (or raises the error of the
+        original call if both of them fail)"""
+        primary = self.__submit(fn, args, kwargs)
+        with self.__lock:
+            self.__calls += 1
+            threshold = self.__threshold
+        if threshold is None or wait((primary,), threshold).done:
+            return primary.result()
+        with self.__lock:
+            allowed = self.__hedged < self.__budget * self.__calls
+            if allowed:
+                self.__hedged += 1
+        if not allowed:
+            return primary.result()
+
+        hedge = self.__submit(fn, args, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # the original one wins a tie, as it would without hedging
+            for f in sorted(done, key=lambda f: f is hedge):
+                if f.exception() is not None:
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                if f is hedge:
+                    with self.__lock:
+                        self.__won += 1
+                return f.result()
+        return primary.result()
+
+    def wrap(self, func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Makes a hedged routine for a pipeline stage"""
+        return partial(self.call, func)
+
+    def stats(self) -> HedgeStats:
+        with self.__lock:
+            return HedgeStats(
+                calls=self.__calls,
+                hedged=self.__hedged,
+                won=self.__won,
+                threshold=self.__threshold,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self.__owned:
+            self.__executor.shutdown(wait=wait)
+
+    def __submit(
+        self, fn: Callable[..., Any], args: tuple, kwargs: dict
+    ) -> "Future[Any]":
+        f = self.__executor.submit(fn, *args, **kwargs)
+        f.add_done_callback(partial(self.__record, monotonic()))
+        return f
+
+    def __record(self, submitted: float, f: "Future[Any]") -> None:
+        if f.cancelled():
+            return
+        with self.__lock:
+            latencies = self.__latencies
+            latencies.record(monotonic() - submitted)
+            if latencies.count % self.__min_samples == 0:
+                self.__threshold = latencies.percentile(self.__percentile)
+            if latencies.count >= self.__window:
+                self.__latencies = LatencyHistogram()
@@ -1,18 +1,57 @@
 from dataclasses import dataclass
+from functools import partial
 import logging
 import queue
 import random
+import threading
 from time import sleep
-from typing import Any, Callable, Tuple
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from .dag import DependencyScheduler
 from .executor import ConsumerWithQueue, WorkerPool
+from .queues import ShortestJobFirstQueue
+from .registry import ExecutorRegistry, registry
+from .resources import ResourceScheduler
+from .routing import AdaptiveRouter
+from .timers import Backoff, TimerHandle, WheelTimer, timer
+
+# held by the blocking jobs which do not name their resources
+EXECUTION_SLOT = frozenset({"execution-slot"})
+# held instead by the jobs a router makes blocking for being busy
+# on the CPU, so that they take turns without holding the slot
+CPU_SLOT = frozenset({"cpu-slot"})
+
+# what `should_reshedule` returns: False (or None) is done, True is
+# now, a number is a delay in seconds and a backoff is a delay which
+# grows with each reschedule in a row
+Reschedule = Union[None, bool, float, Backoff]
 
 
 class Job:
     name: str
     blocking: bool
+    # what a blocking job holds while it runs, the ones which
+    # do not say share a single execution slot
+    resources: FrozenSet[Hashable] = frozenset()
+    # the jobs which have to be done before this one starts
+    after: Tuple["Job", ...] = ()
+    # whether `blocking` is worked out from something else rather
+    # than set on purpose, so a router may correct it
+    derived: bool = False
 
-    def should_reshedule(self, result: Any) -> bool:
+    def should_reshedule(self, result: Any) -> Reschedule:
         return False
 
     def start(self) -> Any:
@@ -23,8 +62,11 @@ class Job:
 class StatelessJob(Job):
     name: str
     blocking: bool = True
-    should_reshedule: Callable[[Any], bool] = lambda _: False
+    should_reshedule: Callable[[Any], Reschedule] = lambda _: False
     start: Callable[[], Any] = lambda: None
+    resources: FrozenSet[Hashable] = frozenset()
+    after: Tuple[Job, ...] = ()
+    derived: bool = False
 
 
 class SimpleJob(Job):
@@ -35,7 +77,9 @@ class SimpleJob(Job):
         self, name: str, retries: int, blocking: bool = False
     ) -> None:
         self.name = name
+        # a guess, which a router is free to correct
         self.blocking = retries % 5 == 0
+        self.derived = True
         self.tries, self.retries = 0, retries
         self.f = self.some_io_bound if blocking else self.some_atomic
         logging.info(msg=f"{name} {blocking=} {retries=}")
@@ -75,24 +119,110 @@ class SimpleJob(Job):
         return self.reshedule()
 
 
+def keep_latest(pending: Job, new: Job) -> Job:
+    """Coalesces a job into the pending one by running the new one"""
+    return new
+
+
 class Pipeline:
-    def __init__(self) -> None:
-        # one pool (with big number of workers) for io-bound, non-blocking
-        # tasks and another pool with single worker for execution
-        # (can only perform one task at once)
+    """
+    Runs jobs and reschedules them while they ask for it. Starts
+    no threads: the shared pool runs on the "jobs" executor of the
+    registry, the blocking jobs on its "execution" executor, so that
+    they never wait for a thread behind io-bound jobs, and the queues
+    are drained on its "pipelines" executor. Any number of pipelines
+    share the same workers. The executors are sized for a single
+    pipeline unless they are registered (or created) beforehand.
+
+    Blocking jobs hold their `resources` while they run: the ones
+    needing different resources run at once, the ones naming none
+    share a single execution slot.
+
+    Jobs rescheduled with a delay wait on the timer wheel, which
+    takes no worker until they are due.
+
+    Given a router, the pipeline times the jobs and lets the router
+    tell which of them are blocking instead of their flags. The ones
+    it promotes for being busy on the CPU take turns on a slot of
+    their own, `CPU_SLOT`.
+
+    Jobs wait for a place in the pools in the `pending` queue, FIFO
+    by default, which only `schedule` should put them into. Another
+    queue orders them differently, e.g.
+    `ShortestJobFirstQueue(router.runtime)` runs the jobs expected
+    to be quick first, and then blocking jobs wait for their resources
+    in the same order.
+
+    Given `coalesce`, a job scheduled while another one of the same
+    name is pending does not run on its own: `coalesce(pending, new)`
+    tells which job runs in place of the two, e.g. `keep_latest`.
+    The pending job keeps its place in the queue, the jobs left out
+    are done once the kept one is.
+
+    A job coming `after` other jobs is scheduled along with them and
+    starts once they are done (not rescheduled any more), see
+    `DependencyScheduler`: independent jobs run at once and the ones
+    on the longest path to the end of the graph go first. The jobs
+    it comes after run once: the ones already done are not run again
+    and the ones scheduled on their own are waited for. If a job
+    fails, the jobs after it are dropped. Graph jobs are never
+    coalesced.
+    """
+
+    def __init__(
+        self,
+        executors: Optional[ExecutorRegistry] = None,
+        timers: Optional[WheelTimer] = None,
+        router: Optional[AdaptiveRouter] = None,
+        pending: Optional[queue.Queue] = None,
+        coalesce: Optional[Callable[[Job, Job], Job]] = None,
+    ) -> None:
+        executors = executors or registry
+        self.timer = timers or timer
+        self.router = router
+        # reschedules of a job in a row, by id of the job
+        self.__retries: Dict[int, int] = {}
+        self.__sleeping: Dict[int, TimerHandle] = {}
+        self.__lock = threading.Lock()
+        self.__coalesce = coalesce
+        # the job in the queue and the one to run in its place,
+        # by name, if they are coalesced
+        self.__pending: Dict[str, Tuple[Job, Job]] = {}
+        # the jobs left out, by id of the job which runs in their place,
+        # they finish (or fail) along with it
+        self.__merged: Dict[int, List[Job]] = {}
+        self.__coalesced = 0
+        # one pool for io-bound, non-blocking tasks, which may run 10
+        # of them at once, and another one for execution, which runs
+        # one task at once per resource
+        width = 10
+        executors.executor("jobs", max_workers=width)
         self.shared_pool = WorkerPool(
             max_requests=1,
-            max_workers=10,
             name="io-bound-pool",
+            executor=executors.view(width, "jobs"),
+        )
+        # a few threads for the blocking jobs with different resources
+        self.resources = ResourceScheduler(
+            executors.executor("execution", max_workers=4)
         )
         self.atomic_pool = WorkerPool(
-            max_workers=1,
             name="atomic-pool",
+            executor=self.resources,
         )
 
-        # pending -> execution_awaiting -> completed
-        self.pending_jobs: queue.Queue[Job] = queue.Queue()
-        self.resolved_jobs: queue.Queue[Tuple[Job, Any]] = queue.Queue()
+        # pending -> execution_awaiting -> completed; the queues are
+        # only put into through their consumers, which wakes them up
+        self.__pending_jobs: queue.Queue[Job] = (
+            queue.Queue() if pending is None else pending
+        )
+        self.__resolved_jobs: queue.Queue[Tuple[Job, Any]] = queue.Queue()
+
+        # blocking jobs wait for their resources ranked as if they
+        # were still pending
+        self.__rank: Optional[Callable[[Job], float]] = None
+        if isinstance(pending, ShortestJobFirstQueue):
+            self.__rank = pending.rank
 
         # these consumers connect the queues together
         # however, the idea was to submit callables, not primitive types
@@ -100,32 +230,155 @@ class Pipeline:
         # be waiting for io-bound
         # step or not occupy the execution slot, which is a critical area)
         self.pending_jobs_consumer = ConsumerWithQueue(
-            self.pending_jobs,
+            self.__pending_jobs,
             self.__submit_to_execution,
             name="job-queue",
+            # a batch taken out of the queue is no longer reordered
+            max_batch=64 if pending is None else 1,
+            executor=executors.executor("pipelines"),
         )
         self.resolved_jobs_consumer = ConsumerWithQueue(
-            self.resolved_jobs,
+            self.__resolved_jobs,
             self.__resolve,
             name="job-resolved",
+            executor=executors.executor("pipelines"),
         )
+        # graph jobs are released into the queue as soon as they are
+        # ready, at most as many at once as the shared pool runs
+        self.dependencies = DependencyScheduler(
+            self.pending_jobs_consumer.put,
+            runtime=(lambda job: None) if router is None else router.runtime,
+            max_running=width,
+        )
+
+    @property
+    def coalesced(self) -> int:
+        """Number of jobs which ran as a part of another one"""
+        with self.__lock:
+            return self.__coalesced
+
+    def __enqueue(self, j: Job) -> None:
+        if self.__coalesce is None or self.dependencies.tracks(j):
+            self.pending_jobs_consumer.put(j)
+            return
+        with self.__lock:
+            entry = self.__pending.get(j.name)
+            if entry is None:
+                self.__pending[j.name] = (j, j)
+            else:
+                queued, pending = entry
+                kept = self.__coalesce(pending, j)
+                self.__pending[j.name] = (queued, kept)
+                self.__coalesced += 1
+                # the one left out is not going to be rescheduled
+                for dropped in (pending, j):
+                    if dropped is not kept:
+                        self.__retries.pop(id(dropped), None)
+                        merged = self.__merged.setdefault(id(kept), [])
+                        merged.append(dropped)
+                        merged.extend(self.__merged.pop(id(dropped), ()))
+        if entry is None:
+            self.pending_jobs_consumer.put(j)
 
     def __submit_to_execution(self, j: Job) -> Any:
-        pool = self.atomic_pool if j.blocking else self.shared_pool
-        pool.submit(lambda: (j, j.start()), self.resolved_jobs)
+        if self.__coalesce is not None:
+            with self.__lock:
+                # the job in the queue stands for the ones coalesced
+                entry = self.__pending.get(j.name)
+                if entry is not None and entry[0] is j:
+                    j = self.__pending.pop(j.name)[1]
+        if self.router is None:
+            blocking, start = j.blocking, j.start
+        else:
+            blocking = self.router.blocking(j)
+            start = partial(self.router.run, j)
+        if blocking:
+            resources = j.resources or EXECUTION_SLOT
+            if self.router is not None and self.router.promoted(j):
+                resources = CPU_SLOT
+            f = self.atomic_pool.submit(
+                lambda: (j, start()),
+                self.resolved_jobs_consumer,
+                resources=resources,
+                rank=None if self.__rank is None else self.__rank(j),
+            )
+        else:
+            f = self.shared_pool.submit(
+                lambda: (j, start()), self.resolved_jobs_consumer, block=True
+            )
+        # a job waited for by the graph drops the jobs after it
+        f.add_done_callback(partial(self.__failed, j))
         logging.debug(msg=f"Submitted {j.name}")
 
     def __resolve(self, job_and_result: Tuple[Job, Any]) -> Any:
         job, result = job_and_result
-        if not job.should_reshedule(result):
+        delay = self.__delay(job, job.should_reshedule(result))
+        if delay is None:
+            self.__finish(job, self.dependencies.done)
+            return
+        logging.debug(msg=f"Will reshedule: {job.name} in {delay:.3f}s")
+        if delay <= 0:
+            self.__enqueue(job)
             return
-        logging.debug(msg=f"Will reshedule: {job.name}")
-        self.pending_jobs.put(job)
+        # the timer waits for the lock if the job is due at once
+        with self.__lock:
+            self.__sleeping[id(job)] = self.timer.call_later(
+                delay, self.__wake, job
+            )
+
+    def __delay(self, job: Job, decision: Reschedule) -> Optional[float]:
+        if decision is None or decision is False:
+            self.__retries.pop(id(job), None)
+            return None
+        retries = self.__retries.get(id(job), 0)
+        self.__retries[id(job)] = retries + 1
+        if decision is True:
+            return 0.0
+        if isinstance(decision, Backoff):
+            return decision.delay(retries)
+        return float(decision)
+
+    def __wake(self, job: Job) -> None:
+        with self.__lock:
+            # gone if the pipeline is being stopped
+            if self.__sleeping.pop(id(job), None) is None:
+                return
+        self.__enqueue(job)
+
+    def __failed(self, job: Job, f: "Future[Any]") -> None:
+        if f.cancelled() or f.exception() is not None:
+            self.__finish(job, self.dependencies.fail)
+
+    def __finish(self, job: Job, finish: Callable[[Job], bool]) -> None:
+        with self.__lock:
+            merged = self.__merged.pop(id(job), ())
+        # the graph may wait for any of the coalesced jobs
+        for j in (job, *merged):
+            finish(j)
 
     def schedule(self, j: Job) -> None:
-        self.pending_jobs.put(j)
+        """Schedules the job, along with the jobs it comes after"""
+        if j.after:
+            self.dependencies.add((j,))
+        else:
+            self.dependencies.started(j)
+            self.__enqueue(j)
+
+    def schedule_all(self, jobs: Iterable[Job]) -> None:
+        """Schedules a graph of jobs (and the jobs they come after) at
+        once, a job several others come after only runs once
+
+        Raises:
+            ValueError: if the jobs depend on each other in a cycle
+        """
+        self.dependencies.add(jobs)
 
     def run_until_complete(self) -> None:
+        # the jobs waiting to be rescheduled are dropped
+        with self.__lock:
+            for handle in self.__sleeping.values():
+                self.timer.cancel(handle)
+            self.__sleeping.clear()
         self.shared_pool.run_until_complete()
         self.atomic_pool.run_until_complete()
         self.pending_jobs_consumer.stop()
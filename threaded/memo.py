@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class FlightStats:
+    hits: int
+    misses: int
+    # requests which joined a call already in flight
+    joined: int
+    evicted: int
+    expired: int
+    size: int
+
+
+class SingleFlight:
+    """
+    Collapses identical requests: while a call for a key is in
+    flight, further requests for the same key wait for its result
+    instead of making calls of their own. Results (but not errors)
+    are then kept in an LRU cache of `maxsize` entries, for `ttl`
+    seconds if given.
+
+    Use `wrap` for pipeline stages, `submit` for anything returning
+    futures (a `WorkerPool` given the flight does so by itself).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize < 0 or (ttl is not None and ttl <= 0):
+            raise ValueError("maxsize and ttl are out of range")
+        self.__maxsize = maxsize
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        # key -> (expires at, result)
+        self.__cache: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self.__flights: Dict[Hashable, "Future[Any]"] = {}
+        self.__hits = self.__misses = self.__joined = 0
+        self.__evicted = self.__expired = 0
+
+    def submit(
+        self, key: Hashable, start: Callable[[], "Future[Any]"]
+    ) -> "Future[Any]":
+        """Returns the future of the result for the key, calls `start`
+        to begin the work only if it is neither cached nor in flight.
+        Errors raised by `start` itself go to the caller"""
+        with self.__lock:
+            found = self.__found(key)
+            if found is None:
+                leader = self.__flights[key] = Future()
+        if found is not None:
+            return found
+        try:
+            f = start()
+        except BaseException as e:
+            self.__land(key, leader, error=e)
+            raise
+        f.add_done_callback(partial(self.__land_future, key, leader))
+        return leader
+
+    def call(self, key: Hashable, routine: Callable[[], Any]) -> Any:
+        """Returns the result for the key, runs `routine` in the calling
+        thread only if it is neither cached nor in flight"""
+        with self.__lock:
+            found = self.__found(key)
+            if found is None:
+                leader = self.__flights[key] = Future()
+        if found is not None:
+            return found.result()
+        try:
+            result = routine()
+        except BaseException as e:
+            self.__land(key, leader, error=e)
+            raise
+        self.__land(key, leader, result)
+        return result
+
+    def wrap(
+        self,
+        func: Callable[[Any], Any],
+        key: Callable[[Any], Hashable] = lambda item: item,
+    ) -> Callable[[Any], Any]:
+        """Makes a routine for a pipeline stage out of a function
+        of the item, `key` tells which items are identical"""
+        return lambda item: self.call(key(item), partial(func, item))
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__cache.pop(key, None)
+
+    def stats(self) -> FlightStats:
+        with self.__lock:
+            return FlightStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                joined=self.__joined,
+                evicted=self.__evicted,
+                expired=self.__expired,
+                size=len(self.__cache),
+            )
+
+    def __found(self, key: Hashable) -> "Optional[Future[Any]]":
+        # the caller holds the lock; returns a future of the result
+        # if the key is cached or in flight, None if it is a miss
+        entry = self.__cache.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires, result = entry
+            if expires > monotonic():
+                self.__cache.move_to_end(key)
+                self.__hits += 1
+                f: "Future[Any]" = Future()
+                f.set_result(result)
+                return f
+            del self.__cache[key]
+            self.__expired += 1
+        leader = self.__flights.get(key)
+        if leader is not None:
+            self.__joined += 1
+            return leader
+        self.__misses += 1
+        return None
+
+    def __land_future(
+        self, key: Hashable, leader: "Future[Any]", f: "Future[Any]"
+    ) -> None:
+        if f.cancelled():
+            with self.__lock:
+                del self.__flights[key]
+            leader.cancel()
+            return
+        error = f.exception()
+        if error is None:
+            self.__land(key, leader, f.result())
+        else:
+            self.__land(key, leader, error=error)
+
+    def __land(
+        self,
+        key: Hashable,
+        leader: "Future[Any]",
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self.__lock:
+            del self.__flights[key]
+            if error is None and self.__maxsize:
+                ttl = self.__ttl
+                expires = float("inf") if ttl is None else monotonic() + ttl
+                self.__cache[key] = (expires, result)
+                self.__cache.move_to_end(key)
+                while len(self.__cache) > self.__maxsize:
+                    self.__cache.popitem(last=False)
+                    self.__evicted += 1
+        if error is None:
+            leader.set_result(result)
+        else:
+            leader.set_exception(error)
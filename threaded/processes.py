@@ -0,0 +1,180 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from .dispatcher import DispatcherLoop
+
+
+@dataclass(frozen=True)
+class SharedPayload:
+    """A handle to a payload placed in shared memory,
+    this is what actually travels through the pipe"""
+
+    name: str
+    size: int
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        # the segment belongs to the parent process, which unlinks it
+        # once the chunk is done (workers share its resource tracker)
+        shm = shared_memory.SharedMemory(name=self.name)
+        buffer = shm.buf[: self.size]
+        try:
+            yield buffer
+        finally:
+            buffer.release()
+            shm.close()
+
+
+def _nothing(_: Any) -> None:
+    pass
+
+
+# set in every worker process once, so that the dispatcher
+# is not pickled along with each chunk
+_dispatcher: Callable[[Any], None] = _nothing
+
+
+def _install(dispatcher: Callable[[Any], None]) -> None:
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+def _warm_up() -> None:
+    pass
+
+
+def _dispatch_chunk(chunk: List[Any]) -> List[str]:
+    failures = []
+    for job in chunk:
+        try:
+            if isinstance(job, SharedPayload):
+                with job.view() as payload:
+                    _dispatcher(payload)
+            else:
+                _dispatcher(job)
+        except Exception as e:
+            failures.append(repr(e))
+    return failures
+
+
+class ProcessDispatcherLoop:
+    """
+    Dispatches requests to a pool of long-lived worker processes,
+    for dispatchers that are CPU-bound and would be serialised by
+    the GIL in `DispatcherLoop`. The dispatcher must be picklable
+    (e.g., a module-level function), it is sent to every worker
+    once, when the worker starts.
+
+    Requests are grouped into chunks of up to `chunksize` items
+    (a `DispatcherLoop` in batch mode does the grouping), so that
+    a single pickling round-trip is paid per chunk. Byte-like payloads
+    larger than `share_above` bytes are copied into shared memory
+    and the dispatcher receives a `memoryview` of the segment instead
+    (of its bytes, whatever the format of the original view), which
+    is only valid for the duration of the call.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_requests: int = 0,
+        dispatcher: Callable[[Any], None] = _nothing,
+        name: Optional[str] = None,
+        chunksize: int = 64,
+        linger: float = 0.001,
+        share_above: int = 64 * 1024,
+    ) -> None:
+        workers = max_workers or multiprocessing.cpu_count()
+        self.__share_above = share_above
+        self.__pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_install,
+            initargs=(dispatcher,),
+        )
+        # each chunk is shipped from a thread of the loop, which
+        # waits for the result of the worker process
+        self.__loop = DispatcherLoop(
+            max_workers=workers,
+            max_requests=max_requests,
+            dispatch_batch=self.__ship,
+            max_batch=chunksize,
+            linger=linger,
+            name=name if name else "process-dispatcher",
+            max_in_flight=2 * workers,
+        )
+        self.__workers = workers
+
+    def run(self) -> None:
+        """Starts the worker processes and waits until all
+        of them are up, then launches the loop
+
+        Raises:
+            RuntimeError: if called once already running
+        """
+        # forked workers must inherit the tracker of this process,
+        # so that it is the only one to track the shared segments
+        resource_tracker.ensure_running()
+        warm_ups = [
+            self.__pool.submit(_warm_up) for _ in range(self.__workers)
+        ]
+        for f in warm_ups:
+            f.result()
+        self.__loop.run()
+
+    def stop(self) -> None:
+        self.__loop.stop()
+
+    def run_until_completed(self) -> None:
+        self.__loop.run_until_completed()
+        self.__pool.shutdown()
+
+    def submit(
+        self,
+        job: Any,
+        timeout: Optional[float] = None,
+        block: bool = False,
+    ) -> None:
+        self.__loop.submit(job, timeout=timeout, block=block)
+
+    def submit_many(
+        self,
+        jobs: Iterable[Any],
+        timeout: Optional[float] = None,
+        block: bool = False,
+    ) -> None:
+        self.__loop.submit_many(jobs, timeout=timeout, block=block)
+
+    def __ship(self, chunk: List[Any]) -> None:
+        segments = []
+        try:
+            for i, job in enumerate(chunk):
+                if not self.__should_share(job):
+                    continue
+                payload = memoryview(job).cast("B")
+                shm = shared_memory.SharedMemory(
+                    create=True, size=payload.nbytes
+                )
+                # unlinked below even if the copy fails
+                segments.append(shm)
+                shm.buf[: payload.nbytes] = payload
+                chunk[i] = SharedPayload(shm.name, payload.nbytes)
+            failures = self.__pool.submit(_dispatch_chunk, chunk).result()
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+        for failure in failures:
+            logging.error(msg=f"dispatch failed: {failure}")
+
+    def __should_share(self, job: Any) -> bool:
+        # only views which are one run of memory can be copied
+        # byte by byte, whatever the type of their items
+        if not isinstance(job, (bytes, bytearray, memoryview)):
+            return False
+        view = memoryview(job)
+        return view.c_contiguous and view.nbytes > self.__share_above
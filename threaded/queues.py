@@ -0,0 +1,480 @@
+import heapq
+import itertools
+import queue
+from collections import deque
+from dataclasses import dataclass
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+class Request:
+    """
+    Envelope of a submitted job, carries the scheduling
+    hints along with the payload through the request queue
+    """
+
+    __slots__ = (
+        "payload",
+        "priority",
+        "deadline",
+        "key",
+        "producer",
+        "submitted",
+    )
+
+    def __init__(
+        self,
+        payload: Any,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        key: Optional[Hashable] = None,
+        producer: Optional[Hashable] = None,
+    ) -> None:
+        self.payload = payload
+        self.priority = priority
+        # absolute, in terms of time.monotonic()
+        self.deadline = deadline
+        self.key = key
+        self.producer = producer
+        self.submitted = monotonic()
+
+    def expired(self, now: float) -> bool:
+        return self.deadline is not None and self.deadline <= now
+
+
+class RequestQueue(queue.Queue):
+    """
+    A `queue.Queue` which can move several items with a single
+    acquisition of its lock. Subclasses are free to override
+    `_init`, `_qsize`, `_put` and `_get` the same way the standard
+    library queues do, the bulk operations are built on top of those.
+
+    The queue bound is checked against `_occupied`, which is the
+    same as `_qsize` unless a subclass holds items that are not yet
+    available to `get` (see `KeyedQueue`).
+    """
+
+    def put(
+        self,
+        item: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.put_many((item,), block=block, timeout=timeout)
+
+    def put_many(
+        self,
+        items: Iterable[Any],
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Puts all the items at once. If the queue is bounded, waits
+        until there is a place for the whole batch
+
+        Args:
+            items (Iterable[Any]): items to enqueue
+            block (bool, optional): wait for a free place. Defaults to True.
+            timeout (Optional[float], optional): wait timeout.
+                Defaults to None.
+
+        Raises:
+            ValueError: if the batch will never fit into the queue
+            queue.Full: if there is no place for the batch
+        """
+        items = list(items)
+        if not items:
+            return
+        with self.not_full:
+            if self.maxsize > 0:
+                if len(items) > self.maxsize:
+                    raise ValueError("batch does not fit into the queue")
+                self.__wait_for_place(len(items), block, timeout)
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+    def get_many(
+        self,
+        max_items: int,
+        linger: float = 0.0,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        """Takes up to `max_items` items. Once the first item is there,
+        waits at most `linger` seconds for more to arrive. A `None` item
+        closes the batch (it is still returned as the last element)
+
+        Args:
+            max_items (int): batch size limit
+            linger (float, optional): time to wait for the batch to fill
+                up. Defaults to 0.
+            block (bool, optional): wait for the first item.
+                Defaults to True.
+            timeout (Optional[float], optional): first item wait timeout.
+                Defaults to None.
+
+        Raises:
+            queue.Empty: if no item arrived
+
+        Returns:
+            List[Any]: non-empty batch of items
+        """
+        with self.not_empty:
+            self.__wait_for_item(block, timeout)
+            items = [self._get()]
+            until = monotonic() + linger
+            while len(items) < max_items and items[-1] is not None:
+                if self._qsize():
+                    items.append(self._get())
+                    continue
+                remaining = until - monotonic()
+                if remaining <= 0:
+                    break
+                self.not_empty.wait(remaining)
+            self.not_full.notify(len(items))
+            return items
+
+    def task_done_many(self, n: int) -> None:
+        """Same as calling `task_done` n times, under a single lock
+
+        Raises:
+            ValueError: if called more times than there were items
+        """
+        with self.all_tasks_done:
+            unfinished = self.unfinished_tasks - n
+            if unfinished < 0:
+                raise ValueError("task_done() called too many times")
+            if unfinished == 0:
+                self.all_tasks_done.notify_all()
+            self.unfinished_tasks = unfinished
+
+    def release(self, key: Optional[Hashable]) -> None:
+        """Called once a request taken from the queue is done with.
+        Nothing to do for queues that do not track the keys"""
+
+    def _occupied(self) -> int:
+        return self._qsize()
+
+    def __wait_for_place(
+        self, n: int, block: bool, timeout: Optional[float]
+    ) -> None:
+        # same as in queue.Queue.put, the caller holds the mutex
+        if not block:
+            if self.maxsize - self._occupied() < n:
+                raise queue.Full
+        elif timeout is None:
+            while self.maxsize - self._occupied() < n:
+                self.not_full.wait()
+        elif timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        else:
+            until = monotonic() + timeout
+            while self.maxsize - self._occupied() < n:
+                remaining = until - monotonic()
+                if remaining <= 0.0:
+                    raise queue.Full
+                self.not_full.wait(remaining)
+
+    def __wait_for_item(self, block: bool, timeout: Optional[float]) -> None:
+        # same as in queue.Queue.get, the caller holds the mutex
+        if not block:
+            if not self._qsize():
+                raise queue.Empty
+        elif timeout is None:
+            while not self._qsize():
+                self.not_empty.wait()
+        elif timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        else:
+            until = monotonic() + timeout
+            while not self._qsize():
+                remaining = until - monotonic()
+                if remaining <= 0.0:
+                    raise queue.Empty
+                self.not_empty.wait(remaining)
+
+
+class PriorityDeadlineQueue(RequestQueue):
+    """
+    Serves `Request` items with the lowest priority value first
+    and, within the same priority, the one with the earliest deadline
+    first. Requests without a deadline go after those with one, ties
+    are resolved in the order of arrival. The None item is
+    served after everything else.
+    """
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: List[Tuple[float, float, int, Optional[Request]]] = []
+        self.__arrivals = itertools.count()
+
+    def _qsize(self) -> int:
+        return len(self.queue)
+
+    def _put(self, item: Optional[Request]) -> None:
+        if item is None:
+            key: Tuple[float, float] = (float("inf"), float("inf"))
+        elif item.deadline is None:
+            key = (item.priority, float("inf"))
+        else:
+            key = (item.priority, item.deadline)
+        heapq.heappush(self.queue, (*key, next(self.__arrivals), item))
+
+    def _get(self) -> Optional[Request]:
+        return heapq.heappop(self.queue)[-1]
+
+
+class ShortestJobFirstQueue(RequestQueue):
+    """
+    Serves the item expected to take the least time first, which
+    keeps the mean completion time low. `estimate` gives the expected
+    runtime of an item in seconds, or None if it is not known yet,
+    in which case `unknown` is assumed (0 lets the item go first and
+    get measured).
+
+    Each second an item waits takes `aging` seconds off its expected
+    runtime, so long items are not starved by a stream of short
+    ones: with 0 the order is purely by the estimates, the larger
+    `aging` gets, the closer the order is to FIFO. Estimates are taken
+    once, when an item is put. The None item is served after
+    everything else.
+    """
+
+    def __init__(
+        self,
+        estimate: Callable[[Any], Optional[float]],
+        aging: float = 0.1,
+        unknown: float = 0.0,
+        maxsize: int = 0,
+    ) -> None:
+        if aging < 0:
+            raise ValueError("aging must not be negative")
+        self.__estimate = estimate
+        self.__aging = aging
+        self.__unknown = unknown
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: List[Tuple[float, int, Any]] = []
+        self.__arrivals = itertools.count()
+
+    def _qsize(self) -> int:
+        return len(self.queue)
+
+    def rank(self, item: Any) -> float:
+        """Rank of an item put now, the lower the sooner it is served"""
+        if item is None:
+            return float("inf")
+        expected = self.__estimate(item)
+        if expected is None:
+            expected = self.__unknown
+        # the credit for waiting grows at the same pace for all
+        # the items, so it is enough to rank by the arrival time
+        return expected + self.__aging * monotonic()
+
+    def _put(self, item: Any) -> None:
+        rank = self.rank(item)
+        heapq.heappush(self.queue, (rank, next(self.__arrivals), item))
+
+    def _get(self) -> Any:
+        return heapq.heappop(self.queue)[-1]
+
+
+class KeyedQueue(RequestQueue):
+    """
+    Keeps a FIFO lane per `Request.key` and hands out at most one
+    request of a key at a time: the next one becomes available only
+    once the previous one is `release`d. Keys take turns, so a key
+    with a long backlog gets one request per turn and does not hold
+    back the others. Requests without a key are never held back.
+
+    A lane only exists while its key has requests queued or in flight.
+    The None item becomes available once all the lanes are drained.
+    """
+
+    def _init(self, maxsize: int) -> None:
+        self.__lanes: Dict[Optional[Hashable], Deque[Request]] = {}
+        # keys with queued requests and nothing in flight
+        self.__ready: Deque[Optional[Hashable]] = deque()
+        self.__queued = 0
+        self.__stopping = False
+
+    def _qsize(self) -> int:
+        # only what can be taken right away
+        last = self.__stopping and self.__queued == 0
+        return len(self.__ready) + last
+
+    def _occupied(self) -> int:
+        return self.__queued
+
+    def _put(self, item: Optional[Request]) -> None:
+        if item is None:
+            self.__stopping = True
+            return
+        lane = self.__lanes.get(item.key)
+        if lane is None:
+            lane = self.__lanes[item.key] = deque()
+            self.__ready.append(item.key)
+        lane.append(item)
+        self.__queued += 1
+
+    def _get(self) -> Optional[Request]:
+        if not self.__ready:
+            return None
+        key = self.__ready.popleft()
+        lane = self.__lanes[key]
+        item = lane.popleft()
+        self.__queued -= 1
+        if key is None:
+            # requests without a key do not wait for each other
+            if lane:
+                self.__ready.append(key)
+            else:
+                del self.__lanes[key]
+        return item
+
+    def release(self, key: Optional[Hashable]) -> None:
+        if key is None:
+            return
+        with self.mutex:
+            lane = self.__lanes[key]
+            if lane:
+                self.__ready.append(key)
+                self.not_empty.notify()
+            else:
+                del self.__lanes[key]
+
+    @property
+    def keys(self) -> int:
+        """Number of keys with requests queued or in flight"""
+        with self.mutex:
+            return len(self.__lanes)
+
+
+@dataclass
+class ProducerStats:
+    depth: int = 0
+    served: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.served if self.served else 0.0
+
+
+class FairQueue(RequestQueue):
+    """
+    Keeps a FIFO sub-queue per `Request.producer` and drains them
+    by deficit round robin: on its turn, a producer earns `quantum`
+    times its weight worth of requests, so over time every busy producer
+    gets a share of the service proportional to its weight, however
+    many requests the others enqueue. The None item is served
+    after all the sub-queues are drained.
+
+    The depth of each sub-queue and the time its requests spent
+    waiting are reported by `stats`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        weights: Optional[Dict[Hashable, float]] = None,
+        quantum: float = 1.0,
+    ) -> None:
+        if quantum <= 0:
+            raise ValueError("quantum must be positive")
+        self.__weights: Dict[Optional[Hashable], float] = {}
+        for producer, weight in (weights or {}).items():
+            self.set_weight(producer, weight)
+        self.__quantum = quantum
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self.__lanes: Dict[Optional[Hashable], Deque[Request]] = {}
+        # producers with queued requests, the head one has the turn
+        self.__active: Deque[Optional[Hashable]] = deque()
+        self.__deficits: Dict[Optional[Hashable], float] = {}
+        self.__granted = False
+        self.__stats: Dict[Optional[Hashable], ProducerStats] = {}
+        self.__queued = 0
+        self.__stopping = False
+
+    def set_weight(self, producer: Optional[Hashable], weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self.__weights[producer] = weight
+
+    def stats(self) -> Dict[Optional[Hashable], ProducerStats]:
+        """Snapshot of the per-producer statistics"""
+        with self.mutex:
+            return {
+                producer: ProducerStats(**vars(stats))
+                for producer, stats in self.__stats.items()
+            }
+
+    def _qsize(self) -> int:
+        return self.__queued + (self.__stopping and self.__queued == 0)
+
+    def _occupied(self) -> int:
+        return self.__queued
+
+    def _put(self, item: Optional[Request]) -> None:
+        if item is None:
+            self.__stopping = True
+            return
+        producer = item.producer
+        lane = self.__lanes.get(producer)
+        if lane is None:
+            lane = self.__lanes[producer] = deque()
+            self.__active.append(producer)
+            self.__deficits[producer] = 0.0
+        lane.append(item)
+        self.__queued += 1
+        stats = self.__stats.get(producer)
+        if stats is None:
+            stats = self.__stats[producer] = ProducerStats()
+        stats.depth += 1
+
+    def _get(self) -> Optional[Request]:
+        if not self.__queued:
+            return None
+        while True:
+            producer = self.__active[0]
+            if not self.__granted:
+                weight = self.__weights.get(producer, 1.0)
+                self.__deficits[producer] += self.__quantum * weight
+                self.__granted = True
+            if self.__deficits[producer] >= 1:
+                break
+            # out of credit, the turn goes to the next producer
+            self.__active.rotate(-1)
+            self.__granted = False
+
+        self.__deficits[producer] -= 1
+        lane = self.__lanes[producer]
+        item = lane.popleft()
+        self.__queued -= 1
+        if not lane:
+            # an idle producer does not keep its credit
+            del self.__lanes[producer], self.__deficits[producer]
+            self.__active.popleft()
+            self.__granted = False
+
+        wait = monotonic() - item.submitted
+        stats = self.__stats[producer]
+        stats.depth -= 1
+        stats.served += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        return item
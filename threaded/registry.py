@@ -0,0 +1,140 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+WorkItem = Tuple["Future[Any]", Callable[..., Any], tuple, dict]
+
+
+class ExecutorView(Executor):
+    """
+    A share of an executor which other views use as well: runs at
+    most `quota` of its jobs at once on the workers behind it and
+    keeps the rest in a backlog of its own. Owns no threads.
+
+    Shutting a view down only waits for the jobs submitted through
+    it, the executor keeps running for the other views.
+    """
+
+    def __init__(
+        self, executor: Executor, quota: int, name: str = "view"
+    ) -> None:
+        if quota <= 0:
+            raise ValueError("quota must be positive")
+        self.__executor = executor
+        self.__quota = quota
+        self.__name = name
+        self.__lock = threading.Condition()
+        self.__backlog: Deque[WorkItem] = deque()
+        self.__running = 0
+        self.__shutdown = False
+
+    @property
+    def max_workers(self) -> int:
+        return self.__quota
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> "Future[Any]":
+        f: "Future[Any]" = Future()
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            if self.__running >= self.__quota:
+                self.__backlog.append((f, fn, args, kwargs))
+                return f
+            self.__running += 1
+        self.__executor.submit(self.__run, (f, fn, args, kwargs))
+        return f
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__lock:
+            self.__shutdown = True
+            if cancel_futures:
+                while self.__backlog:
+                    self.__backlog.popleft()[0].cancel()
+            if wait:
+                # the slots are only given back once the backlog is empty
+                self.__lock.wait_for(lambda: self.__running == 0)
+
+    def __run(self, item: WorkItem) -> None:
+        f, fn, args, kwargs = item
+        if f.set_running_or_notify_cancel():
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                f.set_exception(e)
+            else:
+                f.set_result(result)
+        # the slot goes to the next job of the view, which queues
+        # up behind the jobs of the other views instead of running
+        # right away on this worker
+        with self.__lock:
+            if not self.__backlog:
+                self.__running -= 1
+                self.__lock.notify_all()
+                return
+            following = self.__backlog.popleft()
+        self.__executor.submit(self.__run, following)
+
+
+class ExecutorRegistry:
+    """
+    Named executors shared by all the pools of the process. Pools
+    take views with a concurrency quota on one of them instead of
+    starting threads of their own, so the number of threads does
+    not depend on the number of pools.
+
+    An executor is created (as a `ThreadPoolExecutor`) the first
+    time its name is asked for, unless one is registered beforehand.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__executors: Dict[str, Executor] = {}
+
+    def register(self, name: str, executor: Executor) -> None:
+        """Makes the registry hand out views on the given executor
+
+        Raises:
+            ValueError: if the name is already taken
+        """
+        with self.__lock:
+            if name in self.__executors:
+                raise ValueError(f"executor {name} is already registered")
+            self.__executors[name] = executor
+
+    def executor(
+        self, name: str = "shared", max_workers: Optional[int] = None
+    ) -> Executor:
+        """Returns the named executor, creating it with `max_workers`
+        (ignored if it exists already) on first use"""
+        with self.__lock:
+            if name not in self.__executors:
+                logging.debug(msg=f"starting shared executor {name}")
+                self.__executors[name] = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix=name,
+                )
+            return self.__executors[name]
+
+    def view(self, quota: int, name: str = "shared") -> ExecutorView:
+        """Returns a view on the named executor running at most
+        `quota` of its jobs at once"""
+        return ExecutorView(self.executor(name), quota, name=name)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.__lock:
+            executors = list(self.__executors.values())
+            self.__executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+
+# the registry shared by the pipelines of the process
+registry = ExecutorRegistry()
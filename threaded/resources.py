@@ -0,0 +1,211 @@
+import bisect
+import itertools
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+@dataclass(frozen=True)
+class ResourceStats:
+    running: int
+    waiting: int
+    held: FrozenSet[Hashable]
+    # times a job started ahead of an earlier one needing
+    # some of the same resources
+    bypasses: int
+
+
+class _Waiting:
+    __slots__ = (
+        "future",
+        "fn",
+        "args",
+        "kwargs",
+        "resources",
+        "bypassed",
+        "order",
+    )
+
+    def __init__(
+        self,
+        future: "Future[Any]",
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        resources: FrozenSet[Hashable],
+        order: Tuple[float, int],
+    ) -> None:
+        self.future = future
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.resources = resources
+        self.bypassed = 0
+        # by rank, then in the order of arrival
+        self.order = order
+
+    def __lt__(self, other: "_Waiting") -> bool:
+        return self.order < other.order
+
+
+class ResourceScheduler(Executor):
+    """
+    Runs jobs which need exclusive use of named resources (e.g.,
+    a lift or a door) on an executor. A job starts as soon as none
+    of its resources is held by a running job, so jobs with disjoint
+    resources run at the same time, while the ones sharing
+    a resource run one after another.
+
+    Waiting jobs are looked at in the order they came, or by the
+    rank they are submitted with (see `submit_ranked`). A later job
+    may start ahead of an earlier one which needs some of the same
+    resources at most `max_bypass` times: after that, the resources
+    of the earlier job are reserved for it and it cannot starve.
+    With `max_bypass` of 0, the jobs take each resource in turn.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_bypass: int = 8,
+        max_workers: Optional[int] = None,
+        name: str = "resource-scheduler",
+    ) -> None:
+        if max_bypass < 0:
+            raise ValueError("max_bypass must not be negative")
+        # the executor is only shut down along with the scheduler
+        # if the scheduler has started it
+        self.__owned = executor is None
+        self.__executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name,
+        )
+        self.__max_bypass = max_bypass
+        self.__lock = threading.Condition()
+        self.__waiting: List[_Waiting] = []
+        self.__arrivals = itertools.count()
+        self.__held: set = set()
+        self.__running = 0
+        self.__bypasses = 0
+        self.__shutdown = False
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> "Future[Any]":
+        """Runs the job without holding any resource"""
+        return self.submit_using((), fn, *args, **kwargs)
+
+    def submit_using(
+        self,
+        resources: Iterable[Hashable],
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> "Future[Any]":
+        """Runs the job once all the `resources` are free
+
+        Raises:
+            RuntimeError: if called after shutdown
+        """
+        return self.submit_ranked(0.0, resources, fn, *args, **kwargs)
+
+    def submit_ranked(
+        self,
+        rank: float,
+        resources: Iterable[Hashable],
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> "Future[Any]":
+        """Runs the job once all the `resources` are free. Waiting jobs
+        with a lower rank are looked at first, the ones submitted
+        without a rank have the rank of 0
+
+        Raises:
+            RuntimeError: if called after shutdown
+        """
+        f: "Future[Any]" = Future()
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            order = (rank, next(self.__arrivals))
+            bisect.insort(
+                self.__waiting,
+                _Waiting(f, fn, args, kwargs, frozenset(resources), order),
+            )
+            ready = self.__schedule()
+        self.__start(ready)
+        return f
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__lock:
+            self.__shutdown = True
+            if cancel_futures:
+                for waiting in self.__waiting:
+                    waiting.future.cancel()
+            if wait:
+                self.__lock.wait_for(
+                    lambda: not self.__waiting and not self.__running
+                )
+        if self.__owned:
+            self.__executor.shutdown(wait=wait)
+
+    def stats(self) -> ResourceStats:
+        with self.__lock:
+            return ResourceStats(
+                running=self.__running,
+                waiting=len(self.__waiting),
+                held=frozenset(self.__held),
+                bypasses=self.__bypasses,
+            )
+
+    def __schedule(self) -> List[_Waiting]:
+        # the caller holds the lock
+        reserved: set = set()
+        ready: List[_Waiting] = []
+        still: List[_Waiting] = []
+        for job in self.__waiting:
+            free = job.resources.isdisjoint(self.__held)
+            if free and job.resources.isdisjoint(reserved):
+                for earlier in still:
+                    if not earlier.resources.isdisjoint(job.resources):
+                        earlier.bypassed += 1
+                        self.__bypasses += 1
+                self.__held |= job.resources
+                ready.append(job)
+                continue
+            still.append(job)
+            if job.bypassed >= self.__max_bypass:
+                reserved |= job.resources
+        self.__waiting = still
+        self.__running += len(ready)
+        return ready
+
+    def __start(self, ready: List[_Waiting]) -> None:
+        for job in ready:
+            self.__executor.submit(self.__run, job)
+
+    def __run(self, job: _Waiting) -> None:
+        if job.future.set_running_or_notify_cancel():
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+        with self.__lock:
+            self.__held -= job.resources
+            self.__running -= 1
+            ready = self.__schedule()
+            self.__lock.notify_all()
+        self.__start(ready)
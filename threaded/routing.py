@@ -0,0 +1,192 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from time import monotonic, perf_counter, thread_time
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+@dataclass(frozen=True)
+class RouteEstimate:
+    samples: int
+    # moving averages of the wall time of a run and of the share
+    # of it spent on the CPU (that is, holding the GIL)
+    runtime: float
+    cpu_share: float
+    # None until `min_samples` runs are known
+    blocking: Optional[bool]
+
+
+@dataclass(frozen=True)
+class RoutingDecision:
+    at: float
+    key: Hashable
+    blocking: bool
+    reason: str
+
+
+class _Estimate:
+    __slots__ = ("samples", "runtime", "cpu_share", "blocking")
+
+    def __init__(self) -> None:
+        self.samples = 0
+        self.runtime = self.cpu_share = 0.0
+        self.blocking: Optional[bool] = None
+
+
+class AdaptiveRouter:
+    """
+    Tells whether a job is blocking from the way the earlier jobs
+    of its class ran rather than from its `blocking` flag. The class
+    of a job is `key(job)`, its name by default, so a job which
+    reschedules itself learns from its own runs.
+
+    Keeps moving averages of the runtime and of the CPU share of
+    each class. A class busy on the CPU for at least `high` of its
+    runtime is blocking: it holds the GIL and gains nothing from
+    running alongside other jobs. It goes back to the concurrent
+    pool once its share drops below `low`, the gap between the two
+    keeps a noisy class from flipping between the pools.
+
+    The flag of the job is used until `min_samples` runs of its class
+    are known. A job flagged blocking (e.g. because it has to run
+    alone) stays so, unless the flag is `derived` from something else
+    or its class is listed in `demote`, and jobs naming their
+    resources are always blocking. A job the measurements make
+    blocking is `promoted`: it only needs to take turns with the
+    other busy jobs, not to run alone. At most `maxsize` classes are
+    tracked, the least recently run ones are forgotten first.
+    """
+
+    def __init__(
+        self,
+        key: Callable[[Any], Hashable] = lambda job: job.name,
+        smoothing: float = 0.3,
+        high: float = 0.6,
+        low: float = 0.3,
+        min_samples: int = 3,
+        maxsize: int = 1024,
+        demote: Iterable[Hashable] = (),
+    ) -> None:
+        if not 0 < smoothing <= 1 or not 0 <= low <= high <= 1:
+            raise ValueError("expected 0 < smoothing <= 1, low <= high")
+        if min_samples < 1 or maxsize < 1:
+            raise ValueError("min_samples and maxsize must be positive")
+        self.__key = key
+        self.__smoothing = smoothing
+        self.__high, self.__low = high, low
+        self.__min_samples = min_samples
+        self.__maxsize = maxsize
+        self.__demote = frozenset(demote)
+        self.__lock = threading.Lock()
+        self.__estimates: "OrderedDict[Hashable, _Estimate]" = OrderedDict()
+        self.__decisions: Deque[RoutingDecision] = deque(maxlen=64)
+
+    def blocking(self, job: Any) -> bool:
+        """Whether the job should run on the blocking pool"""
+        return self.__decide(job)[0]
+
+    def promoted(self, job: Any) -> bool:
+        """Whether the job is blocking only for being busy on the CPU"""
+        return self.__decide(job)[1]
+
+    def runtime(self, job: Any) -> Optional[float]:
+        """Expected runtime of the job, None if its class never ran"""
+        with self.__lock:
+            estimate = self.__estimates.get(self.__key(job))
+            return estimate.runtime if estimate is not None else None
+
+    def run(self, job: Any) -> Any:
+        """Starts the job in the calling thread and records the run"""
+        wall, cpu = perf_counter(), thread_time()
+        try:
+            return job.start()
+        finally:
+            self.observe(
+                job, perf_counter() - wall, thread_time() - cpu
+            )
+
+    def observe(self, job: Any, runtime: float, cpu_time: float) -> None:
+        """Records a run of the job which took `runtime` seconds,
+        `cpu_time` of them on the CPU"""
+        share = min(cpu_time / runtime, 1.0) if runtime > 0 else 0.0
+        key = self.__key(job)
+        with self.__lock:
+            estimate = self.__estimates.get(key)
+            if estimate is None:
+                estimate = self.__estimates[key] = _Estimate()
+                while len(self.__estimates) > self.__maxsize:
+                    self.__estimates.popitem(last=False)
+            self.__estimates.move_to_end(key)
+            self.__update(estimate, runtime, share)
+            if estimate.samples >= self.__min_samples:
+                self.__route(key, estimate)
+
+    def estimates(self) -> Dict[Hashable, RouteEstimate]:
+        with self.__lock:
+            return {
+                key: RouteEstimate(
+                    samples=e.samples,
+                    runtime=e.runtime,
+                    cpu_share=e.cpu_share,
+                    blocking=e.blocking,
+                )
+                for key, e in self.__estimates.items()
+            }
+
+    def decisions(self) -> List[RoutingDecision]:
+        """The latest (at most 64) times a class changed its route"""
+        with self.__lock:
+            return list(self.__decisions)
+
+    def __decide(self, job: Any) -> Tuple[bool, bool]:
+        # whether the job is blocking and whether it is promoted
+        if job.resources:
+            return True, False
+        key = self.__key(job)
+        with self.__lock:
+            estimate = self.__estimates.get(key)
+            measured = None if estimate is None else estimate.blocking
+        if measured is None:
+            return job.blocking, False
+        if job.blocking and not job.derived and key not in self.__demote:
+            return True, False
+        return measured, measured
+
+    def __update(
+        self, estimate: _Estimate, runtime: float, share: float
+    ) -> None:
+        # the caller holds the lock; the first run is taken as it is
+        alpha = self.__smoothing if estimate.samples else 1.0
+        estimate.runtime += alpha * (runtime - estimate.runtime)
+        estimate.cpu_share += alpha * (share - estimate.cpu_share)
+        estimate.samples += 1
+
+    def __route(self, key: Hashable, estimate: _Estimate) -> None:
+        # the caller holds the lock
+        share = estimate.cpu_share
+        if estimate.blocking is None:
+            blocking = share >= self.__high
+            reason = f"learned from {estimate.samples} runs"
+        elif estimate.blocking and share < self.__low:
+            blocking, reason = False, "cpu share fell below low"
+        elif not estimate.blocking and share >= self.__high:
+            blocking, reason = True, "cpu share rose above high"
+        else:
+            return
+        estimate.blocking = blocking
+        decision = RoutingDecision(
+            monotonic(), key, blocking, f"{reason}: {share:.2f}"
+        )
+        self.__decisions.append(decision)
+        logging.debug(msg=f"router: {decision}")
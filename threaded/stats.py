@@ -0,0 +1,144 @@
+import threading
+from dataclasses import dataclass
+from typing import Iterable, List
+
+
+@dataclass(frozen=True)
+class LatencySnapshot:
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of durations in a fixed number of buckets.
+    Durations are kept in microseconds: below `2 ** precision`
+    each value has its own bucket, above that every power of two
+    is split into `2 ** (precision - 1)` buckets, which bounds the
+    relative error by `2 ** (1 - precision)`. Values above `highest`
+    seconds fall into the last bucket.
+
+    Not thread-safe, the owner is expected to hold a lock.
+    """
+
+    def __init__(self, precision: int = 5, highest: float = 3600.0) -> None:
+        if precision < 1:
+            raise ValueError("precision must be positive")
+        self.__precision = precision
+        self.__half = 1 << (precision - 1)
+        self.__highest = int(highest * 1e6)
+        self.__counts: List[int] = [0] * (self.__index(self.__highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        value = min(max(int(seconds * 1e6), 0), self.__highest)
+        self.__counts[self.__index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the q-th percentile, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = max(q / 100 * self.count, 1)
+        seen = 0
+        for i, n in enumerate(self.__counts):
+            seen += n
+            if seen >= rank:
+                return min(self.__upper(i), self.max) / 1e6
+        return self.max / 1e6
+
+    def snapshot(self) -> LatencySnapshot:
+        return LatencySnapshot(
+            count=self.count,
+            mean=self.total / self.count / 1e6 if self.count else 0.0,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            max=self.max / 1e6,
+        )
+
+    def __index(self, value: int) -> int:
+        shift = value.bit_length() - self.__precision
+        if shift <= 0:
+            return value
+        return shift * self.__half + (value >> shift)
+
+    def __upper(self, index: int) -> int:
+        if index < 2 * self.__half:
+            return index
+        shift = index // self.__half - 1
+        return ((index - shift * self.__half + 1) << shift) - 1
+
+
+@dataclass(frozen=True)
+class DispatchStats:
+    submitted: int
+    completed: int
+    failed: int
+    expired: int
+    # gauges
+    queued: int
+    in_flight: int
+    # seconds between submit and start, start and finish
+    queue_wait: LatencySnapshot
+    service_time: LatencySnapshot
+
+
+class DispatchMetrics:
+    """Counters and histograms of a dispatcher, safe to
+    update from the loop and from the workers at once"""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__submitted = 0
+        self.__completed = 0
+        self.__failed = 0
+        self.__expired = 0
+        self.__in_flight = 0
+        self.__queue_wait = LatencyHistogram()
+        self.__service_time = LatencyHistogram()
+
+    def on_submit(self, n: int) -> None:
+        with self.__lock:
+            self.__submitted += n
+
+    def on_expire(self, n: int) -> None:
+        with self.__lock:
+            self.__expired += n
+
+    def on_start(self, submitted: Iterable[float], at: float) -> None:
+        with self.__lock:
+            self.__in_flight += 1
+            for t in submitted:
+                self.__queue_wait.record(at - t)
+
+    def on_finish(self, n: int, elapsed: float, failed: bool) -> None:
+        with self.__lock:
+            self.__in_flight -= 1
+            self.__service_time.record(elapsed)
+            if failed:
+                self.__failed += n
+            else:
+                self.__completed += n
+
+    def snapshot(self, queued: int) -> DispatchStats:
+        with self.__lock:
+            return DispatchStats(
+                submitted=self.__submitted,
+                completed=self.__completed,
+                failed=self.__failed,
+                expired=self.__expired,
+                queued=queued,
+                in_flight=self.__in_flight,
+                queue_wait=self.__queue_wait.snapshot(),
+                service_time=self.__service_time.snapshot(),
+            )
@@ -0,0 +1,158 @@
+import itertools
+import random
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+WorkItem = Tuple["Future[Any]", Callable[..., Any], tuple, dict]
+
+
+class WorkStealingExecutor(Executor):
+    """
+    Thread pool where every worker has its own deque of jobs instead
+    of all of them sharing a single queue. A worker takes jobs from
+    the head of its own deque and, once it runs dry, steals from the
+    tail of a randomly chosen victim. Deque appends and pops are atomic,
+    so neither path takes a lock; one is only needed to put idle
+    workers to sleep and wake them up.
+
+    Jobs submitted from outside are spread over the deques round-robin.
+    Jobs submitted by a job (follow-up work) are buffered and pushed
+    to the deque of the same worker in one go, when the job returns
+    or when `local_batch` of them pile up. A job must not wait for
+    the result of its own follow-ups, they may not have started yet.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        local_batch: int = 32,
+        name: str = "stealing-pool",
+    ) -> None:
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.max_workers = max_workers
+        self.__local_batch = local_batch
+        self.__deques: List[Deque[WorkItem]] = [
+            deque() for _ in range(max_workers)
+        ]
+        self.__steals = [0] * max_workers
+        self.__next = itertools.count()
+        # set on the worker threads of this very executor
+        self.__local = threading.local()
+        self.__idle = threading.Condition()
+        self.__sleeping = 0
+        self.__shutdown = False
+        self.__threads = [
+            threading.Thread(
+                name=f"{name}_{i}",
+                target=self.__work,
+                args=(i,),
+                daemon=True,
+            )
+            for i in range(max_workers)
+        ]
+        for t in self.__threads:
+            t.start()
+
+    @property
+    def steals(self) -> int:
+        """Number of jobs taken from the deque of another worker"""
+        return sum(self.__steals)
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> "Future[Any]":
+        f: "Future[Any]" = Future()
+        item = (f, fn, args, kwargs)
+        buffer: Optional[List[WorkItem]] = getattr(
+            self.__local, "buffer", None
+        )
+        if buffer is not None:
+            # follow-ups are still accepted during the shutdown,
+            # the worker runs them before it exits
+            buffer.append(item)
+            if len(buffer) >= self.__local_batch:
+                self.__flush()
+            return f
+        if self.__shutdown:
+            raise RuntimeError("cannot submit after shutdown")
+        n = next(self.__next) % self.max_workers
+        self.__deques[n].append(item)
+        self.__wake(1)
+        return f
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__idle:
+            self.__shutdown = True
+            self.__idle.notify_all()
+        if cancel_futures:
+            for jobs in self.__deques:
+                while True:
+                    item = self.__take_from(jobs)
+                    if item is None:
+                        break
+                    item[0].cancel()
+        if wait:
+            for t in self.__threads:
+                if t is not threading.current_thread():
+                    t.join()
+
+    @staticmethod
+    def __take_from(jobs: Deque[WorkItem]) -> Optional[WorkItem]:
+        try:
+            return jobs.popleft()
+        except IndexError:
+            return None
+
+    def __take(self, me: int) -> Optional[WorkItem]:
+        item = self.__take_from(self.__deques[me])
+        if item is not None:
+            return item
+        start = random.randrange(self.max_workers)
+        for i in range(self.max_workers):
+            victim = self.__deques[(start + i) % self.max_workers]
+            try:
+                item = victim.pop()
+            except IndexError:
+                continue
+            self.__steals[me] += 1
+            return item
+        return None
+
+    def __wake(self, n: int) -> None:
+        # an unlocked peek is enough: a worker going to sleep
+        # checks the deques once more after it is counted
+        if self.__sleeping:
+            with self.__idle:
+                self.__idle.notify(n)
+
+    def __flush(self) -> None:
+        buffer = self.__local.buffer
+        if buffer:
+            self.__deques[self.__local.index].extend(buffer)
+            self.__wake(len(buffer))
+            buffer.clear()
+
+    def __work(self, me: int) -> None:
+        self.__local.index, self.__local.buffer = me, []
+        while True:
+            item = self.__take(me)
+            if item is None:
+                with self.__idle:
+                    self.__sleeping += 1
+                    item = self.__take(me)
+                    while item is None and not self.__shutdown:
+                        self.__idle.wait()
+                        item = self.__take(me)
+                    self.__sleeping -= 1
+                if item is None:
+                    return
+            f, fn, args, kwargs = item
+            if f.set_running_or_notify_cancel():
+                try:
+                    f.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    f.set_exception(e)
+            self.__flush()
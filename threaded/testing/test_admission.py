@@ -0,0 +1,33 @@
+import queue
+
+import pytest
+
+from threaded.admission import AdmissionControl, OverloadedError
+
+
+def test_rejects_once_wait_stays_above_target():
+    control = AdmissionControl(target=0.01, interval=1.0)
+    control.observe(0.5, empty=False, now=0.0)
+    control.observe(0.5, empty=False, now=0.5)
+    control.admit()
+    control.observe(0.5, empty=False, now=1.0)
+    assert control.overloaded
+    with pytest.raises(queue.Full) as e:
+        control.admit()
+    assert isinstance(e.value, OverloadedError)
+    assert e.value.sojourn == 0.5
+    assert control.rejected == 1
+
+
+def test_recovers_on_good_sojourn_or_empty_queue():
+    control = AdmissionControl(target=0.01, interval=1.0)
+    control.observe(0.5, empty=False, now=0.0)
+    control.observe(0.001, empty=False, now=0.7)
+    control.observe(0.5, empty=False, now=1.2)
+    assert not control.overloaded
+
+    control.observe(0.5, empty=False, now=2.5)
+    assert control.overloaded
+    control.observe(0.5, empty=True, now=2.6)
+    assert not control.overloaded
+    control.admit()
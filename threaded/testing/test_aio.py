@@ -0,0 +1,50 @@
+import asyncio
+import queue
+import threading
+from typing import Any
+
+import pytest
+
+from threaded.aio import AsyncDispatcherLoop
+
+
+def test_concurrency_is_bounded():
+    in_flight, peak, done = 0, 0, 0
+
+    async def dispatch(_: Any):
+        nonlocal in_flight, peak, done
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        done += 1
+
+    loop = AsyncDispatcherLoop(max_concurrency=50, dispatcher=dispatch)
+    loop.run()
+    producers = [
+        threading.Thread(
+            target=lambda: [loop.submit(i) for i in range(100)]
+        )
+        for _ in range(4)
+    ]
+    for p in producers:
+        p.start()
+    for p in producers:
+        p.join()
+    loop.stop()
+    loop.run_until_completed()
+    assert done == 400
+    assert peak == 50
+
+
+def test_backlog_is_bounded():
+    loop = AsyncDispatcherLoop(max_requests=2)
+    loop.submit(1)
+    loop.submit(2)
+    with pytest.raises(queue.Full):
+        loop.submit(3)
+    loop.run()
+    loop.stop()
+    loop.run_until_completed()
+    with pytest.raises(RuntimeError):
+        loop.submit(4)
@@ -0,0 +1,48 @@
+import threading
+from time import sleep
+
+from threaded.autoscale import AutoscalingExecutor
+
+
+def test_grows_under_load_and_shrinks_when_idle():
+    pool = AutoscalingExecutor(
+        min_workers=1,
+        max_workers=4,
+        target_wait=0.001,
+        idle_timeout=0.05,
+        cooldown=0.05,
+    )
+    assert pool.submit(sum, [1, 2]).result() == 3
+    futures = [pool.submit(sleep, 0.02) for _ in range(20)]
+    for f in futures:
+        f.result()
+    assert pool.stats().size == 4
+
+    sleep(0.3)
+    stats = pool.stats()
+    assert stats.size == 1
+    assert stats.busy == stats.queued == 0
+    assert stats.service_time > 0
+    assert [d.reason for d in stats.decisions].count("idle") == 3
+    pool.shutdown()
+    assert pool.stats().size == 0
+
+
+def test_short_jobs_do_not_grow_the_pool():
+    pool = AutoscalingExecutor(min_workers=1, max_workers=4, target_wait=1)
+    pool.submit(sum, [1]).result()
+    futures = [pool.submit(sum, [i]) for i in range(100)]
+    assert [f.result() for f in futures] == list(range(100))
+    assert pool.stats().size == 1
+    pool.shutdown()
+
+
+def test_shutdown_waits_for_the_queue_and_stops_growing():
+    pool = AutoscalingExecutor(min_workers=1, max_workers=8, target_wait=0)
+    futures = [pool.submit(sleep, 0.001) for _ in range(50)]
+    stopping = threading.Thread(target=pool.shutdown)
+    stopping.start()
+    stopping.join(timeout=5)
+    assert not stopping.is_alive()
+    assert all(f.done() for f in futures)
+    assert pool.stats().size == 0
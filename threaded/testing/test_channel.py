@@ -0,0 +1,53 @@
+import queue
+import threading
+from typing import Any, List
+
+import pytest
+
+from threaded.channel import SPSCChannel
+from threaded.executor import ConsumerWithQueue
+
+
+def test_transfers_in_order_through_a_small_buffer():
+    channel = SPSCChannel(maxsize=3)
+    received: List[Any] = []
+
+    def consume() -> None:
+        for item in iter(channel.get, None):
+            received.append(item)
+            channel.task_done()
+        channel.task_done()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for i in range(10_000):
+        channel.put(i)
+    channel.put(None)
+    channel.join()
+    consumer.join()
+    assert received == list(range(10_000))
+    assert channel.empty()
+
+
+def test_timeouts_and_bounds():
+    channel = SPSCChannel(maxsize=1)
+    with pytest.raises(queue.Empty):
+        channel.get(timeout=0.01)
+    channel.put_nowait(1)
+    with pytest.raises(queue.Full):
+        channel.put(2, timeout=0.01)
+    assert channel.get_nowait() == 1
+    with pytest.raises(ValueError):
+        channel.task_done_many(2)
+
+
+def test_feeds_a_batch_consumer():
+    channel = SPSCChannel()
+    batches: List[List[Any]] = []
+    consumer = ConsumerWithQueue(channel, batch_func=batches.append)
+    for i in range(1000):
+        channel.put(i)
+    consumer.stop()
+    channel.join()
+    assert [i for batch in batches for i in batch] == list(range(1000))
+    assert consumer.recieved == 1000
@@ -0,0 +1,76 @@
+from typing import List
+
+import pytest
+
+from threaded.dag import DependencyScheduler
+from threaded.jobs import StatelessJob
+
+
+def test_longest_critical_path_goes_first():
+    released: List[str] = []
+    scheduler = DependencyScheduler(
+        lambda job: released.append(job.name),
+        runtime=lambda job: {"single": 0.5, "first": 2.0}.get(job.name),
+        max_running=1,
+    )
+    # a chain of three next to a single job, both ready from the start
+    single = StatelessJob("single")
+    first = StatelessJob("first")
+    second = StatelessJob("second", after=(first,))
+    third = StatelessJob("third", after=(second,))
+    scheduler.add([single, third])
+    # the other runtimes are not known and taken as the mean one
+    assert scheduler.rank(first) == 4.5 and scheduler.rank(single) == 0.5
+    assert released == ["first"]
+
+    for job in (first, second, third):
+        assert scheduler.done(job)
+    assert released == ["first", "second", "third", "single"]
+    assert not scheduler.done(third)
+    assert scheduler.done(single) and len(scheduler) == 0
+
+
+def test_failure_drops_the_jobs_after_it():
+    released: List[str] = []
+    scheduler = DependencyScheduler(lambda job: released.append(job.name))
+    a = StatelessJob("a")
+    b = StatelessJob("b", after=(a,))
+    c = StatelessJob("c", after=(b,))
+    d = StatelessJob("d")
+    e = StatelessJob("e", after=(d,))
+    scheduler.add([c, e])
+    assert sorted(released) == ["a", "d"]
+    assert scheduler.fail(a)
+    assert len(scheduler) == 2
+    assert scheduler.done(d)
+    assert released[-1] == "e"
+
+    loop = StatelessJob("loop")
+    loop.after = (StatelessJob("back", after=(loop,)),)
+    with pytest.raises(ValueError):
+        scheduler.add([loop])
+    assert len(scheduler) == 1
+
+
+def test_jobs_done_or_started_are_not_run_again():
+    released: List[str] = []
+    scheduler = DependencyScheduler(lambda job: released.append(job.name))
+    a = StatelessJob("a")
+    scheduler.add([a])
+    assert scheduler.done(a)
+    # running outside the graph and done without being in it
+    b, c = StatelessJob("b"), StatelessJob("c")
+    scheduler.started(b)
+    assert not scheduler.done(c)
+
+    d = StatelessJob("d", after=(a, b, c))
+    scheduler.add([d])
+    assert released == ["a"] and len(scheduler) == 2
+    assert not scheduler.tracks(a) and scheduler.tracks(b)
+    assert scheduler.done(b)
+    assert released == ["a", "d"]
+    assert scheduler.done(d) and len(scheduler) == 0
+
+    # added on its own, a job runs again
+    scheduler.add([a])
+    assert released == ["a", "d", "a"]
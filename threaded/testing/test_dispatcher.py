@@ -0,0 +1,146 @@
+import threading
+from time import sleep
+from typing import Any, Dict, List, Set, Tuple
+
+from threaded.dispatcher import DispatcherLoop
+from threaded.queues import KeyedQueue, PriorityDeadlineQueue
+
+
+def test_in_flight_is_bounded():
+    lock = threading.Lock()
+    in_flight, peak = 0, 0
+
+    def dispatch(_: Any):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        sleep(0.001)
+        with lock:
+            in_flight -= 1
+
+    loop = DispatcherLoop(
+        max_workers=8,
+        max_requests=4,
+        max_in_flight=3,
+        dispatcher=dispatch,
+    )
+    loop.run()
+    for i in range(100):
+        loop.submit(i, block=True)
+    loop.stop()
+    loop.run_until_completed()
+    assert peak == 3
+
+
+def test_completes_out_of_order():
+    done: List[int] = []
+    slow_started = threading.Event()
+    fast_done = threading.Event()
+
+    def dispatch(job: int):
+        if job == 0:
+            slow_started.set()
+            fast_done.wait(timeout=5)
+        done.append(job)
+        if job == 2:
+            fast_done.set()
+
+    loop = DispatcherLoop(max_workers=2, dispatcher=dispatch)
+    loop.run()
+    for i in range(3):
+        loop.submit(i)
+    loop.stop()
+    loop.run_until_completed()
+    assert done[-1] == 0
+    assert sorted(done) == [0, 1, 2]
+
+
+def test_batches_are_bounded():
+    batches: List[List[int]] = []
+
+    loop = DispatcherLoop(
+        max_workers=1,
+        dispatch_batch=batches.append,
+        max_batch=4,
+        linger=0.05,
+    )
+    loop.submit_many(range(10))
+    loop.run()
+    loop.stop()
+    loop.run_until_completed()
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert [i for b in batches for i in b] == list(range(10))
+
+
+def test_expired_requests_are_not_dispatched():
+    dispatched: List[str] = []
+    loop = DispatcherLoop(
+        max_workers=1,
+        dispatcher=dispatched.append,
+        requests=PriorityDeadlineQueue(),
+    )
+    loop.submit("telemetry", priority=1)
+    loop.submit("stale", deadline=0)
+    loop.submit("stop", priority=-1)
+    loop.run()
+    loop.stop()
+    loop.run_until_completed()
+    assert dispatched == ["stop", "telemetry"]
+    assert loop.expired == 1
+
+
+def test_keys_keep_order_and_run_in_parallel():
+    lock = threading.Lock()
+    seen: Dict[str, List[int]] = {}
+    running: Set[str] = set()
+    overlapped, serial = False, True
+
+    def dispatch(job: Tuple[str, int]):
+        nonlocal overlapped, serial
+        key, i = job
+        with lock:
+            serial = serial and key not in running
+            running.add(key)
+            overlapped = overlapped or len(running) > 1
+            seen.setdefault(key, []).append(i)
+        sleep(0.001)
+        with lock:
+            running.discard(key)
+
+    loop = DispatcherLoop(
+        max_workers=4,
+        dispatcher=dispatch,
+        requests=KeyedQueue(),
+    )
+    loop.run()
+    for i in range(50):
+        for key in "abc":
+            loop.submit((key, i), key=key)
+    loop.stop()
+    loop.run_until_completed()
+    assert seen == {key: list(range(50)) for key in "abc"}
+    assert serial and overlapped
+
+
+def test_stats_track_requests():
+    def dispatch(job: int):
+        sleep(0.002)
+        if job == 3:
+            raise ValueError(job)
+
+    loop = DispatcherLoop(max_workers=2, dispatcher=dispatch, instrument=True)
+    loop.submit_many(range(9))
+    loop.submit(9, deadline=0)
+    stats = loop.stats()
+    assert stats.submitted == stats.queued == 10
+    loop.run()
+    loop.stop()
+    loop.run_until_completed()
+
+    stats = loop.stats()
+    assert (stats.completed, stats.failed, stats.expired) == (8, 1, 1)
+    assert stats.in_flight == 0
+    assert stats.queue_wait.count == 9
+    assert stats.service_time.p50 >= 0.002
+    assert stats.service_time.max >= stats.service_time.p99
@@ -0,0 +1,68 @@
+import queue
+import threading
+from typing import Any, List
+
+import pytest
+
+from threaded.executor import ConsumerWithQueue, WorkerPool
+from threaded.queues import RequestQueue
+
+
+def test_results_go_to_their_own_channels():
+    pool = WorkerPool(max_workers=4)
+    channels: "list[queue.Queue[Any]]" = [queue.Queue() for _ in range(50)]
+    for i, channel in enumerate(channels):
+        pool.submit(lambda i=i: i, channel)
+    pool.run_until_complete()
+    assert [c.get_nowait() for c in channels] == list(range(50))
+
+
+def test_errors_are_delivered():
+    pool = WorkerPool(max_workers=1)
+    results: "queue.Queue[Any]" = queue.Queue()
+    errors: "queue.Queue[BaseException]" = queue.Queue()
+    f = pool.submit(lambda: 1 / 0, results, errors=errors)
+    pool.run_until_complete()
+    assert isinstance(errors.get_nowait(), ZeroDivisionError)
+    assert isinstance(f.exception(), ZeroDivisionError)
+    assert results.empty()
+
+
+def test_pending_jobs_are_bounded():
+    release = threading.Event()
+    pool = WorkerPool(max_workers=1, max_requests=1)
+    results: "queue.Queue[Any]" = queue.Queue()
+    running = threading.Event()
+
+    def blocker():
+        running.set()
+        release.wait(timeout=5)
+
+    pool.submit(blocker, results)
+    running.wait(timeout=5)
+    pool.submit(int, results)
+    with pytest.raises(queue.Full):
+        pool.submit(int, results)
+    with pytest.raises(queue.Full):
+        pool.submit(int, results, block=True, timeout=0.01)
+    release.set()
+    pool.submit(int, results, block=True)
+    pool.run_until_complete()
+    assert results.qsize() == 3
+    with pytest.raises(RuntimeError):
+        pool.submit(int, results)
+
+
+@pytest.mark.parametrize("channel", [queue.Queue(), RequestQueue()])
+def test_consumer_drains_batches(channel: "queue.Queue[Any]"):
+    batches: List[List[Any]] = []
+    for i in range(10):
+        channel.put(i)
+    channel.put(None)
+    consumer = ConsumerWithQueue(
+        channel, batch_func=batches.append, max_batch=4, history=3
+    )
+    channel.join()
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert consumer.recieved == 10
+    assert list(consumer.recent) == [7, 8, 9]
@@ -0,0 +1,118 @@
+import threading
+from time import sleep
+from typing import Any, List
+
+import pytest
+
+from threaded.graph import StageGraph
+
+
+def test_fan_out_fan_in_and_skipping():
+    lock = threading.Lock()
+    sunk: List[Any] = []
+
+    def sink(item: Any) -> None:
+        with lock:
+            sunk.append(item)
+
+    pipeline = (
+        StageGraph()
+        .stage("double", lambda x: x * 2, workers=3)
+        .stage("neg", lambda x: -x, skip=lambda x: x % 4 == 0)
+        .stage("str", str, workers=2)
+        .stage("sink", sink)
+        .chain("double", "neg", "sink")
+        .chain("double", "str", "sink")
+        .build()
+    )
+    for i in range(10):
+        pipeline.schedule(i)
+    pipeline.run_until_complete()
+
+    numbers = sorted(x for x in sunk if isinstance(x, int))
+    assert numbers == sorted(
+        x if x % 4 == 0 else -x for x in range(0, 20, 2)
+    )
+    assert sorted(x for x in sunk if isinstance(x, str)) == sorted(
+        str(x) for x in range(0, 20, 2)
+    )
+    stats = pipeline.stats()
+    assert stats["neg"].skipped == 5
+    assert stats["sink"].processed == 20
+
+
+def test_buffers_hold_back_the_caller():
+    release = threading.Event()
+    pipeline = (
+        StageGraph()
+        .stage("slow", lambda x: release.wait(timeout=5), buffer=2)
+        .build()
+    )
+    scheduled = 0
+
+    def schedule() -> None:
+        nonlocal scheduled
+        for i in range(10):
+            pipeline.schedule(i)
+            scheduled += 1
+
+    producer = threading.Thread(target=schedule)
+    producer.start()
+    sleep(0.05)
+    # one item is being processed, two wait in the buffer
+    assert scheduled == 3
+    assert pipeline.stats()["slow"].occupancy == 1.0
+    release.set()
+    producer.join()
+    pipeline.run_until_complete()
+    assert pipeline.stats()["slow"].processed == 10
+
+
+def test_failing_skip_counts_as_failed():
+    pipeline = (
+        StageGraph().stage("inv", str, skip=lambda x: 1 / x == 1).build()
+    )
+    for i in range(3):
+        pipeline.schedule(i)
+    stopping = threading.Thread(target=pipeline.run_until_complete)
+    stopping.start()
+    stopping.join(timeout=5)
+    assert not stopping.is_alive()
+    stats = pipeline.stats()["inv"]
+    assert (stats.failed, stats.skipped, stats.processed) == (1, 1, 2)
+
+
+def test_rejects_cycles():
+    graph = StageGraph().stage("a", str).stage("b", str).chain("a", "b", "a")
+    with pytest.raises(ValueError):
+        graph.build()
+
+
+def test_fuses_linear_chains():
+    sunk: List[Any] = []
+    graph = (
+        StageGraph()
+        .stage("inc", lambda x: x + 1)
+        .stage("half", lambda x: 10 // (x % 5), skip=lambda x: x % 2 == 1)
+        .stage("held", str, fusable=False)
+        .stage("sink", sunk.append)
+        .chain("inc", "half", "held", "sink")
+    )
+    pipeline = graph.build()
+    for i in range(10):
+        pipeline.schedule(i)
+    pipeline.run_until_complete()
+
+    # "held" opts out, so only inc -> half is fused
+    assert pipeline.handoffs_eliminated == 1
+    stats = pipeline.stats()
+    assert set(stats) == {"inc+half", "held", "sink"}
+    # odd numbers skip `half`, 10 makes it divide by zero
+    assert stats["inc+half"].failed == 1
+    assert stats["inc+half"].skipped == 5
+    assert sorted(sunk) == sorted(
+        str(x if x % 2 else 10 // (x % 5)) for x in range(1, 10)
+    )
+    unfused = graph.build(fuse=False)
+    unfused.run_until_complete()
+    assert unfused.handoffs_eliminated == 0
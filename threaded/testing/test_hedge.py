@@ -0,0 +1,59 @@
+import threading
+from time import sleep
+from typing import Any, List
+
+from threaded.graph import StageGraph
+from threaded.hedge import Hedger
+
+
+def test_hedges_a_stalled_call():
+    hedger = Hedger(max_workers=4, budget=0.1, min_samples=10)
+    stall = threading.Event()
+    attempts: List[int] = []
+
+    def lookup(x: int) -> int:
+        attempts.append(x)
+        # the first attempt for 99 stalls until the end of the test
+        if x == 99 and attempts.count(99) == 1:
+            stall.wait(timeout=5)
+        sleep(0.001)
+        return x
+
+    assert [hedger.call(lookup, i) for i in range(20)] == list(range(20))
+    before = hedger.stats()
+    assert before.threshold is not None
+    assert hedger.call(lookup, 99) == 99
+    stall.set()
+    hedger.shutdown()
+
+    after = hedger.stats()
+    assert attempts.count(99) == 2
+    assert after.hedged - before.hedged == 1
+    assert after.won - before.won == 1
+
+
+def test_budget_caps_the_hedges():
+    hedger = Hedger(max_workers=8, percentile=80, budget=0.05)
+    sunk: List[Any] = []
+
+    def lookup(x: int) -> int:
+        # every tenth call is far slower than the threshold,
+        # but only half of them may be hedged
+        sleep(0.02 if x % 10 == 9 else 0.001)
+        return x
+
+    pipeline = (
+        StageGraph()
+        .stage("lookup", hedger.wrap(lookup), workers=2)
+        .stage("sink", sunk.append)
+        .chain("lookup", "sink")
+        .build()
+    )
+    for i in range(200):
+        pipeline.schedule(i)
+    pipeline.run_until_complete()
+    hedger.shutdown()
+
+    assert sorted(sunk) == list(range(200))
+    stats = hedger.stats()
+    assert 0 < stats.hedged <= 0.05 * stats.calls
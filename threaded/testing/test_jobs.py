@@ -0,0 +1,202 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from typing import Callable, List
+
+import pytest
+
+from threaded.jobs import Job, Pipeline, StatelessJob, keep_latest
+from threaded.queues import ShortestJobFirstQueue
+from threaded.registry import ExecutorRegistry
+
+
+def merge_names(pending: Job, new: Job) -> Job:
+    return StatelessJob(
+        name=pending.name,
+        blocking=False,
+        start=lambda: (pending.start(), new.start()),
+    )
+
+
+@pytest.mark.parametrize(
+    "coalesce, runs",
+    [
+        (keep_latest, ["a", "b", "dup-3"]),
+        (merge_names, ["a", "b", "dup-1", "dup-2", "dup-3"]),
+    ],
+)
+def test_pending_duplicates_are_coalesced(
+    coalesce: Callable[[Job, Job], Job], runs: List[str]
+):
+    executors = ExecutorRegistry()
+    # a single worker, so that the jobs behind the gate stay pending
+    executors.register("jobs", ThreadPoolExecutor(max_workers=1))
+    pipeline = Pipeline(executors, coalesce=coalesce)
+    gate, done = threading.Event(), threading.Event()
+    ran: List[str] = []
+
+    def run(label: str) -> None:
+        ran.append(label)
+        if label == "dup-3":
+            done.set()
+
+    def job(name: str, label: str) -> StatelessJob:
+        return StatelessJob(
+            name=name, blocking=False, start=lambda: run(label)
+        )
+
+    pipeline.schedule(
+        StatelessJob(name="gate", blocking=False, start=gate.wait)
+    )
+    pipeline.schedule(job("a", "a"))
+    pipeline.schedule(job("b", "b"))
+    for i in range(1, 4):
+        pipeline.schedule(job("dup", f"dup-{i}"))
+    assert pipeline.coalesced == 2
+    gate.set()
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    assert ran == runs
+
+
+def test_graph_runs_branches_at_once():
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors)
+    lock = threading.Lock()
+    running: List[str] = []
+    events: List[List[str]] = []
+    done = threading.Event()
+
+    def step(name: str) -> Callable[[], None]:
+        def start() -> None:
+            with lock:
+                running.append(name)
+                events.append(sorted(running))
+            sleep(0.02)
+            with lock:
+                running.remove(name)
+            if name == "land":
+                done.set()
+
+        return start
+
+    def job(name: str, *after: Job) -> StatelessJob:
+        return StatelessJob(
+            name=name, blocking=False, start=step(name), after=after
+        )
+
+    takeoff = job("takeoff")
+    photo, scan = job("photo", takeoff), job("scan", takeoff)
+    pipeline.schedule(job("land", photo, scan))
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    # the branches overlap, but neither starts before takeoff
+    # or overlaps with landing
+    assert len(events) == 4
+    assert events[0] == ["takeoff"] and events[-1] == ["land"]
+    assert events[2] == ["photo", "scan"]
+    assert len(pipeline.dependencies) == 0
+
+
+def test_blocking_jobs_wait_for_the_slot_in_order():
+    executors = ExecutorRegistry()
+    expected = {"long": 5.0, "short": 0.01}
+    pending = ShortestJobFirstQueue(
+        lambda job: expected.get(job.name), aging=0.0
+    )
+    pipeline = Pipeline(executors, pending=pending)
+    started, gate = threading.Event(), threading.Event()
+    done = threading.Event()
+    ran: List[str] = []
+
+    def run(name: str) -> None:
+        ran.append(name)
+        if len(ran) == 4:
+            done.set()
+
+    def job(name: str) -> StatelessJob:
+        return StatelessJob(name=name, start=lambda: run(name))
+
+    pipeline.schedule(
+        StatelessJob(name="gate", start=lambda: (started.set(), gate.wait()))
+    )
+    assert started.wait(timeout=2)
+    # the long job is the first to wait for the execution slot
+    for n, name in enumerate(["long", "short", "short", "short"], 1):
+        pipeline.schedule(job(name))
+        while pipeline.resources.stats().waiting < n:
+            sleep(0.001)
+    gate.set()
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    assert ran == ["short", "short", "short", "long"]
+
+
+def test_jobs_scheduled_before_run_once():
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors)
+    gate, drove = threading.Event(), threading.Semaphore(0)
+    ran: List[str] = []
+
+    def run(name: str) -> None:
+        if name == "open-door":
+            gate.wait(timeout=2)
+        ran.append(name)
+        if name == "drive":
+            drove.release()
+
+    def job(name: str, *after: Job) -> StatelessJob:
+        return StatelessJob(
+            name=name, blocking=False, start=lambda: run(name), after=after
+        )
+
+    door = job("open-door")
+    pipeline.schedule(door)
+    # the door is still opening, so the drive waits for it
+    pipeline.schedule(job("drive", door))
+    gate.set()
+    assert drove.acquire(timeout=2)
+    # and once it is open, it is not opened again
+    pipeline.schedule(job("drive", door))
+    assert drove.acquire(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    assert ran == ["open-door", "drive", "drive"]
+    assert len(pipeline.dependencies) == 0
+
+
+def test_graph_waits_for_coalesced_jobs():
+    executors = ExecutorRegistry()
+    executors.register("jobs", ThreadPoolExecutor(max_workers=1))
+    pipeline = Pipeline(executors, coalesce=keep_latest)
+    gate, done = threading.Event(), threading.Event()
+    ran: List[str] = []
+
+    def run(name: str) -> None:
+        ran.append(name)
+        if name == "drive":
+            done.set()
+
+    def job(name: str, label: str, *after: Job) -> StatelessJob:
+        return StatelessJob(
+            name=name, blocking=False, start=lambda: run(label), after=after
+        )
+
+    pipeline.schedule(
+        StatelessJob(name="gate", blocking=False, start=gate.wait)
+    )
+    door = job("door", "door-1")
+    pipeline.schedule(door)
+    pipeline.schedule(job("drive", "drive", door))
+    # runs in place of the door the drive waits for
+    pipeline.schedule(job("door", "door-2"))
+    assert pipeline.coalesced == 1
+    gate.set()
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    assert ran == ["door-2", "drive"]
+    assert len(pipeline.dependencies) == 0
@@ -0,0 +1,77 @@
+import queue
+import threading
+from time import sleep
+from typing import Any, List
+
+import pytest
+
+from threaded.executor import WorkerPool
+from threaded.graph import StageGraph
+from threaded.memo import SingleFlight
+
+
+def test_pool_runs_identical_requests_once():
+    flight = SingleFlight()
+    pool = WorkerPool(max_workers=4, flight=flight)
+    release = threading.Event()
+    calls: List[str] = []
+
+    def lookup(path: str) -> str:
+        calls.append(path)
+        release.wait(timeout=5)
+        return path.upper()
+
+    channels: "List[queue.Queue[Any]]" = [queue.Queue() for _ in range(6)]
+    for i, channel in enumerate(channels):
+        path = "a" if i % 2 else "b"
+        pool.submit(lambda path=path: lookup(path), channel, key=path)
+    release.set()
+    pool.run_until_complete()
+
+    assert sorted(calls) == ["a", "b"]
+    assert [c.get_nowait() for c in channels] == ["B", "A"] * 3
+    stats = flight.stats()
+    assert (stats.misses, stats.joined, stats.hits) == (2, 4, 0)
+
+
+def test_cache_limits_and_errors():
+    flight = SingleFlight(maxsize=2, ttl=0.05)
+    assert flight.call(1, lambda: "one") == "one"
+    assert flight.call(2, lambda: "two") == "two"
+    assert flight.call(1, lambda: "again") == "one"
+    # 2 is the least recently used one
+    assert flight.call(3, lambda: "three") == "three"
+    assert flight.call(2, lambda: "two again") == "two again"
+    sleep(0.06)
+    assert flight.call(3, lambda: "fresh") == "fresh"
+    with pytest.raises(ZeroDivisionError):
+        flight.call(4, lambda: 1 / 0)
+    assert flight.call(4, lambda: 4) == 4
+
+    stats = flight.stats()
+    assert stats.hits == 1
+    assert stats.evicted >= 1
+    assert stats.expired == 1
+
+
+def test_wraps_a_stage():
+    flight = SingleFlight()
+    sunk: List[Any] = []
+    calls: List[int] = []
+
+    def square(x: int) -> int:
+        calls.append(x)
+        return x * x
+
+    pipeline = (
+        StageGraph()
+        .stage("square", flight.wrap(square, key=lambda x: x % 3), workers=2)
+        .stage("sink", sunk.append)
+        .chain("square", "sink")
+        .build()
+    )
+    for i in [0, 1, 2, 3, 4, 5]:
+        pipeline.schedule(i % 3)
+    pipeline.run_until_complete()
+    assert sorted(calls) == [0, 1, 2]
+    assert sorted(sunk) == [0, 0, 1, 1, 4, 4]
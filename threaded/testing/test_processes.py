@@ -0,0 +1,38 @@
+import multiprocessing
+import queue
+from array import array
+from functools import partial
+from typing import Any
+
+from threaded.processes import ProcessDispatcherLoop
+
+
+def checksum(results: "queue.Queue[Any]", job: Any) -> None:
+    if isinstance(job, memoryview):
+        results.put(("shared", sum(job)))
+        return
+    results.put(("piped", job * job))
+
+
+def test_dispatches_in_worker_processes():
+    results: "queue.Queue[Any]" = multiprocessing.Queue()
+    loop = ProcessDispatcherLoop(
+        max_workers=2,
+        dispatcher=partial(checksum, results),
+        chunksize=8,
+        share_above=16,
+    )
+    loop.run()
+    loop.submit_many(range(20))
+    loop.submit(bytes([1] * 1000))
+    # shared as its 4 * 100 bytes
+    loop.submit(memoryview(array("i", [1] * 100)))
+    loop.stop()
+    loop.run_until_completed()
+
+    received = [results.get(timeout=5) for _ in range(22)]
+    assert ("shared", 1000) in received
+    assert ("shared", 100) in received
+    assert sorted(r for k, r in received if k == "piped") == [
+        i * i for i in range(20)
+    ]
@@ -0,0 +1,115 @@
+import queue
+from time import sleep
+
+import pytest
+
+from threaded.queues import (
+    FairQueue,
+    KeyedQueue,
+    PriorityDeadlineQueue,
+    Request,
+    RequestQueue,
+    ShortestJobFirstQueue,
+)
+
+
+def test_put_many_respects_bound():
+    q = RequestQueue(maxsize=3)
+    q.put_many([1, 2])
+    with pytest.raises(queue.Full):
+        q.put_many([3, 4], block=False)
+    with pytest.raises(ValueError):
+        q.put_many([1, 2, 3, 4])
+    assert q.get_many(10) == [1, 2]
+
+
+def test_get_many_stops_on_none():
+    q = RequestQueue()
+    q.put_many([1, None, 2])
+    assert q.get_many(10, linger=1) == [1, None]
+    assert q.get_many(10) == [2]
+    q.task_done_many(3)
+    with pytest.raises(ValueError):
+        q.task_done()
+
+
+def test_priority_then_earliest_deadline():
+    q = PriorityDeadlineQueue()
+    q.put(None)
+    q.put(Request("telemetry", priority=1))
+    q.put(Request("late", priority=0, deadline=20.0))
+    q.put(Request("no deadline", priority=0))
+    q.put(Request("early", priority=0, deadline=10.0))
+    q.put(Request("telemetry 2", priority=1))
+    served = [r.payload for r in q.get_many(5)]
+    assert served == [
+        "early",
+        "late",
+        "no deadline",
+        "telemetry",
+        "telemetry 2",
+    ]
+    assert q.get() is None
+
+
+def test_shortest_job_first_with_aging():
+    expected = {"long": 1.0, "short": 0.01, "new": None}
+    for aging, served in [
+        # by the estimates, the unknown one is taken as quick
+        (0.0, ["new", "short", "short", "long"]),
+        # 0.05s of waiting outweighs a second of runtime
+        (100.0, ["long", "new", "short", "short"]),
+    ]:
+        q = ShortestJobFirstQueue(expected.get, aging=aging)
+        q.put(None)
+        q.put("long")
+        sleep(0.05)
+        q.put_many(["short", "new", "short"])
+        assert q.get_many(4) == served
+        assert q.get() is None
+
+
+def test_keyed_lanes_take_turns():
+    q = KeyedQueue(maxsize=5)
+    for i in range(3):
+        q.put(Request(f"hot-{i}", key="hot"))
+    q.put(Request("cold", key="cold"))
+    q.put(Request("free"))
+    with pytest.raises(queue.Full):
+        q.put(Request("hot-3", key="hot"), block=False)
+    # one request per key at a time
+    assert [r.payload for r in q.get_many(5)] == ["hot-0", "cold", "free"]
+    with pytest.raises(queue.Empty):
+        q.get(block=False)
+    q.release("cold")
+    q.release("hot")
+    assert q.get().payload == "hot-1"
+    assert q.keys == 1
+    q.put(None)
+    q.release("hot")
+    assert q.get().payload == "hot-2"
+    q.release("hot")
+    assert q.get() is None
+    assert q.keys == 0
+
+
+def test_producers_share_by_weight():
+    q = FairQueue(weights={"quiet": 2})
+    q.put_many(Request(f"chatty-{i}", producer="chatty") for i in range(9))
+    q.put_many(Request(f"quiet-{i}", producer="quiet") for i in range(4))
+    q.put(None)
+    served = [r.payload for r in q.get_many(13)]
+    assert served[:6] == [
+        "chatty-0",
+        "quiet-0",
+        "quiet-1",
+        "chatty-1",
+        "quiet-2",
+        "quiet-3",
+    ]
+    assert served[6:] == [f"chatty-{i}" for i in range(2, 9)]
+    assert q.get() is None
+
+    stats = q.stats()
+    assert stats["chatty"].served == 9 and stats["chatty"].depth == 0
+    assert stats["quiet"].max_wait >= stats["quiet"].mean_wait > 0
@@ -0,0 +1,155 @@
+import threading
+from time import sleep
+from typing import Any, List
+
+from threaded.executor import SimplePipeline
+from threaded.graph import StageGraph
+from threaded.jobs import Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+
+
+def test_views_keep_to_their_quota():
+    executors = ExecutorRegistry()
+    view = executors.view(2, "test")
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def job(i: int) -> int:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        sleep(0.005)
+        with lock:
+            running -= 1
+        return i
+
+    futures = [view.submit(job, i) for i in range(10)]
+    view.shutdown(wait=True)
+    assert [f.result() for f in futures] == list(range(10))
+    assert peak == 2
+    # the executor behind the view is still there for the others
+    assert executors.view(1, "test").submit(job, 1).result() == 1
+    executors.shutdown()
+
+
+def test_pipelines_do_not_add_threads():
+    executors = ExecutorRegistry()
+    lock = threading.Lock()
+    runs: List[Any] = []
+    done = threading.Event()
+    # blocking jobs of a pipeline run one at a time
+    atomic = [0] * 6
+    peaks = [0] * 6
+
+    def run(n: int, i: int) -> None:
+        if i % 2 == 0:
+            with lock:
+                atomic[n] += 1
+                peaks[n] = max(peaks[n], atomic[n])
+            sleep(0.001)
+            with lock:
+                atomic[n] -= 1
+        with lock:
+            runs.append((n, i))
+            if len(runs) == 6 * 10:
+                done.set()
+
+    def jobs(n: int) -> List[StatelessJob]:
+        return [
+            StatelessJob(
+                name=f"{n}-{i}",
+                blocking=i % 2 == 0,
+                start=lambda i=i: run(n, i),
+            )
+            for i in range(10)
+        ]
+
+    before = threading.active_count()
+    executors.executor("jobs", max_workers=3)
+    executors.executor("execution", max_workers=1)
+    executors.executor("pipelines", max_workers=2)
+    pipelines = [Pipeline(executors) for _ in range(6)]
+    for n, pipeline in enumerate(pipelines):
+        for job in jobs(n):
+            pipeline.schedule(job)
+    # stopping a pipeline drops the jobs it has not started yet
+    assert done.wait(timeout=5)
+    for pipeline in pipelines:
+        pipeline.run_until_complete()
+
+    assert sorted(runs) == [(n, i) for n in range(6) for i in range(10)]
+    assert peaks == [1] * 6
+    assert threading.active_count() <= before + 3 + 1 + 2
+    executors.shutdown()
+
+
+def test_pipeline_fills_its_quota_and_keeps_the_slot_free():
+    executors = ExecutorRegistry()
+    pipeline = Pipeline(executors)
+    io = threading.Barrier(11)
+    executed = threading.Event()
+
+    # all 10 io-bound jobs have to run at once to pass the barrier
+    for i in range(10):
+        pipeline.schedule(
+            StatelessJob(
+                name=f"io-{i}", blocking=False, start=lambda: io.wait(5)
+            )
+        )
+    pipeline.schedule(StatelessJob(name="exec", start=executed.set))
+    assert executed.wait(timeout=2)
+    io.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+
+
+def test_graph_pipelines_do_not_add_threads():
+    executors = ExecutorRegistry()
+    lock = threading.Lock()
+    sunk: List[Any] = []
+    # the execution stage of a pipeline runs one item at a time
+    executing = [0] * 12
+    peaks = [0] * 12
+
+    def execute(item: Any) -> Any:
+        n, _ = item
+        with lock:
+            executing[n] += 1
+            peaks[n] = max(peaks[n], executing[n])
+        sleep(0.001)
+        with lock:
+            executing[n] -= 1
+        return item
+
+    def sink(item: Any) -> None:
+        with lock:
+            sunk.append(item)
+
+    before = threading.active_count()
+    executors.executor("stages", max_workers=4)
+    # starts nothing until there are items
+    idle = [SimplePipeline(executors) for _ in range(12)]
+    assert threading.active_count() == before
+    for pipeline in idle:
+        pipeline.run_until_complete()
+
+    pipelines = [
+        StageGraph()
+        .stage("io-bound", lambda item: item, workers=10, buffer=10)
+        .stage("exec", execute, fusable=False)
+        .stage("final", sink)
+        .chain("io-bound", "exec", "final")
+        .build(executors=executors)
+        for _ in range(12)
+    ]
+    for i in range(20):
+        for n, pipeline in enumerate(pipelines):
+            pipeline.schedule((n, i))
+    for pipeline in pipelines:
+        pipeline.run_until_complete()
+
+    assert sorted(sunk) == [(n, i) for n in range(12) for i in range(20)]
+    assert peaks == [1] * 12
+    assert threading.active_count() <= before + 4
+    executors.shutdown()
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from typing import List
+
+from threaded.resources import ResourceScheduler
+
+
+def test_disjoint_resources_run_at_once():
+    scheduler = ResourceScheduler(max_workers=4)
+    lock = threading.Lock()
+    holding: List[str] = []
+    overlaps: List[List[str]] = []
+
+    def job(resource: str) -> None:
+        with lock:
+            holding.append(resource)
+            overlaps.append(list(holding))
+        sleep(0.01)
+        with lock:
+            holding.remove(resource)
+
+    for resource in ["lift", "door", "lift", "door", "gate"]:
+        scheduler.submit_using({resource}, job, resource)
+    scheduler.shutdown(wait=True)
+
+    # the three resources were held at once, but never twice
+    assert max(len(held) for held in overlaps) == 3
+    assert all(len(set(held)) == len(held) for held in overlaps)
+
+
+def test_bypassed_job_does_not_starve():
+    executor = ThreadPoolExecutor(max_workers=4)
+    scheduler = ResourceScheduler(executor, max_bypass=2)
+    release = threading.Event()
+    order: List[str] = []
+
+    def job(name: str) -> None:
+        if name == "a":
+            release.wait(timeout=5)
+        order.append(name)
+
+    scheduler.submit_using({"a"}, job, "a")
+    scheduler.submit_using({"a", "b"}, job, "ab")
+    for i in range(1, 6):
+        scheduler.submit_using({"b"}, job, f"b{i}")
+    sleep(0.05)
+    # two "b" jobs went ahead of "ab", the others wait for it
+    assert order == ["b1", "b2"]
+    assert scheduler.stats().bypasses == 2
+    release.set()
+    scheduler.shutdown(wait=True)
+    executor.shutdown()
+    assert order == ["b1", "b2", "a", "ab", "b3", "b4", "b5"]
+
+
+def test_waiting_jobs_go_by_rank():
+    scheduler = ResourceScheduler(max_workers=2)
+    release = threading.Event()
+    order: List[str] = []
+
+    scheduler.submit_using({"slot"}, release.wait, 5)
+    scheduler.submit_ranked(2.0, {"slot"}, order.append, "long")
+    scheduler.submit_ranked(1.0, {"slot"}, order.append, "short")
+    # unranked jobs have the rank of 0, ties go in the order of arrival
+    scheduler.submit_using({"slot"}, order.append, "first")
+    scheduler.submit_using({"slot"}, order.append, "second")
+    release.set()
+    scheduler.shutdown(wait=True)
+    assert order == ["first", "second", "short", "long"]
@@ -0,0 +1,133 @@
+import threading
+from time import sleep, thread_time
+from typing import List, Set
+
+import pytest
+
+from threaded.jobs import CPU_SLOT, EXECUTION_SLOT, Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+from threaded.routing import AdaptiveRouter
+from threaded.timers import WheelTimer
+
+
+def spin(seconds: float) -> None:
+    started = thread_time()
+    while thread_time() - started < seconds:
+        pass
+
+
+def test_router_learns_and_follows_drift():
+    router = AdaptiveRouter(min_samples=3, demote={"idle"})
+    # both flags are wrong
+    busy = StatelessJob("busy", blocking=False, start=lambda: spin(0.005))
+    idle = StatelessJob("idle", blocking=True, start=lambda: sleep(0.005))
+    for _ in range(2):
+        router.run(busy)
+        router.run(idle)
+    assert not router.blocking(busy) and router.blocking(idle)
+    router.run(busy)
+    router.run(idle)
+    assert router.blocking(busy) and not router.blocking(idle)
+    assert router.promoted(busy) and not router.promoted(idle)
+
+    # a single idle run is not enough to leave the blocking pool
+    busy.start = lambda: sleep(0.005)
+    router.run(busy)
+    assert router.blocking(busy)
+    for _ in range(5):
+        router.run(busy)
+    assert not router.blocking(busy)
+
+    estimates = router.estimates()
+    assert estimates["busy"].samples == 9
+    assert estimates["idle"].cpu_share < 0.3
+    assert [(d.key, d.blocking) for d in router.decisions()] == [
+        ("busy", True),
+        ("idle", False),
+        ("busy", False),
+    ]
+    # an explicit flag is only overridden for the classes listed,
+    # or if it is derived
+    strict = AdaptiveRouter(min_samples=1)
+    strict.run(idle)
+    assert strict.estimates()["idle"].blocking is False
+    assert strict.blocking(idle)
+    idle.derived = True
+    assert not strict.blocking(idle)
+    # naming resources makes a job blocking whatever it does
+    idle.resources = frozenset({"door"})
+    assert router.blocking(idle)
+
+
+@pytest.mark.parametrize(
+    "demote, derived, held_slot",
+    [
+        # the flag keeps the job on the execution slot
+        ((), False, [True] * 4),
+        # the flag is trusted for the first two runs only
+        ({"poll"}, False, [True, True, False, False]),
+        ((), True, [True, True, False, False]),
+    ],
+)
+def test_pipeline_demotes_idle_jobs_only_if_told(
+    demote: Set[str], derived: bool, held_slot: List[bool]
+):
+    executors = ExecutorRegistry()
+    timer = WheelTimer(tick=0.005)
+    router = AdaptiveRouter(min_samples=2, demote=demote)
+    pipeline = Pipeline(executors, timer, router)
+    held: List[bool] = []
+    done = threading.Event()
+
+    def start() -> int:
+        held.append(
+            EXECUTION_SLOT <= pipeline.resources.stats().held
+        )
+        sleep(0.005)
+        if len(held) == 4:
+            done.set()
+        return len(held)
+
+    pipeline.schedule(
+        StatelessJob(
+            name="poll",
+            blocking=True,
+            start=start,
+            should_reshedule=lambda n: n < 4,
+            derived=derived,
+        )
+    )
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    timer.stop()
+    executors.shutdown()
+    assert held == held_slot
+
+
+def test_pipeline_keeps_promoted_jobs_off_the_execution_slot():
+    executors = ExecutorRegistry()
+    router = AdaptiveRouter(min_samples=2)
+    pipeline = Pipeline(executors, router=router)
+    held: List[Set[str]] = []
+    done = threading.Event()
+
+    def start() -> int:
+        held.append(set(pipeline.resources.stats().held))
+        spin(0.005)
+        if len(held) == 4:
+            done.set()
+        return len(held)
+
+    pipeline.schedule(
+        StatelessJob(
+            name="crunch",
+            blocking=False,
+            start=start,
+            should_reshedule=lambda n: n < 4,
+        )
+    )
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    executors.shutdown()
+    # busy on the CPU, it takes turns with the other such jobs
+    assert held == [set(), set(), set(CPU_SLOT), set(CPU_SLOT)]
@@ -0,0 +1,42 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, List
+
+from threaded.executor import WorkerPool
+from threaded.stealing import WorkStealingExecutor
+
+
+def test_runs_external_and_follow_up_jobs():
+    pool = WorkStealingExecutor(max_workers=4, local_batch=3)
+    lock = threading.Lock()
+    leaves: List[int] = []
+    follow_ups: "List[Future[Any]]" = []
+
+    def spawn(depth: int, n: int) -> None:
+        if depth == 0:
+            with lock:
+                leaves.append(n)
+            return
+        for i in range(4):
+            f = pool.submit(spawn, depth - 1, n * 4 + i)
+            with lock:
+                follow_ups.append(f)
+
+    roots = [pool.submit(spawn, 3, i) for i in range(8)]
+    for f in roots:
+        f.result(timeout=5)
+    pool.shutdown()
+    assert all(f.done() for f in follow_ups)
+    assert sorted(leaves) == list(range(8 * 4**3))
+
+
+def test_serves_as_worker_pool_backend():
+    pool = WorkerPool(executor=WorkStealingExecutor(max_workers=3))
+    results: "queue.Queue[Any]" = queue.Queue()
+    for i in range(100):
+        pool.submit(lambda i=i: i * 2, results)
+    pool.run_until_complete()
+    assert sorted(results.get_nowait() for _ in range(100)) == [
+        i * 2 for i in range(100)
+    ]
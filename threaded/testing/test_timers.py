@@ -0,0 +1,90 @@
+import random
+import threading
+from time import monotonic
+from typing import Dict, List
+
+from threaded.jobs import Pipeline, StatelessJob
+from threaded.registry import ExecutorRegistry
+from threaded.timers import Backoff, TimingWheel, WheelTimer
+
+
+def test_wheel_fires_on_time_across_levels():
+    # 8 slots on 3 levels reach 512 ticks, the rest has to go around
+    wheel = TimingWheel(slots=8, levels=3)
+    rng = random.Random(3)
+    fired: Dict[int, int] = {}
+    delays = [rng.randint(1, 2000) for _ in range(2000)]
+    handles = [
+        wheel.add(d, lambda i=i: fired.__setitem__(i, wheel.now))
+        for i, d in enumerate(delays)
+    ]
+    cancelled = set(rng.sample(range(2000), 200))
+    for i in cancelled:
+        assert wheel.cancel(handles[i])
+    assert not wheel.cancel(handles[next(iter(cancelled))])
+
+    for _ in range(2100):
+        for callback in wheel.advance(1):
+            callback()
+    assert len(wheel) == 0
+    assert fired == {
+        i: d for i, d in enumerate(delays) if i not in cancelled
+    }
+
+
+def test_single_wheel_holds_timers_turns_away():
+    wheel = TimingWheel(slots=4, levels=1)
+    fired: Dict[int, int] = {}
+    for delay in (5, 1, 9):
+        wheel.add(delay, lambda d=delay: fired.__setitem__(d, wheel.now))
+    for _ in range(10):
+        for callback in wheel.advance(1):
+            callback()
+    assert fired == {1: 1, 5: 5, 9: 9}
+    assert len(wheel) == 0
+
+
+def test_timer_runs_callbacks_after_their_delay():
+    timer = WheelTimer(tick=0.005)
+    started = monotonic()
+    fired: List[float] = []
+    done = threading.Event()
+    timer.call_later(0.03, lambda: (fired.append(monotonic()), done.set()))
+    dropped = timer.call_later(0.01, fired.append, 0.0)
+    assert timer.cancel(dropped)
+    assert done.wait(timeout=1)
+    timer.stop()
+    assert len(fired) == 1
+    assert 0.03 <= fired[0] - started < 0.2
+
+
+def test_pipeline_reschedules_with_backoff():
+    executors = ExecutorRegistry()
+    timer = WheelTimer(tick=0.005)
+    pipeline = Pipeline(executors, timer)
+    runs: List[float] = []
+    done = threading.Event()
+
+    def start() -> int:
+        runs.append(monotonic())
+        if len(runs) == 4:
+            done.set()
+        return len(runs)
+
+    pipeline.schedule(
+        StatelessJob(
+            name="poll",
+            blocking=False,
+            start=start,
+            should_reshedule=lambda n: n < 4 and Backoff(0.02, 2.0),
+        )
+    )
+    assert done.wait(timeout=2)
+    pipeline.run_until_complete()
+    timer.stop()
+    executors.shutdown()
+
+    gaps = [b - a for a, b in zip(runs, runs[1:])]
+    # 0.02, 0.04 and 0.08 seconds, none spent on a worker
+    assert len(gaps) == 3
+    assert all(g >= d for g, d in zip(gaps, [0.02, 0.04, 0.08]))
@@ -0,0 +1,238 @@
+import logging
+import math
+import random
+import threading
+from dataclasses import dataclass
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Exponential backoff: the n-th retry (from 0) waits for
+    `initial * factor ** n` seconds, at most `maximum`, less
+    a random share of up to `jitter` of that"""
+
+    initial: float = 0.1
+    factor: float = 2.0
+    maximum: float = 30.0
+    jitter: float = 0.0
+
+    def delay(self, attempt: int) -> float:
+        try:
+            delay = min(self.initial * self.factor**attempt, self.maximum)
+        except OverflowError:
+            delay = self.maximum
+        if self.jitter:
+            delay *= 1 - self.jitter * random.random()
+        return delay
+
+
+class TimerHandle:
+    __slots__ = ("expires", "callback", "level", "slot", "cancelled")
+
+    def __init__(self, expires: int, callback: Callable[[], Any]) -> None:
+        # in ticks of the wheel
+        self.expires = expires
+        self.callback = callback
+        self.level = self.slot = 0
+        self.cancelled = False
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel: `levels` wheels of `slots` slots each,
+    a slot of level n spans `slots ** n` ticks. A timer goes to the
+    lowest level which reaches its expiry and moves down a level
+    whenever the wheel below completes a turn, so adding and
+    cancelling a timer take O(1) and a tick only touches the timers
+    which are due (or move down).
+
+    Counts time in ticks and is not thread-safe, see `WheelTimer`.
+    """
+
+    def __init__(self, slots: int = 256, levels: int = 4) -> None:
+        if slots < 2 or slots & (slots - 1) or levels < 1:
+            raise ValueError("slots must be a power of two, levels positive")
+        self.__bits = slots.bit_length() - 1
+        self.__mask = slots - 1
+        self.__wheels: List[List[Dict[TimerHandle, None]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self.now = 0
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def add(self, ticks: int, callback: Callable[[], Any]) -> TimerHandle:
+        """Schedules the callback `ticks` ticks (at least one) from now"""
+        handle = TimerHandle(self.now + max(ticks, 1), callback)
+        self.__place(handle)
+        self.__size += 1
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        """Returns False if the timer has already fired or been cancelled"""
+        slot = self.__wheels[handle.level][handle.slot]
+        if handle.cancelled or handle not in slot:
+            return False
+        del slot[handle]
+        handle.cancelled = True
+        self.__size -= 1
+        return True
+
+    def advance(self, ticks: int) -> List[Callable[[], Any]]:
+        """Moves the time forward, returns the callbacks due meanwhile"""
+        due: List[Callable[[], Any]] = []
+        for step in range(ticks):
+            if not self.__size:
+                # nothing left to visit, skip the rest at once
+                self.now += ticks - step
+                break
+            self.now += 1
+            if not self.now & self.__mask:
+                self.__cascade(1, due)
+            slot = self.__wheels[0][self.now & self.__mask]
+            if len(self.__wheels) > 1:
+                # the level above only lets down the timers due
+                # within this turn
+                self.__size -= len(slot)
+                due.extend(handle.callback for handle in slot)
+                slot.clear()
+                continue
+            # a single wheel holds timers a number of turns away
+            for handle in [h for h in slot if h.expires <= self.now]:
+                del slot[handle]
+                self.__size -= 1
+                due.append(handle.callback)
+        return due
+
+    def __cascade(self, level: int, due: List[Callable[[], Any]]) -> None:
+        if level >= len(self.__wheels):
+            return
+        index = (self.now >> (self.__bits * level)) & self.__mask
+        if not index:
+            self.__cascade(level + 1, due)
+        slot = self.__wheels[level][index]
+        handles = list(slot)
+        slot.clear()
+        for handle in handles:
+            if handle.expires <= self.now:
+                self.__size -= 1
+                due.append(handle.callback)
+            else:
+                self.__place(handle)
+
+    def __place(self, handle: TimerHandle) -> None:
+        remaining = handle.expires - self.now
+        level = 0
+        while (
+            level < len(self.__wheels) - 1
+            and remaining >> (self.__bits * (level + 1))
+        ):
+            level += 1
+        slot = (handle.expires >> (self.__bits * level)) & self.__mask
+        handle.level, handle.slot = level, slot
+        self.__wheels[level][slot][handle] = None
+
+
+class WheelTimer:
+    """
+    Runs callbacks after a delay, with a resolution of `tick`
+    seconds, from a single thread driving a `TimingWheel`. The thread
+    starts with the first timer and sleeps while there are none.
+
+    Callbacks run on the timer thread and should be quick, e.g.
+    put something into a queue.
+    """
+
+    def __init__(
+        self,
+        tick: float = 0.01,
+        slots: int = 256,
+        levels: int = 4,
+        name: str = "timer-wheel",
+    ) -> None:
+        if tick <= 0:
+            raise ValueError("tick must be positive")
+        self.__tick = tick
+        self.__wheel = TimingWheel(slots, levels)
+        self.__name = name
+        self.__lock = threading.Condition()
+        self.__started = monotonic()
+        self.__thread: Optional[threading.Thread] = None
+        self.__stopped = False
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__wheel)
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> TimerHandle:
+        """Runs `callback(*args)` once `delay` seconds have passed
+
+        Raises:
+            RuntimeError: if the timer is stopped
+        """
+        with self.__lock:
+            if self.__stopped:
+                raise RuntimeError("cannot schedule on a stopped timer")
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    name=self.__name, target=self.__run, daemon=True
+                )
+                self.__thread.start()
+            if not len(self.__wheel):
+                # nothing is due, the wheel may skip the idle time
+                self.__catch_up()
+            expires = math.ceil((self.__elapsed() + delay) / self.__tick)
+            handle = self.__wheel.add(
+                expires - self.__wheel.now, partial(callback, *args)
+            )
+            self.__lock.notify()
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        with self.__lock:
+            return self.__wheel.cancel(handle)
+
+    def stop(self) -> None:
+        """Drops the pending timers and stops the thread"""
+        with self.__lock:
+            self.__stopped = True
+            self.__lock.notify()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __elapsed(self) -> float:
+        return monotonic() - self.__started
+
+    def __catch_up(self) -> List[Callable[[], Any]]:
+        # the caller holds the lock
+        now = int(self.__elapsed() / self.__tick)
+        return self.__wheel.advance(now - self.__wheel.now)
+
+    def __run(self) -> None:
+        while True:
+            with self.__lock:
+                while not self.__stopped and not len(self.__wheel):
+                    self.__lock.wait()
+                if self.__stopped:
+                    return
+                due = self.__catch_up()
+                if not due:
+                    next_tick = (self.__wheel.now + 1) * self.__tick
+                    self.__lock.wait(next_tick - self.__elapsed())
+                    continue
+            for callback in due:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(msg=f"{self.__name} callback failed: {e!r}")
+
+
+# the timer shared by the pipelines of the process
+timer = WheelTimer()